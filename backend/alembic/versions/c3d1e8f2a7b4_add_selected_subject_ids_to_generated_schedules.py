@@ -0,0 +1,28 @@
+"""Add selected_subject_ids to generated_schedules
+
+Revision ID: c3d1e8f2a7b4
+Revises: a5fc4bc98b84
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d1e8f2a7b4'
+down_revision: Union[str, Sequence[str], None] = 'a5fc4bc98b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('generated_schedules', sa.Column('selected_subject_ids', sa.JSON(), nullable=True), schema='sghu')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('generated_schedules', 'selected_subject_ids', schema='sghu')
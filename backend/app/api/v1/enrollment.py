@@ -6,19 +6,21 @@ from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.config import settings
 from app.services.enrollment_service import EnrollmentService
 from app.services.student_service import StudentService
-from app.services.subject_service import SubjectService, AcademicPeriodService
+from app.services.subject_service import AcademicPeriodService
 from app.services.validation_service import ValidationService
+from app.services.eligibility_service import EligibilityService
 from app.schemas.enrollment import EnrollmentRead
 from app.schemas.validation import (
     EnrollmentRequest,
     EnrollmentValidationResult,
+    EnrollmentBatchValidationRequest,
+    EnrollmentBatchValidationResponse,
     SubjectEligibilityInfo,
     EnrollmentStatusResponse
 )
-from app.models.source.student_data import GradeStatus
-from app.config import settings
 
 router = APIRouter()
 
@@ -44,6 +46,37 @@ def validate_enrollment(
     return service.validate_enrollment_request(request)
 
 
+@router.post("/validate/batch", response_model=EnrollmentBatchValidationResponse)
+def validate_enrollment_batch(
+    request: EnrollmentBatchValidationRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Valida muchas solicitudes de matrícula en una sola petición (ej: validación nocturna
+    de la cohorte antes de abrir matrícula), sin persistirlas.
+    
+    Estudiantes, estados financieros, historiales, reglas académicas y secciones se cargan
+    con unas pocas consultas por conjuntos y las reglas se evalúan en memoria. Cada resultado
+    es el mismo que retornaría POST /validate para esa solicitud.
+    
+    Body:
+    {
+        "requests": [
+            {"student_id": 1, "academic_period_id": 1, "section_ids": [1, 2, 3]},
+            {"student_id": 2, "academic_period_id": 1, "section_ids": [4, 5]}
+        ]
+    }
+    """
+    if len(request.requests) > settings.ENROLLMENT_VALIDATION_BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.ENROLLMENT_VALIDATION_BATCH_MAX_REQUESTS} solicitudes por petición"
+        )
+    
+    service = EnrollmentService(db)
+    return service.validate_enrollment_requests(request.requests)
+
+
 @router.get("/{enrollment_id}", response_model=EnrollmentRead)
 def get_enrollment(
     enrollment_id: int,
@@ -80,8 +113,6 @@ def get_eligible_subjects(
     
     Si no se proporciona academic_period_id, usa el período activo.
     """
-    validation_service = ValidationService(db)
-    subject_service = SubjectService(db)
     period_service = AcademicPeriodService(db)
     
     # Obtener período académico
@@ -96,7 +127,7 @@ def get_eligible_subjects(
             )
         academic_period_id = period.id
     
-    # Obtener todas las asignaturas del programa del estudiante
+    # Obtener el estudiante (para conocer su programa)
     student_service = StudentService(db)
     try:
         student = student_service.get_student(student_id)
@@ -106,73 +137,9 @@ def get_eligible_subjects(
             detail=f"Estudiante con ID {student_id} no encontrado"
         )
     
-    # Obtener asignaturas del programa
-    all_subjects = subject_service.get_subjects(program_id=student.program_id, limit=settings.MAX_SUBJECTS_PER_QUERY)
-    
-    # Obtener historial académico
-    academic_history = student_service.get_academic_history(student_id)
-    approved_subject_ids = {h.subject_id for h in academic_history if h.status == GradeStatus.APROBADO.value}
-    
-    # Obtener secciones disponibles del período
-    from app.repositories.subject_repository import CourseSectionRepository
-    section_repo = CourseSectionRepository(db)
-    available_sections = section_repo.get_by_period(academic_period_id, skip=0, limit=settings.MAX_SECTIONS_PER_QUERY)
-    available_subject_ids = {s.subject_id for s in available_sections}
-    
-    eligible_subjects = []
-    
-    for subject in all_subjects:
-        # Solo considerar asignaturas que tienen secciones disponibles
-        if subject.id not in available_subject_ids:
-            continue
-        
-        # Validar prerrequisitos
-        prereq_validation = validation_service.validate_prerequisites(
-            student_id=student_id,
-            subject_id=subject.id
-        )
-        
-        # Obtener prerrequisitos de la asignatura
-        subject_with_prereqs = subject_service.get_subject_with_prerequisites(subject.id)
-        prerequisites_met = []
-        prerequisites_missing = []
-        prerequisite_names_missing = []
-        
-        if subject_with_prereqs.prerequisites:
-            for prereq in subject_with_prereqs.prerequisites:
-                if prereq.prerequisite_subject_id in approved_subject_ids:
-                    prerequisites_met.append(prereq.prerequisite_subject_id)
-                else:
-                    prerequisites_missing.append(prereq.prerequisite_subject_id)
-                    # Obtener nombre del prerrequisito
-                    try:
-                        prereq_subject = subject_service.get_subject(prereq.prerequisite_subject_id)
-                        prerequisite_names_missing.append(prereq_subject.name)
-                    except Exception:
-                        prerequisite_names_missing.append(f"Asignatura ID {prereq.prerequisite_subject_id}")
-        
-        # Verificar si puede matricularse
-        can_enroll = prereq_validation.is_valid and subject.id not in approved_subject_ids
-        reason = None
-        if not prereq_validation.is_valid:
-            reason = prereq_validation.message
-        elif subject.id in approved_subject_ids:
-            reason = "Ya aprobaste esta asignatura"
-        
-        eligible_subjects.append(SubjectEligibilityInfo(
-            subject_id=subject.id,
-            subject_code=subject.code,
-            subject_name=subject.name,
-            credits=subject.credits,
-            is_eligible=prereq_validation.is_valid,
-            prerequisites_met=prerequisites_met,
-            prerequisites_missing=prerequisites_missing,
-            prerequisite_names_missing=prerequisite_names_missing,
-            can_enroll=can_enroll,
-            reason=reason
-        ))
-    
-    return eligible_subjects
+    # Elegibilidad calculada en bloque (número constante de consultas)
+    eligibility_service = EligibilityService(db)
+    return eligibility_service.get_eligible_subjects(student_id, student.program_id, academic_period_id)
 
 
 @router.get("/students/{student_id}/enrollment-status", response_model=EnrollmentStatusResponse)
@@ -209,9 +176,12 @@ def get_enrollment_status(
         financial_debt_amount = float(financial_status.debt_amount) if financial_status.has_debt == 'true' else None
         financial_message = financial_validation.message
     
-    # Obtener materias elegibles
+    # Obtener materias elegibles del período activo
     try:
-        eligible_subjects = get_eligible_subjects(student_id, None, db)
+        period = AcademicPeriodService(db).get_current_period()
+        eligible_subjects = EligibilityService(db).get_eligible_subjects(
+            student_id, student.program_id, period.id
+        ) if period else []
         eligible_count = len([s for s in eligible_subjects if s.can_enroll])
     except:
         eligible_count = 0
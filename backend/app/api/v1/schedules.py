@@ -1,16 +1,34 @@
 """
 Endpoints para generación de horarios
 """
+import json
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_db
+from app.database import SessionLocal
+from app.config import settings
 from app.services.schedule_service import ScheduleService
+from app.services.schedule_jobs import get_schedule_job_queue
+from app.services.schedule_stream import (
+    STREAM_FORMATS,
+    STREAM_MEDIA_TYPES,
+    format_event,
+    start_schedule_stream,
+    stop_schedule_stream
+)
 from app.schemas.schedule import (
     ScheduleGenerationRequest,
+    ScheduleDeltaRequest,
+    ScheduleBatchRequest,
+    CohortScheduleRequest,
+    CohortScheduleResponse,
+    ScheduleJobRead,
     ScheduleSolutionResponse,
     UnassignedSubjectInfo,
+    ScheduleAlternativeInfo,
     GeneratedScheduleRead,
     ScheduleListResponse,
     ScheduleComparisonResponse,
@@ -25,6 +43,7 @@ router = APIRouter()
 @router.post("/generate", response_model=ScheduleSolutionResponse)
 def generate_schedule(
     request: ScheduleGenerationRequest,
+    async_mode: bool = Query(False, alias="async", description="Encolar y retornar un job_id inmediatamente"),
     db: Session = Depends(get_db)
 ):
     """
@@ -51,16 +70,50 @@ def generate_schedule(
         "student_id": 1,
         "selected_subject_ids": [1, 2, 3, 4, 5],
         "academic_period_id": 1,  // Opcional, usa el activo si no se proporciona
-        "optimization_level": "medium"  // "none" | "low" | "medium" | "high"
+        "optimization_level": "medium",  // "none" | "exact" | "low" | "medium" | "high"
+        "solver_profile": "latency",  // Opcional: "latency" (1 worker) | "throughput" (CP-SAT paralelo)
+        "k": 3,  // Opcional: número de horarios alternativos (por defecto 1)
+        "min_distance": 2  // Opcional: asignaturas con distinta sección entre cada par de alternativos
     }
+    
+    Con "exact" CP-SAT maximiza las asignaturas y, entre esos horarios, minimiza el fitness
+    en una sola búsqueda (sin algoritmo genético).
+    
+    Las estadísticas de CP-SAT (tiempo, ramas, conflictos) se retornan en metadata.solver.
+    
+    Con k > 1 se retornan en alternatives los K mejores horarios distintos entre sí (el primero
+    es el horario principal), calculados en la misma generación: con "none"/"exact" re-resolviendo
+    el modelo de CP-SAT con cortes de distancia, con el optimizador exacto para espacios pequeños
+    o, con el AG, entre los individuos evaluados. Solo se persiste el horario principal.
+    
+    Con ?async=true la generación se encola y se responde 202 con el estado del trabajo;
+    el resultado se consulta en GET /schedules/jobs/{job_id}.
     """
+    if async_mode:
+        job = get_schedule_job_queue().submit({
+            "student_id": request.student_id,
+            "selected_subject_ids": request.selected_subject_ids,
+            "academic_period_id": request.academic_period_id,
+            "optimization_level": request.optimization_level or "none",
+            "solver_profile": request.solver_profile,
+            "k": request.k,
+            "min_distance": request.min_distance
+        })
+        return JSONResponse(
+            status_code=202,
+            content=ScheduleJobRead(**job).model_dump(mode="json")
+        )
+    
     try:
         service = ScheduleService(db)
         solution = service.generate_schedule_for_student(
             student_id=request.student_id,
             selected_subject_ids=request.selected_subject_ids,
             academic_period_id=request.academic_period_id,
-            optimization_level=request.optimization_level or "none"
+            optimization_level=request.optimization_level or "none",
+            solver_profile=request.solver_profile,
+            k=request.k,
+            min_distance=request.min_distance
         )
         
         return ScheduleSolutionResponse(
@@ -81,7 +134,18 @@ def generate_schedule(
             processing_time=solution.processing_time,
             conflicts=solution.conflicts,
             solver_status=solution.solver_status,
-            quality_score=solution.quality_score
+            quality_score=solution.quality_score,
+            metadata=solution.metadata,
+            alternatives=[
+                ScheduleAlternativeInfo(
+                    rank=a.rank,
+                    section_ids=a.section_ids,
+                    subject_ids=a.subject_ids,
+                    quality_score=a.quality_score,
+                    min_distance=a.min_distance
+                )
+                for a in solution.alternatives
+            ]
         )
     except NotFoundError as e:
         raise e
@@ -94,6 +158,232 @@ def generate_schedule(
         )
 
 
+@router.post("/generate/delta", response_model=ScheduleSolutionResponse)
+def generate_delta_schedule(
+    request: ScheduleDeltaRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Ajusta un horario generado agregando o quitando asignaturas sin resolver desde cero.
+    
+    Las asignaturas no afectadas conservan su sección; se re-optimizan las agregadas y las
+    que chocan con ellas (búsqueda local acotada). El horario ajustado se guarda como un
+    horario nuevo (metadata.schedule_id); el horario base no se modifica. Se parte de la selección
+    guardada con el horario base: las asignaturas que no obtuvieron sección se vuelven a intentar y,
+    si siguen sin sección, se reportan en unassigned_subjects. Quitar todas las asignaturas retorna 400.
+    
+    Body:
+    {
+        "base_schedule_id": 10,
+        "added_subject_ids": [7],
+        "removed_subject_ids": [3]
+    }
+    
+    En metadata se retornan las asignaturas re-optimizadas (neighborhood_subject_ids), las que
+    conservaron su sección (kept_subject_ids) y las que la cambiaron (moved_subject_ids).
+    """
+    try:
+        service = ScheduleService(db)
+        solution = service.generate_delta_schedule(
+            base_schedule_id=request.base_schedule_id,
+            added_subject_ids=request.added_subject_ids,
+            removed_subject_ids=request.removed_subject_ids
+        )
+        
+        return ScheduleSolutionResponse(
+            student_id=solution.student_id,
+            is_feasible=solution.is_feasible,
+            assigned_section_ids=solution.assigned_section_ids,
+            assigned_subject_ids=solution.assigned_subject_ids,
+            unassigned_subjects=[
+                UnassignedSubjectInfo(
+                    subject_id=u.subject_id,
+                    subject_code=u.subject_code,
+                    subject_name=u.subject_name,
+                    reason=u.reason,
+                    conflicting_sections=u.conflicting_sections
+                )
+                for u in solution.unassigned_subjects
+            ],
+            processing_time=solution.processing_time,
+            conflicts=solution.conflicts,
+            solver_status=solution.solver_status,
+            quality_score=solution.quality_score,
+            metadata=solution.metadata
+        )
+    except NotFoundError as e:
+        raise e
+    except ValidationError as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error ajustando horario: {str(e)}"
+        )
+
+
+@router.post("/generate/stream")
+def generate_schedule_stream(
+    request: ScheduleGenerationRequest,
+    stream_format: str = Query("ndjson", alias="format", description="Formato del stream: ndjson | sse")
+):
+    """
+    Genera un horario informando el progreso de la optimización en streaming.
+    
+    Eventos: "started" (con stream_id), "progress" (horario óptimo y cada alternativo del
+    optimizador exacto en espacios pequeños; si no, horario de CP-SAT y mejor horario de cada
+    generación del AG; con el mejor encontrado hasta el momento en incumbent_section_ids),
+    "heartbeat" y "result" (mismo contenido que GET /schedules/jobs/{job_id}).
+    
+    Si el cliente se desconecta o llama a POST /schedules/generate/stream/{stream_id}/stop,
+    se cancelan las generaciones restantes y se persiste el mejor horario encontrado.
+    
+    Corren a la vez como máximo SCHEDULE_STREAM_MAX_CONCURRENT generaciones; con el cupo
+    agotado se responde 503 (con Retry-After).
+    """
+    if stream_format not in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido: {stream_format}. Opciones: {', '.join(STREAM_FORMATS)}"
+        )
+    
+    stream = start_schedule_stream({
+        "student_id": request.student_id,
+        "selected_subject_ids": request.selected_subject_ids,
+        "academic_period_id": request.academic_period_id,
+        "optimization_level": request.optimization_level or "none",
+        "solver_profile": request.solver_profile,
+        "k": request.k,
+        "min_distance": request.min_distance
+    })
+    
+    def stream_events():
+        for event in stream.events(heartbeat_seconds=settings.SCHEDULE_STREAM_HEARTBEAT_SECONDS):
+            yield format_event(event, stream_format)
+    
+    return StreamingResponse(stream_events(), media_type=STREAM_MEDIA_TYPES[stream_format])
+
+
+@router.post("/generate/stream/{stream_id}/stop")
+def stop_schedule_stream_endpoint(stream_id: str):
+    """Detiene una generación en streaming; se conserva el mejor horario encontrado"""
+    if not stop_schedule_stream(stream_id):
+        raise HTTPException(
+            status_code=404,
+            detail=f"Generación {stream_id} no encontrada o ya terminada"
+        )
+    return {"stream_id": stream_id, "stopped": True}
+
+
+@router.get("/jobs/{job_id}", response_model=ScheduleJobRead)
+def get_schedule_job(
+    job_id: str,
+    wait: float = Query(0.0, ge=0, description="Segundos a esperar a que termine el trabajo (long-poll)")
+):
+    """
+    Estado de un trabajo asíncrono de generación de horario.
+    
+    Con wait > 0 la respuesta se retiene hasta que el trabajo termina o se cumple el
+    plazo (máximo SCHEDULE_JOB_MAX_WAIT_SECONDS).
+    """
+    job = get_schedule_job_queue().get(job_id, wait=min(wait, settings.SCHEDULE_JOB_MAX_WAIT_SECONDS))
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Trabajo {job_id} no encontrado"
+        )
+    return ScheduleJobRead(**job)
+
+
+@router.post("/generate/batch")
+def generate_schedules_batch(request: ScheduleBatchRequest):
+    """
+    Genera horarios para muchos estudiantes en una sola petición (ej: abrir matrícula de una cohorte).
+    
+    La oferta del período se carga una sola vez y las resoluciones se reparten en un pool
+    de procesos del tamaño de los núcleos disponibles. La respuesta es un stream NDJSON:
+    una línea por trabajo, en el orden en que terminan.
+    
+    Body:
+    {
+        "academic_period_id": 1,  // Opcional, usa el activo si no se proporciona
+        "max_workers": 8,  // Opcional, como máximo los núcleos configurados
+        "jobs": [
+            {"student_id": 1, "selected_subject_ids": [1, 2, 3], "optimization_level": "low"},
+            {"student_id": 2, "selected_subject_ids": [1, 4], "optimization_level": "none"}
+        ]
+    }
+    
+    Cada línea: {"job_index", "student_id", "status", "schedule_id", "solution", "error"}
+    """
+    if len(request.jobs) > settings.SCHEDULE_BATCH_MAX_JOBS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.SCHEDULE_BATCH_MAX_JOBS} trabajos por petición"
+        )
+    
+    def stream_results():
+        # Sesión propia: el stream continúa después de que termina el handler
+        db = SessionLocal()
+        try:
+            service = ScheduleService(db)
+            for result in service.generate_schedules_batch(
+                jobs=request.jobs,
+                academic_period_id=request.academic_period_id,
+                max_workers=request.max_workers
+            ):
+                yield json.dumps(result, default=str) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@router.post("/generate/cohort", response_model=CohortScheduleResponse)
+def generate_cohort_schedules(
+    request: CohortScheduleRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Asigna horarios a toda una cohorte con cupos compartidos (ej: día de apertura de matrícula).
+    
+    Los estudiantes se resuelven de forma conjunta: ninguna sección recibe más estudiantes
+    que sus cupos disponibles (capacity - enrolled_count). El problema se descompone en
+    grupos de estudiantes que compiten por las mismas secciones y cada grupo se resuelve
+    con CP-SAT por separado.
+    
+    Body:
+    {
+        "academic_period_id": 1,  // Opcional, usa el activo si no se proporciona
+        "fairness": false,  // true: primero una asignatura más a quien tiene menos
+        "students": [
+            {"student_id": 1, "selected_subject_ids": [1, 2, 3], "priority": 2.0},
+            {"student_id": 2, "selected_subject_ids": [1, 4]}
+        ]
+    }
+    """
+    if len(request.students) > settings.SCHEDULE_COHORT_MAX_STUDENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo {settings.SCHEDULE_COHORT_MAX_STUDENTS} estudiantes por petición"
+        )
+    
+    try:
+        service = ScheduleService(db)
+        return CohortScheduleResponse(**service.generate_cohort_schedules(
+            students=request.students,
+            academic_period_id=request.academic_period_id,
+            fairness=request.fairness
+        ))
+    except (NotFoundError, ValidationError) as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error asignando horarios de la cohorte: {str(e)}"
+        )
+
+
 @router.get("/students/{student_id}", response_model=ScheduleListResponse)
 def get_student_schedules(
     student_id: int,
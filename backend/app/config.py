@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -26,10 +26,50 @@ class Settings(BaseSettings):
     
     # Schedule Solver
     SCHEDULE_SOLVER_TIMEOUT: float = 30.0  # Timeout en segundos para el solver de horarios
+    SCHEDULE_SOLVER_PROFILE: str = "latency"  # Perfil de CP-SAT por defecto: "latency" (1 worker) | "throughput" (paralelo)
+    SCHEDULE_SOLVER_PARALLEL_WORKERS: int = 8  # Workers de CP-SAT del perfil "throughput"
+    SCHEDULE_SOLVER_USE_HINTS: bool = True  # Arrancar CP-SAT desde el último horario generado del estudiante
+    SCHEDULE_EXACT_SEARCH_THRESHOLD: int = 5000  # Tamaño máximo del espacio de búsqueda para usar el optimizador exacto
+    SCHEDULE_BATCH_MAX_WORKERS: int = 0  # Procesos para generación por lotes (0 = núcleos disponibles)
+    SCHEDULE_BATCH_MP_CONTEXT: str = "spawn"  # Método de arranque de procesos: "spawn" | "forkserver" | "fork"
+    SCHEDULE_SHARED_OFFER: bool = True  # Publicar la oferta del período en memoria compartida para los procesos de lotes
+    SCHEDULE_BATCH_MAX_JOBS: int = 1000  # Máximo de trabajos por petición de generación por lotes
+    SCHEDULE_BATCH_PERSIST_SIZE: int = 50  # Horarios del lote persistidos por transacción (inserción masiva)
+    SCHEDULE_ALTERNATIVES_MAX: int = 10  # Máximo de horarios alternativos (k) por generación
+    SCHEDULE_ALTERNATIVES_MIN_DISTANCE: int = 1  # Asignaturas con distinta sección entre alternativos por defecto
+    SCHEDULE_DELTA_MAX_NEIGHBORHOOD: int = 4  # Asignaturas re-optimizadas alrededor del cambio en la re-generación incremental
+    SCHEDULE_DELTA_MAX_NODES: int = 20000  # Nodos máximos de la búsqueda local de la re-generación incremental
+    SCHEDULE_COHORT_MAX_STUDENTS: int = 5000  # Máximo de estudiantes por asignación conjunta de cohorte
+    SCHEDULE_COHORT_TIMEOUT: float = 60.0  # Timeout en segundos de CP-SAT por componente de la cohorte
+    SCHEDULE_STREAM_HEARTBEAT_SECONDS: float = 15.0  # Intervalo de heartbeat del streaming de progreso sin eventos
+    SCHEDULE_STREAM_MAX_CONCURRENT: int = 4  # Generaciones en streaming simultáneas (con el cupo agotado se responde 503)
+    SCHEDULE_JOB_BACKEND: str = "local"  # Cola de generación asíncrona: "local" (hilos en proceso) | "celery" (REDIS_URL)
+    SCHEDULE_JOB_LOCAL_WORKERS: int = 2  # Hilos del backend local de trabajos
+    SCHEDULE_JOB_RESULT_TTL_SECONDS: int = 3600  # Tiempo que se conservan los resultados de los trabajos
+    SCHEDULE_JOB_MAX_WAIT_SECONDS: float = 30.0  # Espera máxima de una consulta long-poll de estado de trabajo
+    GA_FITNESS_CACHE_SIZE: int = 50000  # Entradas máximas de la caché LRU de fitness del AG
+    GA_SHARED_FITNESS_CACHE: bool = False  # Compartir la caché de fitness entre ejecuciones (mismo período y oferta)
+    GA_EARLY_STOPPING: bool = False  # Opcional: detener el AG tras las generaciones sin mejora definidas por nivel
+    GA_TARGET_FITNESS: Optional[float] = None  # Detener el AG al alcanzar este fitness (None = sin objetivo)
+    GA_TIME_BUDGET_MS: int = 0  # Tiempo máximo de evolución del AG en milisegundos (0 = sin límite)
+    GA_ADAPTIVE_POPULATION: bool = False  # Opcional: ajustar la población al tamaño del espacio de búsqueda (máximo: la del nivel)
+    GA_MIN_POPULATION: int = 20  # Población mínima del modo adaptativo
+    GA_POPULATION_PER_BIT: float = 4.0  # Individuos por bit (log2) del espacio de búsqueda en el modo adaptativo
+    GA_ISLAND_MODEL: bool = False  # Nivel "high": AG de islas en procesos paralelos
+    GA_ISLANDS: int = 0  # Islas (procesos) del modelo de islas (0 = núcleos disponibles)
+    GA_MIGRATION_INTERVAL: int = 10  # Generaciones entre migraciones de individuos entre islas
+    GA_MIGRATION_SIZE: int = 2  # Mejores individuos que migran de cada isla a la siguiente
+    GA_SEED: Optional[int] = None  # Semilla del modelo de islas para resultados reproducibles (None = aleatoria)
+    OFFER_SNAPSHOT_ENABLED: bool = True  # Reutilizar en memoria la oferta del período entre peticiones
+    OFFER_SNAPSHOT_MAX_AGE_SECONDS: float = 900.0  # Edad máxima de la foto de oferta antes de recargarla completa (cambios de secciones u horarios sin bump_offer_version)
+    OFFER_SNAPSHOT_REDIS: bool = False  # Compartir la foto de oferta entre procesos vía Redis (REDIS_URL)
+    PREREQUISITE_GRAPH_TTL_SECONDS: float = 300.0  # Vigencia del grafo de prerrequisitos cacheado por programa
+    ACADEMIC_RULES_TTL_SECONDS: float = 300.0  # Vigencia de las reglas académicas cacheadas (límites de créditos, etc.)
     
     # API Limits
     MAX_SECTIONS_PER_QUERY: int = 1000  # Límite máximo de secciones por consulta
     MAX_SUBJECTS_PER_QUERY: int = 100   # Límite máximo de asignaturas por consulta
+    ENROLLMENT_VALIDATION_BATCH_MAX_REQUESTS: int = 10000  # Máximo de solicitudes por petición de validación por lotes
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,47 @@
+"""
+Worker de Celery para la generación asíncrona de horarios.
+
+Uso:
+    celery -A app.core.celery_app worker --loglevel=info
+"""
+from celery import Celery
+
+from app.config import settings
+
+celery_app = Celery(
+    "sghu",
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL
+)
+celery_app.conf.update(
+    task_track_started=True,  # Permite informar el estado "running"
+    result_expires=settings.SCHEDULE_JOB_RESULT_TTL_SECONDS,
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    worker_prefetch_multiplier=1  # Los trabajos son largos: no acaparar tareas por worker
+)
+
+
+@celery_app.task(name="schedules.generate")
+def generate_schedule_task(
+    student_id: int,
+    selected_subject_ids: list,
+    academic_period_id: int = None,
+    optimization_level: str = "none",
+    solver_profile: str = None,
+    k: int = 1,
+    min_distance: int = None
+) -> dict:
+    """Genera y persiste el horario de un estudiante"""
+    from app.services.schedule_jobs import run_schedule_generation
+
+    return run_schedule_generation(
+        student_id=student_id,
+        selected_subject_ids=selected_subject_ids,
+        academic_period_id=academic_period_id,
+        optimization_level=optimization_level,
+        solver_profile=solver_profile,
+        k=k,
+        min_distance=min_distance
+    )
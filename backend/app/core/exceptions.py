@@ -31,6 +31,16 @@ class ConflictError(HTTPException):
         )
 
 
+class ServiceUnavailableError(HTTPException):
+    """Excepción para servicios saturados (el cliente puede reintentar)"""
+    def __init__(self, message: str, retry_after_seconds: int = 5):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=message,
+            headers={"Retry-After": str(retry_after_seconds)}
+        )
+
+
 class DatabaseError(HTTPException):
     """Excepción para errores de base de datos"""
     def __init__(self, message: str = "Error en la base de datos"):
@@ -4,7 +4,7 @@ Modelos de horarios del esquema "sghu"
 - ScheduleSlots: Bloques de horario
 - ScheduleConflicts: Conflictos detectados
 """
-from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Time, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Time, Boolean, JSON
 from sqlalchemy.orm import relationship
 from app.database import Base
 from datetime import datetime
@@ -17,10 +17,11 @@ class GeneratedSchedule(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     enrollment_id = Column(Integer, ForeignKey("sghu.student_enrollments.id"), nullable=False, index=True)
-    generation_method = Column(String(50), nullable=False)  # 'constraint_solver', 'genetic', 'hybrid'
+    generation_method = Column(String(50), nullable=False)  # 'constraint_solver', 'genetic', 'hybrid', 'cohort_solver', 'delta'
     quality_score = Column(Float, nullable=True)
     processing_time = Column(Float, nullable=True)  # en segundos
     status = Column(String(20), nullable=False)  # 'pending', 'completed', 'failed'
+    selected_subject_ids = Column(JSON, nullable=True)  # Asignaturas seleccionadas (con y sin sección asignada)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
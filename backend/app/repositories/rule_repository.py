@@ -0,0 +1,20 @@
+"""
+Repository para reglas académicas
+"""
+from typing import List, Tuple
+from sqlalchemy.orm import Session
+
+from app.repositories.base import BaseRepository
+from app.models.source.rules import AcademicRule
+
+
+class AcademicRuleRepository(BaseRepository[AcademicRule]):
+    """Repository para operaciones con reglas académicas"""
+    
+    def __init__(self, db: Session):
+        super().__init__(db, AcademicRule)
+    
+    def get_rule_values(self) -> List[Tuple[str, str]]:
+        """Todas las reglas como (rule_type, rule_value), por ID, en una consulta"""
+        rows = self.db.query(AcademicRule.rule_type, AcademicRule.rule_value).order_by(AcademicRule.id).all()
+        return [(rule_type, rule_value) for rule_type, rule_value in rows]
@@ -1,7 +1,7 @@
 """
 Repository para estudiantes
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy.orm import joinedload
 
@@ -39,6 +39,35 @@ class StudentRepository(BaseRepository[Student]):
             FinancialStatus.student_id == student_id
         ).first()
     
+    def get_by_ids(self, student_ids: List[int]) -> Dict[int, Student]:
+        """Obtiene varios estudiantes en una consulta ({student_id: estudiante}, sin los inexistentes)"""
+        student_ids = list(dict.fromkeys(student_ids))
+        if not student_ids:
+            return {}
+        students = self.db.query(Student).filter(Student.id.in_(student_ids)).all()
+        return {student.id: student for student in students}
+    
+    def get_academic_histories(self, student_ids: List[int]) -> Dict[int, List[AcademicHistory]]:
+        """Historial académico de varios estudiantes en una consulta ({student_id: registros por ID})"""
+        histories: Dict[int, List[AcademicHistory]] = {student_id: [] for student_id in dict.fromkeys(student_ids)}
+        if not histories:
+            return histories
+        for record in self.db.query(AcademicHistory).filter(
+            AcademicHistory.student_id.in_(list(histories))
+        ).order_by(AcademicHistory.id).all():
+            histories[record.student_id].append(record)
+        return histories
+    
+    def get_financial_statuses(self, student_ids: List[int]) -> Dict[int, FinancialStatus]:
+        """Estado financiero de varios estudiantes en una consulta ({student_id: estado})"""
+        student_ids = list(dict.fromkeys(student_ids))
+        if not student_ids:
+            return {}
+        statuses = self.db.query(FinancialStatus).filter(
+            FinancialStatus.student_id.in_(student_ids)
+        ).all()
+        return {status.student_id: status for status in statuses}
+    
     def get_by_program(self, program_id: int, skip: int = 0, limit: int = 100) -> List[Student]:
         """Obtiene estudiantes de un programa"""
         return self.db.query(Student).filter(
@@ -1,13 +1,14 @@
 """
 Repository para asignaturas y programas
 """
-from typing import List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import aliased, joinedload, selectinload
 
 from app.repositories.base import BaseRepository
 from app.models.source.academic import Subject, Program, Prerequisite
 from app.models.source.offer import CourseSection, AcademicPeriod
+from app.services.schedule_engine.models import Section, TimeSlot
 
 
 class SubjectRepository(BaseRepository[Subject]):
@@ -31,6 +32,31 @@ class SubjectRepository(BaseRepository[Subject]):
         return self.db.query(Subject).options(
             joinedload(Subject.prerequisites)
         ).filter(Subject.id == subject_id).first()
+    
+    def get_prerequisite_edges(self, program_id: int) -> List[Tuple[int, int, str, Optional[str]]]:
+        """
+        Obtiene en una consulta todas las aristas de prerrequisitos de las asignaturas de un programa.
+        
+        Returns:
+            Lista de (subject_id, prerequisite_subject_id, tipo, nombre del prerrequisito), por ID
+        """
+        subject = aliased(Subject)
+        prerequisite_subject = aliased(Subject)
+        return [
+            tuple(row)
+            for row in self.db.query(
+                Prerequisite.subject_id,
+                Prerequisite.prerequisite_subject_id,
+                Prerequisite.type,
+                prerequisite_subject.name
+            ).join(
+                subject, Prerequisite.subject_id == subject.id
+            ).outerjoin(
+                prerequisite_subject, Prerequisite.prerequisite_subject_id == prerequisite_subject.id
+            ).filter(
+                subject.program_id == program_id
+            ).order_by(Prerequisite.id).all()
+        ]
 
 
 class ProgramRepository(BaseRepository[Program]):
@@ -66,6 +92,22 @@ class CourseSectionRepository(BaseRepository[CourseSection]):
             joinedload(CourseSection.section_schedules)
         ).filter(CourseSection.id == section_id).first()
     
+    def get_with_schedules(self, section_ids: List[int]) -> Dict[int, CourseSection]:
+        """
+        Carga varias secciones con su asignatura, cupos y horarios en una sola consulta (JOIN).
+        
+        Returns:
+            {section_id: sección} (las secciones inexistentes no aparecen)
+        """
+        section_ids = list(dict.fromkeys(section_ids))
+        if not section_ids:
+            return {}
+        db_sections = self.db.query(CourseSection).options(
+            joinedload(CourseSection.subject),
+            joinedload(CourseSection.section_schedules)
+        ).filter(CourseSection.id.in_(section_ids)).all()
+        return {section.id: section for section in db_sections}
+    
     def get_by_subject(self, subject_id: int, period_id: Optional[int] = None) -> List[CourseSection]:
         """Obtiene secciones de una asignatura"""
         query = self.db.query(CourseSection).filter(
@@ -74,6 +116,90 @@ class CourseSectionRepository(BaseRepository[CourseSection]):
         if period_id:
             query = query.filter(CourseSection.period_id == period_id)
         return query.all()
+    
+    def get_engine_sections(self, subject_ids: List[int], period_id: int) -> List[Section]:
+        """
+        Carga las secciones de varias asignaturas en un período, con sus horarios y
+        los datos de la asignatura, y las convierte al modelo del motor de horarios.
+        
+        Usa dos consultas en total (secciones + asignatura con JOIN, y horarios con
+        selectinload), sin importar el número de asignaturas o secciones.
+        
+        Returns:
+            Secciones agrupadas en el orden de subject_ids (por ID dentro de cada asignatura)
+        """
+        subject_ids = list(dict.fromkeys(subject_ids))
+        if not subject_ids:
+            return []
+        
+        sections_by_subject: Dict[int, List[Section]] = {}
+        for section in self._load_engine_sections(
+            CourseSection.subject_id.in_(subject_ids),
+            CourseSection.period_id == period_id
+        ):
+            sections_by_subject.setdefault(section.subject_id, []).append(section)
+        
+        return [
+            section
+            for subject_id in subject_ids
+            for section in sections_by_subject.get(subject_id, [])
+        ]
+    
+    def get_engine_sections_by_period(self, period_id: int) -> List[Section]:
+        """Carga toda la oferta de un período como secciones del motor (ordenadas por ID)"""
+        return self._load_engine_sections(CourseSection.period_id == period_id)
+    
+    def get_offered_subject_ids(self, period_id: int) -> Set[int]:
+        """IDs de las asignaturas con al menos una sección en el período (una consulta)"""
+        rows = self.db.query(CourseSection.subject_id).filter(
+            CourseSection.period_id == period_id
+        ).distinct().all()
+        return {subject_id for (subject_id,) in rows}
+    
+    def get_seats(self, period_id: int, subject_ids: Optional[List[int]] = None) -> Dict[int, Tuple[int, int]]:
+        """
+        Cupos e inscritos por sección del período ({section_id: (capacity, enrolled_count)}),
+        solo de las asignaturas dadas si se indican, en una consulta
+        """
+        query = self.db.query(CourseSection.id, CourseSection.capacity, CourseSection.enrolled_count).filter(
+            CourseSection.period_id == period_id
+        )
+        if subject_ids is not None:
+            query = query.filter(CourseSection.subject_id.in_(subject_ids))
+        return {section_id: (capacity, enrolled_count) for section_id, capacity, enrolled_count in query.all()}
+    
+    def _load_engine_sections(self, *criteria) -> List[Section]:
+        """Consulta secciones (con asignatura y horarios precargados) y las convierte al modelo del motor"""
+        db_sections = self.db.query(CourseSection).options(
+            joinedload(CourseSection.subject),
+            selectinload(CourseSection.section_schedules)
+        ).filter(*criteria).order_by(CourseSection.id).all()
+        
+        sections = []
+        for db_section in db_sections:
+            subject = db_section.subject
+            timeslots = [
+                TimeSlot(
+                    id=schedule.id,
+                    day_of_week=schedule.day_of_week,
+                    start_time=schedule.start_time,
+                    end_time=schedule.end_time
+                )
+                for schedule in sorted(db_section.section_schedules, key=lambda s: s.id)
+            ]
+            sections.append(Section(
+                id=db_section.id,
+                subject_id=db_section.subject_id,
+                subject_code=subject.code if subject else f"SUB{db_section.subject_id}",
+                subject_name=subject.name if subject else "Asignatura desconocida",
+                professor_id=db_section.professor_id,
+                classroom_id=db_section.classroom_id,
+                capacity=db_section.capacity,
+                enrolled_count=db_section.enrolled_count,
+                section_number=db_section.section_number,
+                timeslots=timeslots
+            ))
+        return sections
 
 
 class AcademicPeriodRepository(BaseRepository[AcademicPeriod]):
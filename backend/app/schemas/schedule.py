@@ -1,7 +1,7 @@
 """
 Schemas Pydantic para horarios y secciones
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date, time, datetime
 from typing import Optional, List, Dict, Any
 
@@ -125,7 +125,45 @@ class ScheduleGenerationRequest(BaseModel):
     student_id: int
     selected_subject_ids: List[int]
     academic_period_id: Optional[int] = None
-    optimization_level: Optional[str] = "none"  # "none" | "low" | "medium" | "high"
+    optimization_level: Optional[str] = "none"  # "none" | "exact" | "low" | "medium" | "high"
+    solver_profile: Optional[str] = None  # "latency" | "throughput" (por defecto, el de la configuración)
+    k: int = 1  # Número de horarios alternativos a retornar (K mejores distintos entre sí)
+    min_distance: Optional[int] = None  # Asignaturas con distinta sección entre alternativos (por defecto, el de la configuración)
+
+
+class ScheduleDeltaRequest(BaseModel):
+    """Petición para ajustar un horario generado agregando o quitando asignaturas"""
+    base_schedule_id: int
+    added_subject_ids: List[int] = []
+    removed_subject_ids: List[int] = []
+
+
+class ScheduleBatchJob(BaseModel):
+    """Trabajo individual de una generación de horarios por lotes"""
+    student_id: int
+    selected_subject_ids: List[int]
+    optimization_level: Optional[str] = "none"  # "none" | "exact" | "low" | "medium" | "high"
+
+
+class ScheduleBatchRequest(BaseModel):
+    """Petición para generar horarios de muchos estudiantes"""
+    jobs: List[ScheduleBatchJob]
+    academic_period_id: Optional[int] = None
+    max_workers: Optional[int] = Field(None, ge=1)  # Por defecto y como máximo, los núcleos disponibles
+
+
+class CohortStudentRequest(BaseModel):
+    """Estudiante de una asignación conjunta de cohorte"""
+    student_id: int
+    selected_subject_ids: List[int]
+    priority: float = 1.0  # Peso en el objetivo, >= 0 (ej: semestre, promedio, matrícula prioritaria)
+
+
+class CohortScheduleRequest(BaseModel):
+    """Petición para asignar horarios a una cohorte con cupos compartidos"""
+    students: List[CohortStudentRequest]
+    academic_period_id: Optional[int] = None
+    fairness: bool = False  # Rendimientos decrecientes: primero una asignatura más a quien tiene menos
 
 
 class UnassignedSubjectInfo(BaseModel):
@@ -137,6 +175,15 @@ class UnassignedSubjectInfo(BaseModel):
     conflicting_sections: List[dict]
 
 
+class ScheduleAlternativeInfo(BaseModel):
+    """Horario alternativo de una generación con k > 1"""
+    rank: int  # 1 = horario principal
+    section_ids: List[int]
+    subject_ids: List[int]
+    quality_score: float  # Menor = mejor
+    min_distance: Optional[int] = None  # Distancia al alternativo más parecido de mejor rango
+
+
 class ScheduleSolutionResponse(BaseModel):
     """Respuesta de generación de horario"""
     student_id: int
@@ -148,11 +195,47 @@ class ScheduleSolutionResponse(BaseModel):
     conflicts: List[str]
     solver_status: str
     quality_score: Optional[float] = None  # Score de calidad (menor = mejor)
+    metadata: Dict[str, Any] = {}  # Métricas del motor (ej: aciertos de caché de fitness)
+    alternatives: List[ScheduleAlternativeInfo] = []  # Solo si se pidieron k > 1 horarios
 
     class Config:
         from_attributes = True
 
 
+class ScheduleJobRead(BaseModel):
+    """Estado de un trabajo asíncrono de generación de horario"""
+    job_id: str
+    status: str  # "pending" | "running" | "completed" | "failed"
+    student_id: Optional[int] = None
+    optimization_level: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[ScheduleSolutionResponse] = None  # Solo si status = "completed"
+    error: Optional[str] = None  # Solo si status = "failed"
+    error_status_code: Optional[int] = None  # Código HTTP equivalente del modo síncrono
+
+
+class CohortStudentResult(BaseModel):
+    """Resultado de un estudiante en la asignación conjunta de cohorte"""
+    student_id: int
+    status: str  # "completed" | "error"
+    schedule_id: Optional[int] = None
+    solution: Optional[ScheduleSolutionResponse] = None
+    error: Optional[str] = None
+
+
+class CohortScheduleResponse(BaseModel):
+    """Respuesta de la asignación conjunta de cohorte"""
+    academic_period_id: Optional[int] = None
+    students: int
+    components: int  # Subproblemas independientes resueltos
+    largest_component: int  # Estudiantes del subproblema más grande
+    contested_sections: int  # Secciones con más demanda que cupos
+    processing_time: float
+    results: List[CohortStudentResult]
+
+
 class ScheduleSlotDetailRead(BaseModel):
     """Detalle de un slot de horario con información de la sección"""
     id: int
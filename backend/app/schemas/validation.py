@@ -34,6 +34,26 @@ class EnrollmentValidationResult(BaseModel):
         from_attributes = True
 
 
+class EnrollmentBatchValidationRequest(BaseModel):
+    """Petición para validar muchas solicitudes de matrícula (ej: validación nocturna)"""
+    requests: List[EnrollmentRequest]
+
+
+class EnrollmentBatchValidationItem(EnrollmentValidationResult):
+    """Resultado de una solicitud dentro de la validación por lotes"""
+    request_index: int  # Posición en la petición
+    student_id: int
+
+
+class EnrollmentBatchValidationResponse(BaseModel):
+    """Respuesta de la validación por lotes"""
+    total: int
+    valid: int  # Solicitudes sin ninguna validación fallida
+    can_proceed: int  # Solicitudes que pasan todas las validaciones críticas
+    processing_time: float
+    results: List[EnrollmentBatchValidationItem]
+
+
 class SubjectEligibilityInfo(BaseModel):
     """Información de elegibilidad de una asignatura"""
     subject_id: int
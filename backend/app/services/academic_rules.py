@@ -0,0 +1,108 @@
+"""
+Reglas académicas institucionales (source.academic_rules), tipadas y cacheadas en memoria
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.logging import logger
+from app.repositories.rule_repository import AcademicRuleRepository
+
+RuleValue = Union[int, float, bool, str]
+
+# Valores por defecto si la regla no está definida
+DEFAULT_MAX_CREDITS = 20
+DEFAULT_MIN_CREDITS = 8
+
+
+def parse_rule_value(raw_value: str) -> RuleValue:
+    """Interpreta rule_value: entero, decimal, booleano ('true'/'false') o texto"""
+    value = raw_value.strip()
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    return value
+
+
+class AcademicRules:
+    """
+    Reglas académicas vigentes con sus valores ya interpretados.
+
+    Se carga con una consulta y se comparte entre peticiones (get_academic_rules), así
+    que leer una regla no consulta la base de datos. version solo cambia cuando una
+    recarga trae valores distintos.
+    """
+
+    def __init__(self, rules: List[Tuple[str, str]], version: int = 1):
+        """
+        Args:
+            rules: (rule_type, rule_value) de cada regla, por ID
+            version: Versión de las reglas
+        """
+        self.version = version
+        self.built_at = time.time()
+
+        # Si un tipo de regla está repetido, vale la primera (por ID)
+        self.values: Dict[str, RuleValue] = {}
+        for rule_type, raw_value in rules:
+            self.values.setdefault(rule_type, parse_rule_value(raw_value))
+
+        self.max_credits = self.get_int('max_credits', DEFAULT_MAX_CREDITS)
+        self.min_credits = self.get_int('min_credits', DEFAULT_MIN_CREDITS)
+
+    def get(self, rule_type: str, default: Optional[RuleValue] = None) -> Optional[RuleValue]:
+        """Valor interpretado de una regla (default si no existe)"""
+        return self.values.get(rule_type, default)
+
+    def get_int(self, rule_type: str, default: int) -> int:
+        """Valor entero de una regla (default si no existe o no es numérica)"""
+        value = self.values.get(rule_type)
+        if value is None:
+            return default
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            logger.warning(f"La regla académica '{rule_type}' no es numérica ({value!r}): se usa el valor por defecto {default}")
+            return default
+        return int(value)
+
+
+# Reglas cacheadas (compartidas por todas las peticiones del proceso)
+_rules: Optional[AcademicRules] = None
+_rules_stale = False
+_rules_lock = threading.Lock()
+
+
+def get_academic_rules(db: Session) -> AcademicRules:
+    """
+    Obtiene las reglas académicas (una consulta si no están en caché o vencieron).
+
+    Args:
+        db: Sesión de base de datos
+    """
+    global _rules, _rules_stale
+    with _rules_lock:
+        rules = None if _rules_stale else _rules
+    if rules is not None and time.time() - rules.built_at <= settings.ACADEMIC_RULES_TTL_SECONDS:
+        return rules
+
+    loaded = AcademicRules(AcademicRuleRepository(db).get_rule_values())
+    with _rules_lock:
+        previous = _rules
+        if previous is not None:
+            loaded.version = previous.version if loaded.values == previous.values else previous.version + 1
+        _rules = loaded
+        _rules_stale = False
+    return loaded
+
+
+def invalidate_academic_rules():
+    """Descarta las reglas cacheadas: la siguiente lectura las recarga (ej: tras editarlas)"""
+    global _rules_stale
+    with _rules_lock:
+        _rules_stale = True
@@ -0,0 +1,97 @@
+"""
+Service para calcular la elegibilidad de asignaturas de un estudiante
+"""
+from typing import List
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.repositories.student_repository import StudentRepository
+from app.repositories.subject_repository import SubjectRepository, CourseSectionRepository
+from app.models.source.student_data import GradeStatus
+from app.schemas.validation import SubjectEligibilityInfo
+from app.services.prerequisite_graph import get_prerequisite_graph
+from app.services.validation_service import missing_prerequisites_message
+
+
+class EligibilityService:
+    """
+    Calcula en bloque qué asignaturas del programa puede cursar un estudiante.
+    
+    Usa un número constante de consultas, sin importar el tamaño del programa:
+    historial académico, asignaturas del programa, asignaturas ofertadas en el
+    período y el grafo de prerrequisitos (cacheado). Todas las filas se calculan
+    en memoria con operaciones de conjuntos.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.student_repo = StudentRepository(db)
+        self.subject_repo = SubjectRepository(db)
+        self.section_repo = CourseSectionRepository(db)
+    
+    def get_eligible_subjects(
+        self,
+        student_id: int,
+        program_id: int,
+        academic_period_id: int
+    ) -> List[SubjectEligibilityInfo]:
+        """
+        Elegibilidad de las asignaturas del programa con secciones en el período.
+        
+        Args:
+            student_id: ID del estudiante
+            program_id: ID del programa del estudiante
+            academic_period_id: ID del período académico
+        
+        Returns:
+            Una fila por asignatura ofertada (en el orden de las asignaturas del programa)
+        """
+        all_subjects = self.subject_repo.get_by_program(program_id, limit=settings.MAX_SUBJECTS_PER_QUERY)
+        
+        academic_history = self.student_repo.get_academic_history(student_id)
+        approved_subject_ids = {h.subject_id for h in academic_history if h.status == GradeStatus.APROBADO.value}
+        
+        offered_subject_ids = self.section_repo.get_offered_subject_ids(academic_period_id)
+        prerequisite_graph = get_prerequisite_graph(self.db, program_id)
+        
+        eligible_subjects = []
+        
+        for subject in all_subjects:
+            # Solo considerar asignaturas que tienen secciones disponibles
+            if subject.id not in offered_subject_ids:
+                continue
+            
+            prerequisite_ids = prerequisite_graph.prerequisite_ids_of(subject.id)
+            prerequisites_met = [p for p in prerequisite_ids if p in approved_subject_ids]
+            prerequisites_missing = [p for p in prerequisite_ids if p not in approved_subject_ids]
+            prerequisite_names_missing = [
+                prerequisite_graph.name_of(p) or f"Asignatura ID {p}"
+                for p in prerequisites_missing
+            ]
+            
+            # Mismo criterio y mensaje que ValidationService.validate_prerequisites
+            is_eligible = not prerequisites_missing
+            already_approved = subject.id in approved_subject_ids
+            reason = None
+            if not is_eligible:
+                reason = missing_prerequisites_message([
+                    prerequisite_graph.name_of(p) or f"ID {p}"
+                    for p in prerequisites_missing
+                ])
+            elif already_approved:
+                reason = "Ya aprobaste esta asignatura"
+            
+            eligible_subjects.append(SubjectEligibilityInfo(
+                subject_id=subject.id,
+                subject_code=subject.code,
+                subject_name=subject.name,
+                credits=subject.credits,
+                is_eligible=is_eligible,
+                prerequisites_met=prerequisites_met,
+                prerequisites_missing=prerequisites_missing,
+                prerequisite_names_missing=prerequisite_names_missing,
+                can_enroll=is_eligible and not already_approved,
+                reason=reason
+            ))
+        
+        return eligible_subjects
@@ -1,18 +1,21 @@
 """
 Service para lógica de negocio de matrícula
 """
+import time
 from typing import List
 from sqlalchemy.orm import Session
 
 from app.repositories.enrollment_repository import EnrollmentRepository
 from app.repositories.subject_repository import CourseSectionRepository
 from app.repositories.student_repository import StudentRepository
-from app.services.validation_service import ValidationService
+from app.services.validation_service import ValidationService, EnrollmentValidationData
 from app.schemas.enrollment import EnrollmentRead
 from app.schemas.validation import (
     EnrollmentValidationResult,
     ValidationResult,
-    EnrollmentRequest
+    EnrollmentRequest,
+    EnrollmentBatchValidationItem,
+    EnrollmentBatchValidationResponse
 )
 
 
@@ -44,13 +47,60 @@ class EnrollmentService:
         Ejecuta todas las validaciones necesarias para una solicitud de matrícula.
         Retorna resultado consolidado.
         """
+        data = self.validation_service.load_validation_data([request.student_id], request.section_ids)
+        return self._validate_request(request, data)
+    
+    def validate_enrollment_requests(
+        self,
+        requests: List[EnrollmentRequest]
+    ) -> EnrollmentBatchValidationResponse:
+        """
+        Valida muchas solicitudes de matrícula (ej: validación nocturna antes de abrir matrícula).
+        
+        Estudiantes, estados financieros, historiales, reglas de créditos y secciones de todas
+        las solicitudes se precargan con un número constante de consultas; luego cada solicitud
+        se evalúa en memoria con las mismas reglas que validate_enrollment_request.
+        
+        Returns:
+            Resumen y un resultado por solicitud, en el orden de la petición
+        """
+        start_time = time.time()
+        
+        data = self.validation_service.load_validation_data(
+            [request.student_id for request in requests],
+            [section_id for request in requests for section_id in request.section_ids]
+        )
+        
+        results = []
+        for request_index, request in enumerate(requests):
+            result = self._validate_request(request, data)
+            results.append(EnrollmentBatchValidationItem(
+                request_index=request_index,
+                student_id=request.student_id,
+                **result.model_dump()
+            ))
+        
+        return EnrollmentBatchValidationResponse(
+            total=len(results),
+            valid=sum(1 for r in results if r.is_valid),
+            can_proceed=sum(1 for r in results if r.can_proceed),
+            processing_time=time.time() - start_time,
+            results=results
+        )
+    
+    def _validate_request(
+        self,
+        request: EnrollmentRequest,
+        data: EnrollmentValidationData
+    ) -> EnrollmentValidationResult:
+        """Validaciones de una solicitud sobre datos precargados (sin consultas por regla)"""
         student_id = request.student_id
         section_ids = request.section_ids
         
         validations: List[ValidationResult] = []
         
         # 0. Verificar que el estudiante existe
-        student = self.student_repo.get_by_id(student_id)
+        student = data.students.get(student_id)
         if not student:
             return EnrollmentValidationResult(
                 is_valid=False,
@@ -60,7 +110,7 @@ class EnrollmentService:
             )
         
         # 1. Validar estado financiero (crítico - bloquea todo)
-        financial_validation = self.validation_service.validate_financial_status(student_id)
+        financial_validation = self.validation_service.validate_financial_status(student_id, data)
         validations.append(financial_validation)
         
         if not financial_validation.is_valid:
@@ -72,9 +122,8 @@ class EnrollmentService:
                 error_summary=f"Bloqueo financiero: {financial_validation.message}"
             )
         
-        # 2. Obtener subject_ids de las secciones seleccionadas
-        sections = [self.section_repo.get_by_id(sid) for sid in section_ids]
-        sections = [s for s in sections if s is not None]  # Filtrar None
+        # 2. Obtener subject_ids de las secciones seleccionadas (precargadas con cupos y horarios)
+        sections = [data.sections[sid] for sid in section_ids if sid in data.sections]
         
         if not sections:
             return EnrollmentValidationResult(
@@ -101,31 +150,34 @@ class EnrollmentService:
             prereq_validation = self.validation_service.validate_prerequisites(
                 student_id=student_id,
                 subject_id=subject_id,
-                selected_subject_ids=selected_subject_ids
+                selected_subject_ids=selected_subject_ids,
+                data=data
             )
             validations.append(prereq_validation)
         
         # 4. Validar cupos de cada sección
         for section_id in section_ids:
-            capacity_validation = self.validation_service.validate_section_capacity(section_id)
+            capacity_validation = self.validation_service.validate_section_capacity(section_id, data.sections)
             validations.append(capacity_validation)
         
         # 5. Validar límite de créditos
         credit_validation = self.validation_service.validate_credit_limit(
             student_id=student_id,
-            selected_subject_ids=selected_subject_ids
+            selected_subject_ids=selected_subject_ids,
+            data=data
         )
         validations.append(credit_validation)
         
         # 6. Validar choques de horario
-        conflict_validation = self.validation_service.validate_schedule_conflicts(section_ids)
+        conflict_validation = self.validation_service.validate_schedule_conflicts(section_ids, data.sections)
         validations.append(conflict_validation)
         
         # 7. Validar matrículas duplicadas para cada asignatura ÚNICA (no por sección)
         for subject_id in unique_subject_ids:
             duplicate_validation = self.validation_service.validate_duplicate_enrollment(
                 student_id=student_id,
-                subject_id=subject_id
+                subject_id=subject_id,
+                data=data
             )
             validations.append(duplicate_validation)
         
@@ -0,0 +1,287 @@
+"""
+Foto (snapshot) en memoria de la oferta académica de un período.
+
+La oferta (secciones, bloques de horario y datos de asignatura) casi no cambia
+durante la matrícula, así que se carga una sola vez por período y se reutiliza
+entre peticiones. En cada uso solo se consultan los cupos e inscritos de las
+secciones de las asignaturas pedidas (una consulta) y se aplican en la foto.
+"""
+import pickle
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.logging import logger
+from app.repositories.subject_repository import CourseSectionRepository
+from app.services.schedule_engine.models import Section
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.offer_table import OfferTable, SectionView
+
+try:
+    import redis
+except ImportError:
+    # Redis es opcional: sin él la foto solo vive en el proceso
+    redis = None
+
+
+REDIS_KEY_PREFIX = "sghu:offer"
+
+
+@dataclass(frozen=True)
+class OfferSnapshot:
+    """
+    Foto inmutable y versionada de la oferta de un período.
+    
+    La versión identifica la estructura de la oferta (época del período + huella de las
+    secciones, profesores, aulas y horarios), no los cupos: capacity y enrolled_count se
+    actualizan en sitio en la tabla de oferta (update_seats), sin cambiar la versión.
+    Las secciones son vistas de solo lectura sobre la tabla (OfferTable), compartidas
+    entre peticiones.
+    """
+    period_id: int
+    version: str
+    table: OfferTable
+    sections: Tuple[SectionView, ...]
+    sections_by_subject: Mapping[int, Tuple[SectionView, ...]]
+    conflict_index: ConflictIndex
+    built_at: float
+    epoch: int = 0
+    
+    @classmethod
+    def build(
+        cls,
+        period_id: int,
+        version: str,
+        sections: Union[OfferTable, Iterable[Section]],
+        conflict_index: Optional[ConflictIndex] = None,
+        built_at: Optional[float] = None,
+        epoch: int = 0
+    ) -> "OfferSnapshot":
+        """
+        Construye la foto a partir de una tabla de oferta (o de secciones, que se pasan a
+        tabla), agrupando las secciones por asignatura (y el índice si no se proporciona)
+        """
+        table = sections if isinstance(sections, OfferTable) else OfferTable.from_sections(sections)
+        sections = tuple(table.sections())
+        grouped: Dict[int, List[SectionView]] = {}
+        for section in sections:
+            grouped.setdefault(section.subject_id, []).append(section)
+        return cls(
+            period_id=period_id,
+            version=version,
+            table=table,
+            sections=sections,
+            sections_by_subject={subject_id: tuple(items) for subject_id, items in grouped.items()},
+            conflict_index=conflict_index if conflict_index is not None else ConflictIndex(sections),
+            built_at=built_at if built_at is not None else time.time(),
+            epoch=epoch
+        )
+    
+    def sections_for(self, subject_ids: Iterable[int]) -> List[SectionView]:
+        """Secciones de las asignaturas dadas, en el orden de subject_ids (sin repetir asignaturas)"""
+        return [
+            section
+            for subject_id in dict.fromkeys(subject_ids)
+            for section in self.sections_by_subject.get(subject_id, ())
+        ]
+    
+    def update_seats(self, seats: Mapping[int, Tuple[int, int]]) -> int:
+        """
+        Aplica en sitio los cupos e inscritos actuales ({section_id: (capacity, enrolled_count)});
+        las secciones de la foto los ven sin reconstruirse.
+        
+        Returns:
+            Número de secciones con cambios
+        """
+        return self.table.update_seats(seats)
+
+
+class OfferSnapshotStore:
+    """
+    Almacén de fotos de oferta por período (en proceso, con capa Redis opcional).
+    
+    En cada get():
+    1. La estructura (secciones, horarios, datos de asignatura) se reutiliza mientras no
+       cambie la época del período (bump_version, compartida vía Redis si está activo) y
+       la foto no supere la edad máxima.
+    2. Cupos e inscritos de las secciones de las asignaturas pedidas (una consulta) se
+       aplican en sitio en la foto.
+    
+    Quien modifique secciones u horarios del período debe llamar a bump_offer_version();
+    si no, el cambio se ve al reconstruir la foto por edad (OFFER_SNAPSHOT_MAX_AGE_SECONDS).
+    """
+    
+    def __init__(
+        self,
+        max_age_seconds: float = 900.0,
+        use_redis: bool = False,
+        redis_url: Optional[str] = None
+    ):
+        """
+        Args:
+            max_age_seconds: Edad máxima antes de reconstruir la foto desde la base de datos
+            use_redis: Compartir época y fotos entre procesos vía Redis
+            redis_url: URL de Redis (por defecto settings.REDIS_URL)
+        """
+        self.max_age_seconds = max_age_seconds
+        self._snapshots: Dict[int, OfferSnapshot] = {}
+        self._epochs: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        if use_redis:
+            self._redis = self._connect_redis(redis_url or settings.REDIS_URL)
+    
+    @staticmethod
+    def _connect_redis(redis_url: str):
+        """Crea el cliente de Redis; si no está disponible se trabaja solo en proceso"""
+        if redis is None:
+            logger.warning("Paquete redis no instalado: la foto de oferta solo se guardará en proceso")
+            return None
+        try:
+            client = redis.Redis.from_url(redis_url)
+            client.ping()
+            return client
+        except Exception as e:
+            logger.warning(f"Redis no disponible para la foto de oferta ({str(e)}): se usará solo en proceso")
+            return None
+    
+    def get(self, db: Session, period_id: int, subject_ids: Optional[Iterable[int]] = None) -> OfferSnapshot:
+        """
+        Obtiene la foto vigente de la oferta del período.
+        
+        Args:
+            db: Sesión de base de datos
+            period_id: ID del período académico
+            subject_ids: Asignaturas cuyos cupos e inscritos se refrescan (por defecto, todas)
+        """
+        section_repo = CourseSectionRepository(db)
+        epoch = self._current_epoch(period_id)
+        
+        with self._lock:
+            snapshot = self._snapshots.get(period_id)
+        if (
+            snapshot is None
+            or snapshot.epoch != epoch
+            or time.time() - snapshot.built_at > self.max_age_seconds
+        ):
+            table = self._load_from_redis(period_id, epoch)
+            if table is None:
+                table = OfferTable.from_sections(section_repo.get_engine_sections_by_period(period_id))
+                self._store_in_redis(period_id, epoch, table)
+            version = f"{epoch}-{table.structure_digest()}"
+            snapshot = OfferSnapshot.build(period_id, version, table, epoch=epoch)
+            logger.info(
+                f"Foto de oferta del período {period_id} construida "
+                f"(versión {version}, {len(snapshot.sections)} secciones)"
+            )
+            with self._lock:
+                self._snapshots[period_id] = snapshot
+        
+        subject_ids = list(dict.fromkeys(subject_ids)) if subject_ids is not None else None
+        if subject_ids is None or subject_ids:
+            snapshot.update_seats(section_repo.get_seats(period_id, subject_ids))
+        return snapshot
+    
+    def bump_version(self, period_id: int) -> int:
+        """
+        Incrementa la época del período: la próxima petición reconstruye la foto.
+        Llamar cuando se modifiquen secciones, horarios o asignaturas del período.
+        
+        Returns:
+            Nueva época
+        """
+        with self._lock:
+            self._snapshots.pop(period_id, None)
+            epoch = self._epochs.get(period_id, 0) + 1
+            self._epochs[period_id] = epoch
+        if self._redis is not None:
+            try:
+                epoch = int(self._redis.incr(self._epoch_key(period_id)))
+            except Exception as e:
+                logger.warning(f"No se pudo incrementar la época de la oferta en Redis: {str(e)}")
+        return epoch
+    
+    def invalidate(self, period_id: Optional[int] = None):
+        """Descarta las fotos en proceso (de un período o todas), sin cambiar la época"""
+        with self._lock:
+            if period_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(period_id, None)
+    
+    def _current_epoch(self, period_id: int) -> int:
+        """Época vigente del período (la de Redis si está disponible)"""
+        if self._redis is not None:
+            try:
+                value = self._redis.get(self._epoch_key(period_id))
+                return int(value) if value is not None else 0
+            except Exception as e:
+                logger.warning(f"No se pudo leer la época de la oferta en Redis: {str(e)}")
+        with self._lock:
+            return self._epochs.get(period_id, 0)
+    
+    @staticmethod
+    def _epoch_key(period_id: int) -> str:
+        return f"{REDIS_KEY_PREFIX}:{period_id}:epoch"
+    
+    @staticmethod
+    def _sections_key(period_id: int, epoch: int) -> str:
+        return f"{REDIS_KEY_PREFIX}:{period_id}:{epoch}"
+    
+    def _load_from_redis(self, period_id: int, epoch: int) -> Optional[OfferTable]:
+        """Obtiene la tabla de oferta de otra instancia desde Redis (None si no está)"""
+        if self._redis is None:
+            return None
+        try:
+            payload = self._redis.get(self._sections_key(period_id, epoch))
+            if payload is None:
+                return None
+            table = pickle.loads(payload)
+            # Entradas de versiones anteriores guardaban la lista de secciones
+            return table if isinstance(table, OfferTable) else OfferTable.from_sections(table)
+        except Exception as e:
+            logger.warning(f"No se pudo leer la foto de oferta desde Redis: {str(e)}")
+            return None
+    
+    def _store_in_redis(self, period_id: int, epoch: int, table: OfferTable):
+        """Publica la tabla de oferta en Redis para otras instancias (expira con la edad máxima)"""
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(
+                self._sections_key(period_id, epoch),
+                pickle.dumps(table, protocol=pickle.HIGHEST_PROTOCOL),
+                ex=max(1, int(self.max_age_seconds))
+            )
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la foto de oferta en Redis: {str(e)}")
+
+
+_store: Optional[OfferSnapshotStore] = None
+_store_lock = threading.Lock()
+
+
+def get_offer_snapshot_store() -> OfferSnapshotStore:
+    """Almacén de fotos del proceso (se crea con la configuración en el primer uso)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OfferSnapshotStore(
+                max_age_seconds=settings.OFFER_SNAPSHOT_MAX_AGE_SECONDS,
+                use_redis=settings.OFFER_SNAPSHOT_REDIS
+            )
+        return _store
+
+
+def get_offer_snapshot(db: Session, period_id: int, subject_ids: Optional[Iterable[int]] = None) -> OfferSnapshot:
+    """Foto vigente de la oferta del período, con los cupos de subject_ids (por defecto, todas) al día"""
+    return get_offer_snapshot_store().get(db, period_id, subject_ids)
+
+
+def bump_offer_version(period_id: int) -> int:
+    """Invalida la foto de oferta del período (llamar tras modificar secciones u horarios)"""
+    return get_offer_snapshot_store().bump_version(period_id)
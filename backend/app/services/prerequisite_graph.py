@@ -0,0 +1,134 @@
+"""
+Grafo (DAG) de prerrequisitos por programa, cacheado en memoria
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.repositories.subject_repository import SubjectRepository
+
+PrerequisiteEdge = Tuple[int, str]  # (prerequisite_subject_id, tipo)
+
+
+class PrerequisiteGraph:
+    """
+    Red de prerrequisitos de las asignaturas de un programa.
+
+    Guarda listas de adyacencia (asignatura -> prerrequisitos) separadas por tipo:
+    - required: aristas 'obligatorio' (deben estar aprobadas)
+    - corequisites: aristas 'correquisito' (pueden cursarse en el mismo período)
+
+    Verificar los prerrequisitos de un estudiante es una diferencia de conjuntos
+    contra sus asignaturas aprobadas, sin consultas a la base de datos.
+    """
+
+    def __init__(
+        self,
+        program_id: int,
+        edges: Iterable[Tuple[int, int, str, Optional[str]]],
+        built_at: Optional[float] = None
+    ):
+        """
+        Args:
+            program_id: ID del programa
+            edges: Aristas (subject_id, prerequisite_subject_id, tipo, nombre del prerrequisito)
+            built_at: Momento de construcción (para la caducidad de la caché)
+        """
+        self.program_id = program_id
+        self.built_at = built_at if built_at is not None else time.time()
+
+        edges_by_subject: Dict[int, List[PrerequisiteEdge]] = {}
+        self._names: Dict[int, str] = {}
+        for subject_id, prerequisite_subject_id, prerequisite_type, prerequisite_name in edges:
+            edges_by_subject.setdefault(subject_id, []).append((prerequisite_subject_id, prerequisite_type))
+            if prerequisite_name is not None:
+                self._names[prerequisite_subject_id] = prerequisite_name
+
+        # Listas de adyacencia inmutables (en el orden de la tabla de prerrequisitos)
+        self.edges: Dict[int, Tuple[PrerequisiteEdge, ...]] = {
+            subject_id: tuple(items) for subject_id, items in edges_by_subject.items()
+        }
+        self.required: Dict[int, Tuple[int, ...]] = {
+            subject_id: tuple(p for p, t in items if t == 'obligatorio')
+            for subject_id, items in self.edges.items()
+        }
+        self.corequisites: Dict[int, Tuple[int, ...]] = {
+            subject_id: tuple(p for p, t in items if t == 'correquisito')
+            for subject_id, items in self.edges.items()
+        }
+
+    def has_prerequisites(self, subject_id: int) -> bool:
+        """Indica si la asignatura tiene algún prerrequisito o correquisito"""
+        return subject_id in self.edges
+
+    def prerequisites_of(self, subject_id: int) -> Tuple[PrerequisiteEdge, ...]:
+        """Aristas (prerequisite_subject_id, tipo) de la asignatura"""
+        return self.edges.get(subject_id, ())
+
+    def prerequisite_ids_of(self, subject_id: int) -> List[int]:
+        """IDs de todos los prerrequisitos de la asignatura (cualquier tipo)"""
+        return [p for p, _ in self.edges.get(subject_id, ())]
+
+    def missing_required(self, subject_id: int, approved_subject_ids: Set[int]) -> List[int]:
+        """Prerrequisitos obligatorios no aprobados"""
+        return [p for p in self.required.get(subject_id, ()) if p not in approved_subject_ids]
+
+    def missing_prerequisites(
+        self,
+        subject_id: int,
+        approved_subject_ids: Set[int],
+        selected_subject_ids: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        """
+        Prerrequisitos (de cualquier tipo) que faltan, contando la selección actual como
+        cursada (así se admiten los correquisitos inscritos en el mismo período).
+        """
+        satisfied = approved_subject_ids
+        if selected_subject_ids:
+            satisfied = set(approved_subject_ids)
+            satisfied.update(selected_subject_ids)
+        return [p for p, _ in self.edges.get(subject_id, ()) if p not in satisfied]
+
+    def meets_required(self, subject_id: int, approved_subject_ids: Set[int]) -> bool:
+        """Indica si todos los prerrequisitos obligatorios están aprobados"""
+        return all(p in approved_subject_ids for p in self.required.get(subject_id, ()))
+
+    def name_of(self, subject_id: int) -> Optional[str]:
+        """Nombre de una asignatura que aparece como prerrequisito (None si no se conoce)"""
+        return self._names.get(subject_id)
+
+
+# Grafos cacheados por programa
+_graphs: Dict[int, PrerequisiteGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_prerequisite_graph(db: Session, program_id: int) -> PrerequisiteGraph:
+    """
+    Obtiene el grafo de prerrequisitos del programa (una consulta si no está en caché).
+
+    Args:
+        db: Sesión de base de datos
+        program_id: ID del programa
+    """
+    with _graphs_lock:
+        graph = _graphs.get(program_id)
+    if graph is not None and time.time() - graph.built_at <= settings.PREREQUISITE_GRAPH_TTL_SECONDS:
+        return graph
+
+    graph = PrerequisiteGraph(program_id, SubjectRepository(db).get_prerequisite_edges(program_id))
+    with _graphs_lock:
+        _graphs[program_id] = graph
+    return graph
+
+
+def invalidate_prerequisite_graphs(program_id: Optional[int] = None):
+    """Descarta los grafos cacheados (de un programa o todos)"""
+    with _graphs_lock:
+        if program_id is None:
+            _graphs.clear()
+        else:
+            _graphs.pop(program_id, None)
@@ -3,6 +3,7 @@ Motor de generación de horarios usando OR-Tools (CP-SAT)
 """
 from app.services.schedule_engine.models import TimeSlot, Section, Student
 from app.services.schedule_engine.solution import ScheduleSolution
+from app.services.schedule_engine.conflict_index import ConflictIndex
 
 # Importar constraint_solver solo cuando sea necesario para evitar errores si ortools no está instalado
 try:
@@ -12,7 +13,8 @@ try:
         'Section',
         'Student',
         'ConstraintScheduleSolver',
-        'ScheduleSolution'
+        'ScheduleSolution',
+        'ConflictIndex'
     ]
 except ImportError:
     # Ortools no disponible, pero no es crítico para imports básicos
@@ -21,6 +23,7 @@ except ImportError:
         'TimeSlot',
         'Section',
         'Student',
-        'ScheduleSolution'
+        'ScheduleSolution',
+        'ConflictIndex'
     ]
 
@@ -0,0 +1,101 @@
+"""
+Selección de los K mejores horarios distintos entre sí (horarios alternativos)
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.schedule_engine.models import Section
+from app.services.schedule_engine.solution import ScheduleAlternative
+from app.services.schedule_engine.fitness import ScheduleFitness
+
+
+def section_choices(section_ids: Iterable[int], sections_by_id: Dict[int, Section]) -> Dict[int, int]:
+    """Elección de sección por asignatura ({subject_id: section_id}) de un horario"""
+    return {
+        sections_by_id[section_id].subject_id: section_id
+        for section_id in section_ids
+        if section_id in sections_by_id
+    }
+
+
+def schedule_distance(choices_a: Dict[int, int], choices_b: Dict[int, int]) -> int:
+    """
+    Distancia de Hamming entre dos horarios: asignaturas con distinta elección
+    (otra sección, o asignada en uno y sin asignar en el otro).
+    """
+    return sum(
+        1 for subject_id in choices_a.keys() | choices_b.keys()
+        if choices_a.get(subject_id) != choices_b.get(subject_id)
+    )
+
+
+def min_distance_to(choices: Dict[int, int], selected: List[Dict[int, int]]) -> Optional[int]:
+    """Distancia al horario más parecido de los ya elegidos (None si no hay ninguno)"""
+    return min((schedule_distance(choices, other) for other in selected), default=None)
+
+
+def make_alternative(
+    rank: int,
+    section_ids: List[int],
+    sections_by_id: Dict[int, Section],
+    quality_score: Optional[float] = None,
+    min_distance: Optional[int] = None
+) -> ScheduleAlternative:
+    """Construye un ScheduleAlternative (calcula el fitness si no se proporciona)"""
+    sections = [sections_by_id[section_id] for section_id in section_ids if section_id in sections_by_id]
+    if quality_score is None:
+        quality_score = ScheduleFitness(sections).calculate_fitness()
+    return ScheduleAlternative(
+        rank=rank,
+        section_ids=[s.id for s in sections],
+        subject_ids=list(dict.fromkeys(s.subject_id for s in sections)),
+        quality_score=quality_score,
+        min_distance=min_distance
+    )
+
+
+def select_diverse(
+    candidates: Iterable[Tuple[List[int], float]],
+    sections_by_id: Dict[int, Section],
+    k: int,
+    min_distance: int,
+    first: Optional[Tuple[List[int], float]] = None
+) -> List[ScheduleAlternative]:
+    """
+    Elige hasta k horarios con distancia mínima min_distance entre cada par.
+    
+    Los candidatos se recorren del mejor al peor con el criterio del motor (más asignaturas
+    y luego menor fitness) y se toma cada uno que esté a min_distance o más de todos los ya
+    elegidos.
+    
+    Args:
+        candidates: (section_ids, fitness) de cada horario candidato (puede haber repetidos)
+        sections_by_id: Secciones por ID
+        k: Número máximo de horarios
+        min_distance: Distancia de Hamming mínima entre horarios (>= 1)
+        first: Horario principal (opcional); siempre es el de rango 1
+    
+    Returns:
+        Horarios elegidos en orden de rango
+    """
+    scored = []
+    for section_ids, fitness in candidates:
+        choices = section_choices(section_ids, sections_by_id)
+        if choices:
+            scored.append((-len(choices), fitness, choices))
+    scored.sort(key=lambda item: (item[0], item[1]))
+    if first is not None:
+        scored.insert(0, (0, first[1], section_choices(first[0], sections_by_id)))
+    
+    alternatives: List[ScheduleAlternative] = []
+    selected: List[Dict[int, int]] = []
+    for _, fitness, choices in scored:
+        if len(alternatives) >= k:
+            break
+        distance = min_distance_to(choices, selected)
+        if distance is not None and distance < min_distance:
+            continue
+        selected.append(choices)
+        alternatives.append(make_alternative(
+            len(alternatives) + 1, list(choices.values()), sections_by_id, fitness, distance
+        ))
+    return alternatives
@@ -0,0 +1,166 @@
+"""
+Evaluador de fitness vectorizado (NumPy) para poblaciones completas del AG
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.services.schedule_engine.models import Section
+from app.services.schedule_engine.fitness import ScheduleFitness
+
+NO_DAY = 7  # Día centinela para posiciones de slot vacías (relleno)
+GAP_WEIGHT = 0.08
+FREE_DAY_BONUS = -20.0
+
+
+class BatchScheduleFitness:
+    """
+    Calcula el fitness de muchos horarios a la vez.
+
+    Cada horario es una fila de una matriz de enteros con índices de secciones
+    (posición en la lista `sections`, -1 = sin sección). Los días y minutos de
+    cada sección se precalculan en arreglos, por lo que evaluar una población
+    completa son unas pocas operaciones de arreglos.
+
+    El resultado es idéntico (bit a bit) a ScheduleFitness.calculate_fitness()
+    sobre las mismas secciones en el mismo orden.
+    """
+
+    def __init__(self, sections: Sequence[Section]):
+        """
+        Args:
+            sections: Secciones que pueden aparecer en los horarios a evaluar
+        """
+        self.sections = list(sections)
+        self.section_ids = np.array([s.id for s in self.sections], dtype=np.int64)
+
+        # Búsqueda vectorizada de IDs -> índices
+        self._id_order = np.argsort(self.section_ids, kind="stable")
+        self._sorted_ids = self.section_ids[self._id_order]
+
+        # Arreglos por sección (una fila extra al final para el índice -1)
+        max_slots = max((len(s.timeslots) for s in self.sections), default=0) or 1
+        rows = len(self.sections) + 1
+        self.max_slots = max_slots
+        self._day = np.full((rows, max_slots), NO_DAY, dtype=np.int64)
+        self._start_seconds = np.zeros((rows, max_slots), dtype=np.int64)
+        self._start_minutes = np.zeros((rows, max_slots), dtype=np.int64)
+        self._end_minutes = np.zeros((rows, max_slots), dtype=np.int64)
+        self._time_penalty = np.zeros((rows, max_slots), dtype=np.float64)
+
+        for i, section in enumerate(self.sections):
+            for j, slot in enumerate(section.timeslots):
+                start, end = slot.start_time, slot.end_time
+                self._day[i, j] = slot.day_of_week
+                # La fitness ordena por el objeto time completo (incluye segundos)
+                self._start_seconds[i, j] = (start.hour * 60 + start.minute) * 60 + start.second
+                self._start_minutes[i, j] = start.hour * 60 + start.minute
+                self._end_minutes[i, j] = end.hour * 60 + end.minute
+                self._time_penalty[i, j] = ScheduleFitness.start_hour_penalty(start.hour)
+
+        # Memo de la penalización de balance por vector de clases por día
+        self._balance_cache: Dict[Tuple[int, ...], float] = {}
+
+    def indices_for(self, section_ids: np.ndarray) -> np.ndarray:
+        """
+        Convierte una matriz de IDs de secciones a índices (-1 si el ID no existe).
+
+        Args:
+            section_ids: Matriz de IDs de secciones (cualquier forma)
+        """
+        section_ids = np.asarray(section_ids, dtype=np.int64)
+        if len(self._sorted_ids) == 0:
+            return np.full(section_ids.shape, -1, dtype=np.int64)
+        pos = np.searchsorted(self._sorted_ids, section_ids)
+        pos = np.clip(pos, 0, len(self._sorted_ids) - 1)
+        found = self._sorted_ids[pos] == section_ids
+        return np.where(found, self._id_order[pos], -1)
+
+    def evaluate(self, population: np.ndarray) -> np.ndarray:
+        """
+        Evalúa una población completa.
+
+        Args:
+            population: Matriz (individuos x genes) de índices de secciones, -1 = vacío
+
+        Returns:
+            Arreglo con el fitness de cada individuo (menor = mejor)
+        """
+        population = np.asarray(population, dtype=np.int64)
+        n_individuals = population.shape[0]
+        if n_individuals == 0:
+            return np.zeros(0, dtype=np.float64)
+
+        rows = np.where(population < 0, len(self.sections), population)
+        shape = (n_individuals, population.shape[1] * self.max_slots)
+        day = self._day[rows].reshape(shape)
+        start_seconds = self._start_seconds[rows].reshape(shape)
+        start_minutes = self._start_minutes[rows].reshape(shape)
+        end_minutes = self._end_minutes[rows].reshape(shape)
+        time_penalty = self._time_penalty[rows].reshape(shape)
+
+        gaps = self._gaps_penalty(day, start_seconds, start_minutes, end_minutes)
+        counts = np.stack([(day == d).sum(axis=1) for d in range(7)], axis=1)
+        balance = self._balance_penalty(counts)
+        time_preference = time_penalty.sum(axis=1)
+        free_days = (7 - (counts > 0).sum(axis=1)) * FREE_DAY_BONUS
+
+        # Mismo orden de sumas que ScheduleFitness.calculate_fitness()
+        score = np.zeros(n_individuals, dtype=np.float64)
+        score += gaps
+        score += balance
+        score += time_preference
+        score += free_days
+        return score
+
+    def _gaps_penalty(
+        self,
+        day: np.ndarray,
+        start_seconds: np.ndarray,
+        start_minutes: np.ndarray,
+        end_minutes: np.ndarray
+    ) -> np.ndarray:
+        """Minutos de hueco entre clases consecutivas del mismo día (ordenadas por inicio)"""
+        if day.shape[1] < 2:
+            return np.zeros(day.shape[0], dtype=np.float64)
+
+        # Orden estable por (día, inicio): igual que el sort por día de la fitness escalar
+        sort_key = day * (24 * 3600) + start_seconds
+        order = np.argsort(sort_key, axis=1, kind="stable")
+        day = np.take_along_axis(day, order, axis=1)
+        start_minutes = np.take_along_axis(start_minutes, order, axis=1)
+        end_minutes = np.take_along_axis(end_minutes, order, axis=1)
+
+        same_day = (day[:, 1:] == day[:, :-1]) & (day[:, :-1] != NO_DAY)
+        gap = start_minutes[:, 1:] - end_minutes[:, :-1]
+        total_gap_minutes = np.where(same_day & (gap > 0), gap, 0).sum(axis=1)
+        return total_gap_minutes * GAP_WEIGHT
+
+    def _balance_penalty(self, counts: np.ndarray) -> np.ndarray:
+        """
+        Penalización de balance por individuo.
+
+        Depende solo del vector de clases por día, que se repite mucho dentro de una
+        población: se calcula con la misma función escalar para cada vector distinto.
+        """
+        unique_counts, inverse = np.unique(counts, axis=0, return_inverse=True)
+        values = np.empty(len(unique_counts), dtype=np.float64)
+        for i, row in enumerate(unique_counts):
+            key = tuple(int(x) for x in row)
+            value = self._balance_cache.get(key)
+            if value is None:
+                value = ScheduleFitness.balance_penalty_for_counts(list(key))
+                self._balance_cache[key] = value
+            values[i] = value
+        return values[np.asarray(inverse).reshape(-1)]
+
+    def evaluate_section_ids(self, individuals: List[List[int]]) -> np.ndarray:
+        """
+        Evalúa individuos expresados como listas de IDs de secciones (-1 = vacío).
+
+        Args:
+            individuals: Lista de individuos, todos con el mismo número de genes
+        """
+        if not individuals:
+            return np.zeros(0, dtype=np.float64)
+        return self.evaluate(self.indices_for(np.array(individuals, dtype=np.int64)))
@@ -0,0 +1,310 @@
+"""
+Asignación conjunta de horarios para una cohorte de estudiantes con cupos compartidos
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+from ortools.sat.python import cp_model
+
+from app.services.schedule_engine.models import Student, Section
+from app.services.schedule_engine.solution import ScheduleSolution
+from app.services.schedule_engine.fitness import ScheduleFitness
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.constraint_solver import describe_unassigned_subjects
+from app.config import settings
+
+# Escala entera de los pesos de prioridad dentro de CP-SAT
+PRIORITY_SCALE = 1000
+
+FULL_SECTIONS_REASON = "Cupos agotados en las secciones compatibles con el horario asignado"
+
+
+class CohortScheduleSolver:
+    """
+    Resuelve los horarios de N estudiantes a la vez respetando los cupos de cada sección:
+    la suma de estudiantes asignados a una sección no supera capacity - enrolled_count.
+    
+    Descomposición: solo las secciones disputadas (más estudiantes candidatos que cupos)
+    acoplan a los estudiantes. Los estudiantes se agrupan en componentes conexas por
+    secciones disputadas y cada componente se resuelve como un modelo independiente
+    (sin pérdida de optimalidad). En la práctica las componentes siguen los programas
+    y las franjas horarias con alta demanda.
+    
+    Objetivo: maximizar las asignaturas asignadas ponderadas por la prioridad del estudiante.
+    Con fairness=True la k-ésima asignatura de un estudiante vale prioridad/k (rendimientos
+    decrecientes): se prefiere dar una asignatura más a quien tiene menos. Como criterio
+    secundario (solo desempata, nunca cambia el conteo ponderado) se minimiza la penalización
+    por hora de inicio de las secciones asignadas (ScheduleFitness.start_hour_penalty).
+    """
+    
+    def __init__(
+        self,
+        students: List[Student],
+        sections_by_student: Dict[int, List[Section]],
+        conflict_index: Optional[ConflictIndex] = None,
+        priorities: Optional[Dict[int, float]] = None,
+        fairness: bool = False,
+        time_limit: Optional[float] = None,
+        num_workers: Optional[int] = None,
+        all_sections_by_student: Optional[Dict[int, List[Section]]] = None
+    ):
+        """
+        Args:
+            students: Estudiantes de la cohorte (con selected_subject_ids)
+            sections_by_student: Secciones candidatas de cada estudiante (cupos y prerrequisitos ya filtrados)
+            conflict_index: Índice de conflictos que cubra todas las secciones (opcional)
+            priorities: Peso por estudiante (opcional, por defecto 1.0)
+            fairness: Rendimientos decrecientes por asignatura (reparto más equitativo)
+            time_limit: Tiempo máximo por componente en segundos (por defecto SCHEDULE_COHORT_TIMEOUT)
+            num_workers: Workers de CP-SAT (por defecto SCHEDULE_SOLVER_PARALLEL_WORKERS)
+            all_sections_by_student: Todas las secciones cargadas por estudiante, para explicar
+                                     las asignaturas no asignadas (opcional, por defecto las candidatas)
+        """
+        self.students = {student.id: student for student in students}
+        self.sections_by_student = sections_by_student
+        self.all_sections_by_student = all_sections_by_student or sections_by_student
+        self.priorities = priorities or {}
+        self.fairness = fairness
+        self.time_limit = time_limit if time_limit is not None else settings.SCHEDULE_COHORT_TIMEOUT
+        self.num_workers = num_workers or settings.SCHEDULE_SOLVER_PARALLEL_WORKERS
+        
+        self.sections: Dict[int, Section] = {}
+        for sections in self.all_sections_by_student.values():
+            for section in sections:
+                self.sections.setdefault(section.id, section)
+        for sections in sections_by_student.values():
+            for section in sections:
+                self.sections.setdefault(section.id, section)
+        self.conflict_index = conflict_index if conflict_index is not None else ConflictIndex(self.sections.values())
+        
+        # Candidatas por estudiante: con cupos y de sus asignaturas seleccionadas
+        self.candidates: Dict[int, List[Section]] = {
+            student_id: [
+                section for section in sections_by_student.get(student_id, [])
+                if section.available_spots > 0 and section.subject_id in student.selected_subject_ids
+            ]
+            for student_id, student in self.students.items()
+        }
+        
+        # Demanda por sección: estudiantes que la tienen como candidata
+        self.demand: Dict[int, List[int]] = {}
+        for student_id, candidates in self.candidates.items():
+            for section in candidates:
+                self.demand.setdefault(section.id, []).append(student_id)
+        self.contested_section_ids = {
+            section_id for section_id, student_ids in self.demand.items()
+            if len(student_ids) > self.sections[section_id].available_spots
+        }
+    
+    def components(self) -> List[List[int]]:
+        """
+        Componentes conexas de estudiantes unidos por secciones disputadas (union-find),
+        de la más grande a la más pequeña.
+        """
+        parent = {student_id: student_id for student_id in self.students}
+        
+        def find(student_id: int) -> int:
+            while parent[student_id] != student_id:
+                parent[student_id] = parent[parent[student_id]]
+                student_id = parent[student_id]
+            return student_id
+        
+        for section_id in self.contested_section_ids:
+            first, *others = self.demand[section_id]
+            root = find(first)
+            for student_id in others:
+                other_root = find(student_id)
+                if other_root != root:
+                    parent[other_root] = root
+        
+        groups: Dict[int, List[int]] = {}
+        for student_id in self.students:
+            groups.setdefault(find(student_id), []).append(student_id)
+        return sorted(groups.values(), key=len, reverse=True)
+    
+    def solve(self) -> Dict[int, ScheduleSolution]:
+        """
+        Resuelve todas las componentes.
+        
+        Returns:
+            Solución por student_id
+        """
+        solutions: Dict[int, ScheduleSolution] = {}
+        components = self.components()
+        for student_ids in components:
+            solutions.update(self._solve_component(student_ids, len(components)))
+        return solutions
+    
+    def _solve_component(self, student_ids: List[int], total_components: int) -> Dict[int, ScheduleSolution]:
+        """Construye y resuelve el modelo CP-SAT de una componente"""
+        start_time = time.time()
+        model = cp_model.CpModel()
+        variables: Dict[Tuple[int, int], cp_model.IntVar] = {}
+        objective = []
+        penalty_terms = []
+        penalty_bound = 0  # Cota superior de la penalización horaria de la componente
+        
+        for student_id in student_ids:
+            candidates = self.candidates[student_id]
+            student_vars = []
+            for section in candidates:
+                var = model.NewBoolVar(f"student_{student_id}_section_{section.id}")
+                variables[(student_id, section.id)] = var
+                student_vars.append(var)
+            if not student_vars:
+                continue
+            
+            # Una sección por asignatura
+            by_subject: Dict[int, List[cp_model.IntVar]] = {}
+            for section in candidates:
+                by_subject.setdefault(section.subject_id, []).append(variables[(student_id, section.id)])
+            for subject_vars in by_subject.values():
+                if len(subject_vars) > 1:
+                    model.AddAtMostOne(subject_vars)
+            
+            # Sin choques de horario (una restricción por clique de conflicto)
+            for clique in self.conflict_index.conflict_cliques([s.id for s in candidates]):
+                model.AddAtMostOne(variables[(student_id, section_id)] for section_id in clique)
+            
+            # Penalización horaria por sección (a lo sumo una sección por asignatura)
+            max_penalty_by_subject: Dict[int, int] = {}
+            for section in candidates:
+                penalty = self._time_penalty(section)
+                if penalty:
+                    penalty_terms.append(penalty * variables[(student_id, section.id)])
+                    max_penalty_by_subject[section.subject_id] = max(
+                        max_penalty_by_subject.get(section.subject_id, 0), penalty
+                    )
+            penalty_bound += sum(max_penalty_by_subject.values())
+            
+            # Cada sección asignada es una asignatura distinta: el conteo es la suma de variables
+            weight = max(0, int(round(self.priorities.get(student_id, 1.0) * PRIORITY_SCALE)))
+            if not self.fairness:
+                objective.append(weight * sum(student_vars))
+                continue
+            
+            # Rendimientos decrecientes: subject_k = 1 si el estudiante tiene al menos k asignaturas
+            count = len(by_subject)
+            steps = [model.NewBoolVar(f"student_{student_id}_has_{k}") for k in range(1, count + 1)]
+            model.Add(sum(steps) == sum(student_vars))
+            for previous, following in zip(steps, steps[1:]):
+                model.AddImplication(following, previous)
+            objective.extend(int(round(weight / k)) * step for k, step in enumerate(steps, start=1))
+        
+        # Cupos compartidos (solo las secciones disputadas pueden excederse)
+        component = set(student_ids)
+        for section_id in self.contested_section_ids:
+            section_vars = [
+                variables[(student_id, section_id)]
+                for student_id in self.demand[section_id]
+                if student_id in component and (student_id, section_id) in variables
+            ]
+            if len(section_vars) > self.sections[section_id].available_spots:
+                model.Add(sum(section_vars) <= self.sections[section_id].available_spots)
+        
+        # Objetivo lexicográfico: big supera cualquier penalización horaria, así que entre
+        # asignaciones con el mismo conteo ponderado gana la de mejores horarios
+        big = penalty_bound + 1
+        assigned_weight = sum(objective)
+        time_penalty = sum(penalty_terms)
+        model.Maximize(big * assigned_weight - time_penalty)
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = self.time_limit
+        solver.parameters.num_workers = self.num_workers
+        status = solver.Solve(model) if variables else cp_model.OPTIMAL
+        status_name = solver.StatusName(status) if variables else "OPTIMAL"
+        feasible = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+        processing_time = time.time() - start_time
+        
+        assigned: Dict[int, List[Section]] = {student_id: [] for student_id in student_ids}
+        if feasible:
+            for (student_id, section_id), var in variables.items():
+                if solver.Value(var) == 1:
+                    assigned[student_id].append(self.sections[section_id])
+        seats_taken: Dict[int, int] = {}
+        for sections in assigned.values():
+            for section in sections:
+                seats_taken[section.id] = seats_taken.get(section.id, 0) + 1
+        
+        metadata = {
+            "cohort": {
+                "component_size": len(student_ids),
+                "components": total_components,
+                "status": status_name,
+                "objective": solver.Value(assigned_weight) if feasible and variables else 0,
+                "time_penalty": solver.Value(time_penalty) if feasible and variables else 0,
+                "wall_time": solver.WallTime() if variables else 0.0
+            }
+        }
+        return {
+            student_id: self._build_solution(
+                student_id, assigned[student_id], seats_taken, feasible,
+                status_name, processing_time, metadata
+            )
+            for student_id in student_ids
+        }
+    
+    @staticmethod
+    def _time_penalty(section: Section) -> int:
+        """Penalización por hora de inicio de una sección (entera, como la del fitness)"""
+        return int(round(sum(ScheduleFitness.start_hour_penalty(slot.start_time.hour) for slot in section.timeslots)))
+    
+    def _build_solution(
+        self,
+        student_id: int,
+        assigned_sections: List[Section],
+        seats_taken: Dict[int, int],
+        feasible: bool,
+        status_name: str,
+        processing_time: float,
+        metadata: Dict
+    ) -> ScheduleSolution:
+        """Solución individual de un estudiante dentro de la asignación de la cohorte"""
+        student = self.students[student_id]
+        if not feasible:
+            return ScheduleSolution(
+                student_id=student_id,
+                is_feasible=False,
+                assigned_section_ids=[],
+                assigned_subject_ids=[],
+                unassigned_subjects=[],
+                processing_time=processing_time,
+                conflicts=[f"No se encontró una asignación para la cohorte ({status_name})"],
+                solver_status=status_name,
+                metadata=metadata
+            )
+        
+        sections_by_subject: Dict[int, List[Section]] = {}
+        for section in self.all_sections_by_student.get(student_id, []):
+            sections_by_subject.setdefault(section.subject_id, []).append(section)
+        assigned_subject_ids = [section.subject_id for section in assigned_sections]
+        unassigned_subjects = describe_unassigned_subjects(
+            student.selected_subject_ids,
+            sections_by_subject,
+            {section.id: section for section in assigned_sections},
+            assigned_subject_ids,
+            lambda a, b: self.conflict_index.overlaps(a.id, b.id)
+        )
+        for unassigned in unassigned_subjects:
+            # Secciones compatibles que quedaron llenas: el cupo lo tomó otro estudiante
+            conflicting_ids = {c["section_id"] for c in unassigned.conflicting_sections}
+            free_sections = [
+                section for section in sections_by_subject.get(unassigned.subject_id, [])
+                if section.id not in conflicting_ids
+            ]
+            if free_sections and all(
+                seats_taken.get(section.id, 0) >= section.available_spots for section in free_sections
+            ):
+                unassigned.reason = FULL_SECTIONS_REASON
+        
+        return ScheduleSolution(
+            student_id=student_id,
+            is_feasible=True,
+            assigned_section_ids=[section.id for section in assigned_sections],
+            assigned_subject_ids=assigned_subject_ids,
+            unassigned_subjects=unassigned_subjects,
+            processing_time=processing_time,
+            conflicts=[],
+            solver_status=status_name,
+            quality_score=ScheduleFitness(assigned_sections).calculate_fitness(),
+            metadata=metadata
+        )
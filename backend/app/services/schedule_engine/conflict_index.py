@@ -0,0 +1,278 @@
+"""
+Índice precompilado de conflictos de horario entre secciones (bitmasks)
+"""
+from math import gcd
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import time
+
+import numpy as np
+
+from app.services.schedule_engine.models import Section
+
+MINUTES_PER_DAY = 24 * 60
+DAYS_PER_WEEK = 7
+
+
+def time_to_minutes(t: time) -> int:
+    """Convierte un datetime.time a minutos desde medianoche"""
+    return t.hour * 60 + t.minute
+
+
+def _bitsets_to_array(bitsets: List[int], width: int) -> np.ndarray:
+    """Bitsets (enteros) a una matriz de bytes little-endian, una fila por bitset"""
+    buffer = b"".join(bitset.to_bytes(width, "little") for bitset in bitsets)
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(len(bitsets), width).copy()
+
+
+def _array_to_bitsets(array: np.ndarray) -> List[int]:
+    """Inversa de _bitsets_to_array()"""
+    return [int.from_bytes(row.tobytes(), "little") for row in array]
+
+
+class ConflictIndex:
+    """
+    Índice de conflictos de horario construido una sola vez a partir de los
+    SectionSchedule de un período.
+
+    Representación:
+    - Cada sección se codifica como una máscara de bits semanal: el bit k está
+      encendido si la sección ocupa el cuanto de tiempo k de la semana.
+      El cuanto es el MCD de todos los bordes de los horarios, por lo que la
+      codificación es exacta (dos secciones chocan si y solo si sus máscaras
+      se intersectan).
+    - La relación de conflicto por pares se guarda como bitsets: para la sección
+      en la posición i, el bit j está encendido si choca con la sección j.
+
+    Así, verificar un choque entre dos secciones es una única operación AND.
+    """
+
+    def __init__(self, sections: Iterable[Section], quantum: Optional[int] = None):
+        """
+        Args:
+            sections: Secciones a indexar (normalmente toda la oferta del período)
+            quantum: Tamaño del cuanto en minutos (opcional, se calcula si no se proporciona)
+        """
+        sections_by_id: Dict[int, Section] = {}
+        for section in sections:
+            sections_by_id.setdefault(section.id, section)
+
+        self.section_ids: List[int] = list(sections_by_id.keys())
+        self._positions: Dict[int, int] = {
+            section_id: position for position, section_id in enumerate(self.section_ids)
+        }
+
+        # Intervalos en minutos por sección: (día, inicio, fin)
+        intervals: List[List[Tuple[int, int, int]]] = []
+        for section_id in self.section_ids:
+            section_intervals = []
+            for slot in sections_by_id[section_id].timeslots:
+                start = time_to_minutes(slot.start_time)
+                end = time_to_minutes(slot.end_time)
+                if end <= start:
+                    # Bloques vacíos o invertidos no ocupan tiempo
+                    continue
+                section_intervals.append((slot.day_of_week, start, end))
+            intervals.append(section_intervals)
+
+        self.quantum = quantum or self._compute_quantum(intervals)
+        self.quanta_per_day = MINUTES_PER_DAY // self.quantum
+
+        # Máscara semanal de cuantos por sección
+        self._time_masks: List[int] = []
+        # Bitset de secciones que ocupan cada cuanto (solo cuantos ocupados)
+        self._occupants: Dict[int, int] = {}
+        for position, section_intervals in enumerate(intervals):
+            mask = 0
+            section_bit = 1 << position
+            for day, start, end in section_intervals:
+                first = day * self.quanta_per_day + start // self.quantum
+                last = day * self.quanta_per_day + end // self.quantum
+                mask |= ((1 << (last - first)) - 1) << first
+                for q in range(first, last):
+                    self._occupants[q] = self._occupants.get(q, 0) | section_bit
+            self._time_masks.append(mask)
+
+        # Relación de conflicto: unión de los ocupantes de cada cuanto de la sección
+        self._conflicts: List[int] = [0] * len(self.section_ids)
+        for occupants in set(self._occupants.values()):
+            if occupants & (occupants - 1) == 0:
+                continue  # Un solo ocupante, no hay conflicto
+            remaining = occupants
+            while remaining:
+                low_bit = remaining & -remaining
+                position = low_bit.bit_length() - 1
+                self._conflicts[position] |= occupants
+                remaining ^= low_bit
+        for position in range(len(self._conflicts)):
+            self._conflicts[position] &= ~(1 << position)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Exporta el índice como arreglos de bytes (little-endian) para compartirlo entre
+        procesos sin recalcular los solapamientos (ver from_arrays()).
+        """
+        n = len(self.section_ids)
+        section_bytes = max(1, (n + 7) // 8)
+        mask_bytes = max(1, (DAYS_PER_WEEK * self.quanta_per_day + 7) // 8)
+        quanta = sorted(self._occupants)
+        return {
+            "section_ids": np.array(self.section_ids, dtype=np.int64),
+            "quantum": np.array([self.quantum], dtype=np.int64),
+            "time_masks": _bitsets_to_array(self._time_masks, mask_bytes),
+            "conflicts": _bitsets_to_array(self._conflicts, section_bytes),
+            "occupied_quanta": np.array(quanta, dtype=np.int64),
+            "occupants": _bitsets_to_array([self._occupants[q] for q in quanta], section_bytes)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "ConflictIndex":
+        """Reconstruye un índice exportado con to_arrays() (sin recalcular solapamientos)"""
+        index = cls.__new__(cls)
+        index.section_ids = arrays["section_ids"].tolist()
+        index._positions = {section_id: position for position, section_id in enumerate(index.section_ids)}
+        index.quantum = int(arrays["quantum"][0])
+        index.quanta_per_day = MINUTES_PER_DAY // index.quantum
+        index._time_masks = _array_to_bitsets(arrays["time_masks"])
+        index._conflicts = _array_to_bitsets(arrays["conflicts"])
+        index._occupants = dict(zip(arrays["occupied_quanta"].tolist(), _array_to_bitsets(arrays["occupants"])))
+        return index
+
+    @staticmethod
+    def _compute_quantum(intervals: List[List[Tuple[int, int, int]]]) -> int:
+        """Calcula el cuanto como el MCD de todos los bordes (en minutos) y la duración del día"""
+        quantum = MINUTES_PER_DAY
+        for section_intervals in intervals:
+            for _, start, end in section_intervals:
+                quantum = gcd(quantum, start, end)
+                if quantum == 1:
+                    return 1
+        return quantum
+
+    def __len__(self) -> int:
+        return len(self.section_ids)
+
+    def __contains__(self, section_id: int) -> bool:
+        return section_id in self._positions
+
+    def position(self, section_id: int) -> int:
+        """Posición (bit) de una sección en los bitsets"""
+        return self._positions[section_id]
+
+    def time_mask(self, section_id: int) -> int:
+        """Máscara semanal de cuantos ocupados por la sección"""
+        return self._time_masks[self._positions[section_id]]
+
+    def conflict_set(self, section_id: int) -> int:
+        """Bitset de secciones que chocan con la sección dada"""
+        return self._conflicts[self._positions[section_id]]
+
+    def bit(self, section_id: int) -> int:
+        """Bit de la sección dentro de los bitsets de conflicto"""
+        return 1 << self._positions[section_id]
+
+    def overlaps(self, section_a_id: int, section_b_id: int) -> bool:
+        """Verifica si dos secciones chocan (un único AND)"""
+        return bool(self._conflicts[self._positions[section_a_id]] & (1 << self._positions[section_b_id]))
+
+    def bitset_of(self, section_ids: Iterable[int]) -> int:
+        """Construye el bitset de un conjunto de secciones (ignora IDs no indexados)"""
+        bitset = 0
+        for section_id in section_ids:
+            position = self._positions.get(section_id)
+            if position is not None:
+                bitset |= 1 << position
+        return bitset
+
+    def conflicts_of(self, section_ids: Iterable[int]) -> int:
+        """Bitset de todas las secciones que chocan con alguna de las secciones dadas"""
+        bitset = 0
+        for section_id in section_ids:
+            position = self._positions.get(section_id)
+            if position is not None:
+                bitset |= self._conflicts[position]
+        return bitset
+
+    def section_ids_of(self, bitset: int) -> List[int]:
+        """Convierte un bitset a la lista de IDs de secciones (en orden de posición)"""
+        section_ids = []
+        while bitset:
+            low_bit = bitset & -bitset
+            section_ids.append(self.section_ids[low_bit.bit_length() - 1])
+            bitset ^= low_bit
+        return section_ids
+
+    def conflicting_ids(self, section_id: int, among: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        IDs de las secciones que chocan con la sección dada.
+
+        Args:
+            section_id: Sección de referencia
+            among: Restringir la búsqueda a estas secciones (opcional)
+        """
+        bitset = self.conflict_set(section_id)
+        if among is not None:
+            bitset &= self.bitset_of(among)
+        return self.section_ids_of(bitset)
+
+    def conflict_cliques(self, section_ids: Optional[Iterable[int]] = None) -> List[List[int]]:
+        """
+        Cliques maximales de secciones que chocan entre sí (barrido por cuantos de tiempo).
+
+        Las secciones que ocupan un mismo cuanto chocan todas entre sí, y todo par que
+        choca comparte al menos un cuanto: los ocupantes de cada cuanto (con 2 o más
+        secciones) cubren todos los pares de conflict_pairs(). Se eliminan los
+        duplicados y los conjuntos contenidos en otro.
+
+        Args:
+            section_ids: Restringir a estas secciones (opcional, por defecto todas)
+
+        Returns:
+            Listas de IDs (en orden de posición), de la clique más grande a la más pequeña
+        """
+        if section_ids is None:
+            selected = (1 << len(self.section_ids)) - 1
+            quanta = 0
+            for mask in self._time_masks:
+                quanta |= mask
+        else:
+            selected = self.bitset_of(section_ids)
+            quanta = 0
+            remaining = selected
+            while remaining:
+                low_bit = remaining & -remaining
+                quanta |= self._time_masks[low_bit.bit_length() - 1]
+                remaining ^= low_bit
+
+        # Ocupantes (restringidos) de cada cuanto ocupado por la selección
+        candidates = set()
+        while quanta:
+            low_bit = quanta & -quanta
+            occupants = self._occupants.get(low_bit.bit_length() - 1, 0) & selected
+            if occupants & (occupants - 1):
+                candidates.add(occupants)
+            quanta ^= low_bit
+
+        # Descartar subconjuntos: una clique solo puede estar contenida en otra más grande
+        cliques: List[int] = []
+        for candidate in sorted(candidates, key=lambda c: (-c.bit_count(), c)):
+            if not any(candidate & clique == candidate for clique in cliques):
+                cliques.append(candidate)
+        return [self.section_ids_of(clique) for clique in cliques]
+
+    def conflict_pairs(self, section_ids: Optional[Iterable[int]] = None) -> List[Tuple[int, int]]:
+        """
+        Lista de pares (a, b) de secciones que chocan, con a antes que b en el orden dado.
+
+        Args:
+            section_ids: Restringir a estas secciones (opcional, por defecto todas)
+        """
+        ordered_ids = list(section_ids) if section_ids is not None else self.section_ids
+        pairs = []
+        for i, section_a_id in enumerate(ordered_ids):
+            conflicts = self.conflict_set(section_a_id)
+            if not conflicts:
+                continue
+            for section_b_id in ordered_ids[i + 1:]:
+                if conflicts & (1 << self._positions[section_b_id]):
+                    pairs.append((section_a_id, section_b_id))
+        return pairs
@@ -1,14 +1,51 @@
 """
 Solver de restricciones duras usando OR-Tools CP-SAT
 """
+import math
 import time
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, Optional, Callable, Iterable, Any, Set
 from ortools.sat.python import cp_model
 
 from app.services.schedule_engine.models import Student, Section
-from app.services.schedule_engine.solution import ScheduleSolution
+from app.services.schedule_engine.solution import ScheduleSolution, UnassignedSubject, ScheduleAlternative
+from app.services.schedule_engine.conflict_index import ConflictIndex, time_to_minutes, DAYS_PER_WEEK, MINUTES_PER_DAY
+from app.services.schedule_engine.fitness import ScheduleFitness
+from app.services.schedule_engine.alternatives import make_alternative, min_distance_to, section_choices
 from app.config import settings
 
+# Escala entera del fitness dentro de CP-SAT (1 punto de fitness = 1000 unidades)
+FITNESS_SCALE = 1000
+GAP_WEIGHT = 0.08
+BALANCE_WEIGHT = 40.0
+FREE_DAY_BONUS = -20.0
+
+# Perfiles de configuración de CP-SAT seleccionables por petición
+SOLVER_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Un solo worker: sin costo de arranque del portafolio paralelo; ideal para los
+    # modelos pequeños de un estudiante y para muchas peticiones concurrentes
+    "latency": {"num_workers": 1},
+    # Portafolio paralelo de estrategias: para modelos grandes o difíciles
+    "throughput": {"num_workers": None},  # None = settings.SCHEDULE_SOLVER_PARALLEL_WORKERS
+}
+
+
+def solver_profile_parameters(profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Parámetros de CP-SAT de un perfil (por defecto settings.SCHEDULE_SOLVER_PROFILE).
+    
+    Raises:
+        ValueError: Si el perfil no existe
+    """
+    profile = profile or settings.SCHEDULE_SOLVER_PROFILE
+    if profile not in SOLVER_PROFILES:
+        raise ValueError(
+            f"Perfil de solver desconocido: {profile}. Opciones: {', '.join(SOLVER_PROFILES)}"
+        )
+    parameters = dict(SOLVER_PROFILES[profile])
+    if parameters.get("num_workers") is None:
+        parameters["num_workers"] = settings.SCHEDULE_SOLVER_PARALLEL_WORKERS
+    return parameters
+
 
 class ConstraintScheduleSolver:
     """
@@ -18,13 +55,49 @@ class ConstraintScheduleSolver:
     - x[section_id] = 1 si la sección es asignada al estudiante, 0 si no
     """
     
-    def __init__(self, student: Student, available_sections: List[Section]):
+    def __init__(
+        self,
+        student: Student,
+        available_sections: List[Section],
+        conflict_index: Optional[ConflictIndex] = None,
+        solver_profile: Optional[str] = None,
+        hint_section_ids: Optional[Iterable[int]] = None,
+        objective: str = "subjects",
+        alternatives: int = 1,
+        min_distance: int = 1
+    ):
+        """
+        Args:
+            student: Datos del estudiante
+            available_sections: Secciones disponibles para elegir
+            conflict_index: Índice de conflictos precompilado (opcional, se construye si no se proporciona)
+            solver_profile: Perfil de CP-SAT ("latency" | "throughput", por defecto el de la configuración)
+            hint_section_ids: Secciones de un horario previo para arrancar la búsqueda (opcional)
+            objective: "subjects" (maximizar asignaturas) | "fitness" (asignaturas y luego
+                       minimizar el fitness del horario, en una sola llamada al solver)
+            alternatives: Número de horarios distintos a retornar (K mejores)
+            min_distance: Asignaturas con distinta sección entre cada par de horarios alternativos
+        """
         self.student = student
         self.sections = available_sections
+        self.conflict_index = conflict_index if conflict_index is not None else ConflictIndex(available_sections)
+        self.solver_profile = solver_profile or settings.SCHEDULE_SOLVER_PROFILE
+        self.solver_parameters = solver_profile_parameters(self.solver_profile)
+        self.hint_section_ids = set(hint_section_ids) if hint_section_ids else set()
+        if objective not in ("subjects", "fitness"):
+            raise ValueError(f"Objetivo desconocido: {objective}")
+        self.objective = objective
+        self.alternatives = alternatives
+        self.min_distance = min_distance
+        self.subject_vars: Dict[int, cp_model.IntVar] = {}
+        self.assigned_section_ids: List[int] = []
         self.model = cp_model.CpModel()
         self.variables: Dict[int, cp_model.IntVar] = {}
         self.solver = cp_model.CpSolver()
         self.start_time = None
+        # Cliques de conflicto ya agregadas al modelo (para no duplicarlas entre categorías)
+        self._emitted_cliques: List[Set[int]] = []
+        self._cliques_by_section: Dict[int, List[int]] = {}
     
     def create_variables(self):
         """Crear variables de decisión binarias para cada sección"""
@@ -54,17 +127,12 @@ class ConstraintScheduleSolver:
     def _add_time_conflict_constraints(self):
         """
         Un estudiante no puede estar en dos lugares al mismo tiempo.
-        Si sección A y B tienen timeslots que se solapan,
-        no pueden estar ambas asignadas.
-        """
-        for i, section_a in enumerate(self.sections):
-            for section_b in self.sections[i + 1:]:
-                if section_a.has_time_overlap_with(section_b):
-                    # No pueden estar ambas asignadas simultáneamente
-                    self.model.Add(
-                        self.variables[section_a.id] + 
-                        self.variables[section_b.id] <= 1
-                    )
+        Las secciones que comparten un cuanto de tiempo forman una clique:
+        a lo sumo una de ellas puede asignarse (un AddAtMostOne por clique
+        en lugar de una restricción por cada par que choca).
+        """
+        section_ids = [s.id for s in self.sections]
+        self._add_conflict_cliques(self.conflict_index.conflict_cliques(section_ids))
     
     def _add_professor_conflict_constraints(self):
         """
@@ -78,16 +146,12 @@ class ConstraintScheduleSolver:
                 sections_by_professor[section.professor_id] = []
             sections_by_professor[section.professor_id].append(section)
         
-        # Para cada profesor, verificar conflictos entre sus secciones
+        # Cliques de conflicto entre las secciones de cada profesor
         for professor_id, prof_sections in sections_by_professor.items():
-            for i, section_a in enumerate(prof_sections):
-                for section_b in prof_sections[i + 1:]:
-                    if section_a.has_time_overlap_with(section_b):
-                        # El profesor no puede dar ambas clases al mismo tiempo
-                        self.model.Add(
-                            self.variables[section_a.id] + 
-                            self.variables[section_b.id] <= 1
-                        )
+            if len(prof_sections) > 1:
+                self._add_conflict_cliques(
+                    self.conflict_index.conflict_cliques([s.id for s in prof_sections])
+                )
     
     def _add_classroom_conflict_constraints(self):
         """
@@ -100,16 +164,29 @@ class ConstraintScheduleSolver:
                 sections_by_classroom[section.classroom_id] = []
             sections_by_classroom[section.classroom_id].append(section)
         
-        # Para cada aula, verificar conflictos entre secciones
+        # Cliques de conflicto entre las secciones de cada aula
         for classroom_id, classroom_sections in sections_by_classroom.items():
-            for i, section_a in enumerate(classroom_sections):
-                for section_b in classroom_sections[i + 1:]:
-                    if section_a.has_time_overlap_with(section_b):
-                        # El aula no puede estar ocupada por ambas secciones al mismo tiempo
-                        self.model.Add(
-                            self.variables[section_a.id] + 
-                            self.variables[section_b.id] <= 1
-                        )
+            if len(classroom_sections) > 1:
+                self._add_conflict_cliques(
+                    self.conflict_index.conflict_cliques([s.id for s in classroom_sections])
+                )
+    
+    def _add_conflict_cliques(self, cliques: List[List[int]]):
+        """
+        Agrega un AddAtMostOne por clique, omitiendo las ya cubiertas por una
+        clique agregada antes (de esta u otra categoría: tiempo, profesor, aula).
+        Los conflictos de profesor y aula implican choque de horario, así que
+        normalmente quedan cubiertos por las cliques de tiempo.
+        """
+        for clique in cliques:
+            members = set(clique)
+            if any(members <= self._emitted_cliques[i] for i in self._cliques_by_section.get(clique[0], ())):
+                continue
+            index = len(self._emitted_cliques)
+            self._emitted_cliques.append(members)
+            for section_id in clique:
+                self._cliques_by_section.setdefault(section_id, []).append(index)
+            self.model.AddAtMostOne(self.variables[section_id] for section_id in clique)
     
     def _add_prerequisite_constraints(self):
         """
@@ -162,13 +239,18 @@ class ConstraintScheduleSolver:
         # Agregar función objetivo: maximizar número de asignaturas asignadas
         self._add_objective()
         
+        # Arranque en caliente con el horario previo del estudiante
+        hinted = self._add_hints()
+        
         # Configurar solver
         self.solver.parameters.max_time_in_seconds = settings.SCHEDULE_SOLVER_TIMEOUT
+        self.solver.parameters.num_workers = self.solver_parameters["num_workers"]
         
         # Resolver
         status = self.solver.Solve(self.model)
         
         processing_time = time.time() - self.start_time
+        metadata = {"solver": self._solver_statistics(status, hinted)}
         
         # Interpretar resultado
         if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
@@ -178,13 +260,14 @@ class ConstraintScheduleSolver:
                 for section_id, var in self.variables.items()
                 if self.solver.Value(var) == 1
             ]
+            self.assigned_section_ids = assigned_section_ids
             
             # Obtener asignaturas asignadas y no asignadas
             assigned_subject_ids, unassigned_subjects = self._analyze_assignment()
             
             status_str = "OPTIMAL" if status == cp_model.OPTIMAL else "FEASIBLE"
             
-            return ScheduleSolution(
+            solution = ScheduleSolution(
                 student_id=self.student.id,
                 is_feasible=True,
                 assigned_section_ids=assigned_section_ids,
@@ -193,8 +276,12 @@ class ConstraintScheduleSolver:
                 processing_time=processing_time,
                 conflicts=[],
                 solver_status=status_str,
-                quality_score=None  # Se calculará después si es necesario
+                quality_score=None,  # Se calculará después si es necesario
+                metadata=metadata
             )
+            if self.alternatives > 1:
+                solution.alternatives = self._solve_alternatives(assigned_section_ids)
+            return solution
         else:
             # No se encontró solución
             conflicts = self._analyze_infeasibility()
@@ -209,12 +296,91 @@ class ConstraintScheduleSolver:
                 processing_time=processing_time,
                 conflicts=conflicts,
                 solver_status=status_str,
-                quality_score=None
+                quality_score=None,
+                metadata=metadata
             )
     
+    def _solve_alternatives(self, first_section_ids: List[int]) -> List[ScheduleAlternative]:
+        """
+        K mejores horarios distintos re-resolviendo el mismo modelo: tras cada horario se
+        agrega un corte que exige una distancia de Hamming >= min_distance respecto de él
+        (asignaturas cuya sección cambia o que pasan a asignarse). El tiempo total sigue
+        acotado por SCHEDULE_SOLVER_TIMEOUT.
+        
+        Args:
+            first_section_ids: Secciones del horario principal (rango 1)
+        
+        Returns:
+            Horarios en orden de rango (el primero es el principal)
+        """
+        sections_by_id = {s.id: s for s in self.sections}
+        selected = [section_choices(first_section_ids, sections_by_id)]
+        alternatives = [make_alternative(1, first_section_ids, sections_by_id)]
+        self.model.ClearHints()
+        
+        while len(alternatives) < self.alternatives:
+            choices = selected[-1]
+            self.model.Add(
+                sum(1 - self.variables[section_id] for section_id in choices.values()) +
+                sum(var for subject_id, var in self.subject_vars.items() if subject_id not in choices)
+                >= self.min_distance
+            )
+            remaining = settings.SCHEDULE_SOLVER_TIMEOUT - (time.time() - self.start_time)
+            if remaining <= 0:
+                break
+            self.solver.parameters.max_time_in_seconds = remaining
+            status = self.solver.Solve(self.model)
+            if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+                break
+            section_ids = [
+                section_id for section_id, var in self.variables.items()
+                if self.solver.Value(var) == 1
+            ]
+            if not section_ids:
+                break
+            choices = section_choices(section_ids, sections_by_id)
+            alternatives.append(make_alternative(
+                len(alternatives) + 1, section_ids, sections_by_id,
+                min_distance=min_distance_to(choices, selected)
+            ))
+            selected.append(choices)
+        return alternatives
+    
+    def _add_hints(self) -> int:
+        """
+        Sugiere a CP-SAT el horario previo: 1 para sus secciones, 0 para el resto.
+        Si el horario previo ya no es viable (ej: sección sin cupos), CP-SAT repara la sugerencia.
+        
+        Returns:
+            Número de secciones sugeridas como asignadas
+        """
+        if not self.hint_section_ids:
+            return 0
+        hinted = 0
+        for section_id, var in self.variables.items():
+            selected = section_id in self.hint_section_ids
+            self.model.AddHint(var, 1 if selected else 0)
+            hinted += selected
+        return hinted
+    
+    def _solver_statistics(self, status: int, hinted: int) -> Dict[str, Any]:
+        """Estadísticas de la búsqueda para ajustar perfiles en producción"""
+        return {
+            "profile": self.solver_profile,
+            "num_workers": self.solver_parameters["num_workers"],
+            "status": self.solver.StatusName(status),
+            "wall_time": self.solver.WallTime(),
+            "user_time": self.solver.UserTime(),
+            "branches": self.solver.NumBranches(),
+            "conflicts": self.solver.NumConflicts(),
+            "objective": self.solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+            "hinted_sections": hinted
+        }
+    
     def _add_objective(self):
         """
-        Agregar función objetivo: maximizar el número de asignaturas asignadas.
+        Agregar función objetivo: maximizar el número de asignaturas asignadas
+        (y, con objective="fitness", desempatar por el fitness del horario).
         """
         # Agrupar secciones por asignatura
         sections_by_subject: Dict[int, List[Section]] = {}
@@ -230,14 +396,143 @@ class ConstraintScheduleSolver:
                 # Variable binaria: 1 si se asignó al menos una sección de esta asignatura
                 subject_var = self.model.NewBoolVar(f"subject_{subject_id}_assigned")
                 subject_vars[subject_id] = subject_var
+                self.subject_vars[subject_id] = subject_var
                 
                 # Si alguna sección está asignada, la variable de asignatura debe ser 1
                 section_vars = [self.variables[s.id] for s in sections]
                 self.model.AddMaxEquality(subject_var, section_vars)
         
+        if self.objective == "fitness":
+            self._add_fitness_objective(list(subject_vars.values()))
+            return
+        
         # Maximizar suma de asignaturas asignadas
         self.model.Maximize(sum(subject_vars.values()))
     
+    def _add_fitness_objective(self, subject_vars: List[cp_model.IntVar]):
+        """
+        Objetivo lexicográfico en una sola llamada:
+        1. Maximizar asignaturas asignadas
+        2. Minimizar el fitness (ScheduleFitness) escalado a enteros
+        
+        Se minimiza -BIG * asignaturas + fitness_escalado, con BIG mayor que el rango
+        posible del fitness escalado. Componentes del fitness sobre las variables de sección:
+        - Huecos: como los bloques asignados no se solapan, los huecos de un día son
+          (fin de la última clase - inicio de la primera) - duración total de las clases
+        - Balance: desviación estándar de clases por día = sqrt(7*S2 - N^2) / 7, con una
+          tabla de raíces (AddElement) indexada por el entero 7*S2 - N^2
+        - Horario: penalización constante por sección según la hora de inicio de sus bloques
+        - Días libres: bonificación por cada día sin clases
+        """
+        # Bloques por sección y día: (inicio, fin) en minutos
+        section_days: Dict[int, Dict[int, List[Tuple[int, int]]]] = {}
+        for section in self.sections:
+            days: Dict[int, List[Tuple[int, int]]] = {}
+            for slot in section.timeslots:
+                days.setdefault(slot.day_of_week, []).append(
+                    (time_to_minutes(slot.start_time), time_to_minutes(slot.end_time))
+                )
+            section_days[section.id] = days
+        
+        terms = []
+        upper_bound = 0  # Cota superior de los términos (todos >= 0 en el óptimo), define BIG
+        
+        # Penalización por horario (lineal en las secciones)
+        for section in self.sections:
+            penalty = sum(ScheduleFitness.start_hour_penalty(slot.start_time.hour) for slot in section.timeslots)
+            scaled = int(round(penalty * FITNESS_SCALE))
+            if scaled:
+                terms.append(scaled * self.variables[section.id])
+                upper_bound += scaled
+        
+        # Máximo de clases de un horario: a lo sumo una sección por asignatura
+        max_slots_by_subject: Dict[int, int] = {}
+        for section in self.sections:
+            max_slots_by_subject[section.subject_id] = max(
+                max_slots_by_subject.get(section.subject_id, 0), len(section.timeslots)
+            )
+        max_slots = sum(max_slots_by_subject.values())
+        max_day_slots: Dict[int, Dict[int, int]] = {}  # día -> asignatura -> máximo de clases
+        for section in self.sections:
+            for day, blocks in section_days[section.id].items():
+                by_subject = max_day_slots.setdefault(day, {})
+                by_subject[section.subject_id] = max(by_subject.get(section.subject_id, 0), len(blocks))
+        day_counts = []
+        day_uppers = []
+        used_days = []
+        gap_unit = int(round(GAP_WEIGHT * FITNESS_SCALE))
+        for day in range(DAYS_PER_WEEK):
+            day_sections = [
+                (section_id, blocks) for section_id, days in section_days.items()
+                for d, blocks in days.items() if d == day
+            ]
+            day_upper = sum(max_day_slots.get(day, {}).values())
+            day_uppers.append(day_upper)
+            count = self.model.NewIntVar(0, day_upper, f"classes_day_{day}")
+            used = self.model.NewBoolVar(f"day_{day}_used")
+            if not day_sections:
+                self.model.Add(count == 0)
+                self.model.Add(used == 0)
+                day_counts.append(count)
+                used_days.append(used)
+                continue
+            
+            self.model.Add(count == sum(len(blocks) * self.variables[sid] for sid, blocks in day_sections))
+            self.model.AddMaxEquality(used, [self.variables[sid] for sid, _ in day_sections])
+            day_counts.append(count)
+            used_days.append(used)
+            
+            # Huecos: span del día - minutos de clase del día
+            first_start = self.model.NewIntVar(0, MINUTES_PER_DAY, f"first_start_day_{day}")
+            last_end = self.model.NewIntVar(0, MINUTES_PER_DAY, f"last_end_day_{day}")
+            span = self.model.NewIntVar(0, MINUTES_PER_DAY, f"span_day_{day}")
+            for section_id, blocks in day_sections:
+                var = self.variables[section_id]
+                self.model.Add(first_start <= min(start for start, _ in blocks)).OnlyEnforceIf(var)
+                self.model.Add(last_end >= max(end for _, end in blocks)).OnlyEnforceIf(var)
+            self.model.Add(span >= last_end - first_start).OnlyEnforceIf(used)
+            class_minutes = sum(
+                sum(max(0, end - start) for start, end in blocks) * self.variables[sid]
+                for sid, blocks in day_sections
+            )
+            terms.append(gap_unit * (span - class_minutes))
+            upper_bound += gap_unit * MINUTES_PER_DAY
+        
+        # Balance: 40 * sqrt(7*S2 - N^2) / 7
+        total = self.model.NewIntVar(0, max_slots, "classes_total")
+        self.model.Add(total == sum(day_counts))
+        squares = [
+            self._square(count, day_upper, f"classes_day_{day}")
+            for day, (count, day_upper) in enumerate(zip(day_counts, day_uppers))
+        ]
+        total_square = self._square(total, max_slots, "classes_total")
+        
+        max_variance = DAYS_PER_WEEK * max_slots * max_slots
+        variance7 = self.model.NewIntVar(0, max_variance, "variance_times_49")
+        self.model.Add(variance7 == DAYS_PER_WEEK * sum(squares) - total_square)
+        sqrt_table = [
+            int(round(BALANCE_WEIGHT * math.sqrt(v) / DAYS_PER_WEEK * FITNESS_SCALE))
+            for v in range(max_variance + 1)
+        ]
+        balance = self.model.NewIntVar(0, sqrt_table[-1], "balance_penalty")
+        self.model.AddElement(variance7, sqrt_table, balance)
+        terms.append(balance)
+        upper_bound += sqrt_table[-1]
+        
+        # Días libres: -20 por día sin clases = -140 + 20 * días usados (la constante se omite)
+        free_day_unit = int(round(-FREE_DAY_BONUS * FITNESS_SCALE))
+        terms.append(free_day_unit * sum(used_days))
+        upper_bound += free_day_unit * DAYS_PER_WEEK
+        
+        big = upper_bound + 1
+        self.model.Minimize(-big * sum(subject_vars) + sum(terms))
+    
+    def _square(self, var: cp_model.IntVar, upper: int, name: str) -> cp_model.IntVar:
+        """var^2 (var en [0, upper]) con una tabla: dominio pequeño, más rápido que AddMultiplicationEquality"""
+        square = self.model.NewIntVar(0, upper * upper, f"{name}_squared")
+        self.model.AddElement(var, [v * v for v in range(upper + 1)], square)
+        return square
+    
     def _analyze_assignment(self) -> Tuple[List[int], List]:
         """
         Analiza qué asignaturas se asignaron y cuáles no, con razones.
@@ -247,12 +542,8 @@ class ConstraintScheduleSolver:
         """
         from app.services.schedule_engine.solution import UnassignedSubject
         
-        # Obtener secciones asignadas
-        assigned_section_ids = [
-            section_id 
-            for section_id, var in self.variables.items()
-            if self.solver.Value(var) == 1
-        ]
+        # Secciones asignadas (del horario principal, aunque se hayan buscado alternativos)
+        assigned_section_ids = self.assigned_section_ids
         
         # Mapear secciones asignadas
         assigned_sections = {s.id: s for s in self.sections if s.id in assigned_section_ids}
@@ -270,59 +561,13 @@ class ConstraintScheduleSolver:
         # print(f"DEBUG: selected_subject_ids: {self.student.selected_subject_ids}")
         
         # Analizar asignaturas no asignadas
-        unassigned_subjects = []
-        for subject_id in self.student.selected_subject_ids:
-            if subject_id not in assigned_subject_ids:
-                # Esta asignatura no se asignó, analizar por qué
-                subject_sections = sections_by_subject.get(subject_id, [])
-                if not subject_sections:
-                    reason = "No hay secciones disponibles para esta asignatura en el período"
-                    conflicting_sections = []
-                    first_section = None
-                else:
-                    # Verificar si todas las secciones chocan con las asignadas
-                    conflicting_sections = []
-                    all_conflict = True
-                    
-                    for section in subject_sections:
-                        conflicts_with = []
-                        for assigned_section in assigned_sections.values():
-                            if section.has_time_overlap_with(assigned_section):
-                                conflicts_with.append({
-                                    "section_id": assigned_section.id,
-                                    "subject_id": assigned_section.subject_id,
-                                    "subject_code": assigned_section.subject_code,
-                                    "subject_name": assigned_section.subject_name,
-                                    "conflict_type": "time_overlap"
-                                })
-                        
-                        if conflicts_with:
-                            conflicting_sections.append({
-                                "section_id": section.id,
-                                "section_number": section.section_number,
-                                "conflicts_with": conflicts_with
-                            })
-                        else:
-                            all_conflict = False
-                    
-                    if all_conflict and conflicting_sections:
-                        reason = f"Todas las secciones ({len(subject_sections)}) tienen conflictos de horario con asignaturas ya asignadas"
-                    elif conflicting_sections:
-                        reason = f"Algunas secciones tienen conflictos de horario. Total de secciones: {len(subject_sections)}"
-                    else:
-                        reason = "No se pudo asignar esta asignatura (razón desconocida)"
-                    
-                    first_section = subject_sections[0]
-                
-                # Obtener información de la asignatura
-                unassigned_subjects.append(UnassignedSubject(
-                    subject_id=subject_id,
-                    subject_code=first_section.subject_code if first_section else f"SUB{subject_id}",
-                    subject_name=first_section.subject_name if first_section else f"Asignatura {subject_id}",
-                    reason=reason,
-                    conflicting_sections=conflicting_sections
-                ))
-        
+        unassigned_subjects = describe_unassigned_subjects(
+            self.student.selected_subject_ids,
+            sections_by_subject,
+            assigned_sections,
+            assigned_subject_ids,
+            self._sections_overlap
+        )
         return assigned_subject_ids, unassigned_subjects
     
     def _analyze_assignment_with_all_sections(self, all_sections: List[Section]) -> Tuple[List[int], List]:
@@ -338,12 +583,8 @@ class ConstraintScheduleSolver:
         """
         from app.services.schedule_engine.solution import UnassignedSubject
         
-        # Obtener secciones asignadas
-        assigned_section_ids = [
-            section_id 
-            for section_id, var in self.variables.items()
-            if self.solver.Value(var) == 1
-        ]
+        # Secciones asignadas (del horario principal, aunque se hayan buscado alternativos)
+        assigned_section_ids = self.assigned_section_ids
         
         # Mapear secciones asignadas (de las secciones filtradas que se pasaron al solver)
         assigned_sections = {s.id: s for s in self.sections if s.id in assigned_section_ids}
@@ -357,61 +598,24 @@ class ConstraintScheduleSolver:
             sections_by_subject[section.subject_id].append(section)
         
         # Analizar asignaturas no asignadas
-        unassigned_subjects = []
-        for subject_id in self.student.selected_subject_ids:
-            if subject_id not in assigned_subject_ids:
-                # Esta asignatura no se asignó, analizar por qué
-                subject_sections = sections_by_subject.get(subject_id, [])
-                if not subject_sections:
-                    reason = "No hay secciones disponibles para esta asignatura en el período"
-                    conflicting_sections = []
-                    first_section = None
-                else:
-                    # Verificar si todas las secciones chocan con las asignadas
-                    conflicting_sections = []
-                    all_conflict = True
-                    
-                    for section in subject_sections:
-                        conflicts_with = []
-                        for assigned_section in assigned_sections.values():
-                            if section.has_time_overlap_with(assigned_section):
-                                conflicts_with.append({
-                                    "section_id": assigned_section.id,
-                                    "subject_id": assigned_section.subject_id,
-                                    "subject_code": assigned_section.subject_code,
-                                    "subject_name": assigned_section.subject_name,
-                                    "conflict_type": "time_overlap"
-                                })
-                        
-                        if conflicts_with:
-                            conflicting_sections.append({
-                                "section_id": section.id,
-                                "section_number": section.section_number,
-                                "conflicts_with": conflicts_with
-                            })
-                        else:
-                            all_conflict = False
-                    
-                    if all_conflict and conflicting_sections:
-                        reason = f"Todas las secciones ({len(subject_sections)}) tienen conflictos de horario con asignaturas ya asignadas"
-                    elif conflicting_sections:
-                        reason = f"Algunas secciones tienen conflictos de horario. Total de secciones: {len(subject_sections)}"
-                    else:
-                        reason = "No se pudo asignar esta asignatura (razón desconocida)"
-                    
-                    first_section = subject_sections[0]
-                
-                # Obtener información de la asignatura
-                unassigned_subjects.append(UnassignedSubject(
-                    subject_id=subject_id,
-                    subject_code=first_section.subject_code if first_section else f"SUB{subject_id}",
-                    subject_name=first_section.subject_name if first_section else f"Asignatura {subject_id}",
-                    reason=reason,
-                    conflicting_sections=conflicting_sections
-                ))
-        
+        unassigned_subjects = describe_unassigned_subjects(
+            self.student.selected_subject_ids,
+            sections_by_subject,
+            assigned_sections,
+            assigned_subject_ids,
+            self._sections_overlap
+        )
         return assigned_subject_ids, unassigned_subjects
     
+    def _sections_overlap(self, section_a: Section, section_b: Section) -> bool:
+        """
+        Verifica choque entre dos secciones usando el índice de conflictos.
+        Si alguna sección no está indexada (ej: secciones filtradas), usa la comparación directa.
+        """
+        if section_a.id in self.conflict_index and section_b.id in self.conflict_index:
+            return self.conflict_index.overlaps(section_a.id, section_b.id)
+        return section_a.has_time_overlap_with(section_b)
+    
     def _analyze_infeasibility(self) -> List[str]:
         """
         Analiza por qué no se encontró solución factible.
@@ -446,11 +650,7 @@ class ConstraintScheduleSolver:
             )
         
         # Verificar conflictos de horario
-        conflict_pairs = []
-        for i, section_a in enumerate(self.sections):
-            for section_b in self.sections[i + 1:]:
-                if section_a.has_time_overlap_with(section_b):
-                    conflict_pairs.append((section_a.id, section_b.id))
+        conflict_pairs = self.conflict_index.conflict_pairs([s.id for s in self.sections])
         
         if conflict_pairs:
             conflicts.append(
@@ -462,3 +662,79 @@ class ConstraintScheduleSolver:
         
         return conflicts
 
+
+def describe_unassigned_subjects(
+    selected_subject_ids: List[int],
+    sections_by_subject: Dict[int, List[Section]],
+    assigned_sections: Dict[int, Section],
+    assigned_subject_ids: List[int],
+    overlaps: Callable[[Section, Section], bool]
+) -> List[UnassignedSubject]:
+    """
+    Describe las asignaturas seleccionadas que no se asignaron y por qué
+    (sin secciones en el período o choques con las secciones asignadas).
+    
+    Args:
+        selected_subject_ids: Asignaturas que el estudiante quiere cursar
+        sections_by_subject: Secciones candidatas agrupadas por asignatura
+        assigned_sections: Secciones asignadas, por ID
+        assigned_subject_ids: Asignaturas asignadas
+        overlaps: Función que indica si dos secciones chocan
+    
+    Returns:
+        Lista de UnassignedSubject
+    """
+    unassigned_subjects = []
+    for subject_id in selected_subject_ids:
+        if subject_id not in assigned_subject_ids:
+            # Esta asignatura no se asignó, analizar por qué
+            subject_sections = sections_by_subject.get(subject_id, [])
+            if not subject_sections:
+                reason = "No hay secciones disponibles para esta asignatura en el período"
+                conflicting_sections = []
+                first_section = None
+            else:
+                # Verificar si todas las secciones chocan con las asignadas
+                conflicting_sections = []
+                all_conflict = True
+                
+                for section in subject_sections:
+                    conflicts_with = []
+                    for assigned_section in assigned_sections.values():
+                        if overlaps(section, assigned_section):
+                            conflicts_with.append({
+                                "section_id": assigned_section.id,
+                                "subject_id": assigned_section.subject_id,
+                                "subject_code": assigned_section.subject_code,
+                                "subject_name": assigned_section.subject_name,
+                                "conflict_type": "time_overlap"
+                            })
+                    
+                    if conflicts_with:
+                        conflicting_sections.append({
+                            "section_id": section.id,
+                            "section_number": section.section_number,
+                            "conflicts_with": conflicts_with
+                        })
+                    else:
+                        all_conflict = False
+                
+                if all_conflict and conflicting_sections:
+                    reason = f"Todas las secciones ({len(subject_sections)}) tienen conflictos de horario con asignaturas ya asignadas"
+                elif conflicting_sections:
+                    reason = f"Algunas secciones tienen conflictos de horario. Total de secciones: {len(subject_sections)}"
+                else:
+                    reason = "No se pudo asignar esta asignatura (razón desconocida)"
+                
+                first_section = subject_sections[0]
+            
+            # Obtener información de la asignatura
+            unassigned_subjects.append(UnassignedSubject(
+                subject_id=subject_id,
+                subject_code=first_section.subject_code if first_section else f"SUB{subject_id}",
+                subject_name=first_section.subject_name if first_section else f"Asignatura {subject_id}",
+                reason=reason,
+                conflicting_sections=conflicting_sections
+            ))
+    
+    return unassigned_subjects
@@ -0,0 +1,219 @@
+"""
+Re-optimización incremental de un horario previo tras agregar o quitar asignaturas
+"""
+import time
+from typing import Dict, List, Optional, Set
+
+from app.services.schedule_engine.models import Student, Section
+from app.services.schedule_engine.solution import ScheduleSolution
+from app.services.schedule_engine.fitness import ScheduleFitness
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.constraint_solver import describe_unassigned_subjects
+from app.config import settings
+
+
+class DeltaScheduleOptimizer:
+    """
+    Ajusta un horario previo a una nueva selección de asignaturas sin resolver desde cero.
+
+    Las secciones previas de las asignaturas que siguen seleccionadas se conservan fijas,
+    salvo en el vecindario del cambio:
+    - Asignaturas cambiadas: las agregadas y las que no tienen una sección previa válida
+      (ej: la sección se llenó)
+    - Asignaturas conservadas cuya sección choca con alguna candidata de una cambiada
+      (las que más candidatas bloquean primero, hasta max_neighborhood asignaturas)
+
+    El vecindario se explora en profundidad con el resto fijo. Criterio (lexicográfico):
+    1. Maximizar el número de asignaturas asignadas
+    2. Minimizar las asignaturas conservadas que cambian de sección
+    3. Minimizar el fitness (ScheduleFitness) del horario completo
+
+    La búsqueda se detiene tras max_nodes nodos con el mejor horario encontrado
+    (metadata.complete = False).
+    """
+
+    def __init__(
+        self,
+        student: Student,
+        available_sections: List[Section],
+        previous_section_ids: List[int],
+        conflict_index: Optional[ConflictIndex] = None,
+        max_neighborhood: Optional[int] = None,
+        max_nodes: Optional[int] = None
+    ):
+        """
+        Args:
+            student: Estudiante con la nueva selección de asignaturas
+            available_sections: Secciones disponibles (cupos y prerrequisitos ya filtrados)
+            previous_section_ids: Secciones del horario previo
+            conflict_index: Índice de conflictos precompilado (opcional)
+            max_neighborhood: Máximo de asignaturas a re-optimizar (por defecto SCHEDULE_DELTA_MAX_NEIGHBORHOOD)
+            max_nodes: Máximo de nodos de la búsqueda (por defecto SCHEDULE_DELTA_MAX_NODES)
+        """
+        self.student = student
+        self.available_sections = available_sections
+        self.conflict_index = conflict_index if conflict_index is not None else ConflictIndex(available_sections)
+        self.max_neighborhood = max_neighborhood or settings.SCHEDULE_DELTA_MAX_NEIGHBORHOOD
+        self.max_nodes = max_nodes or settings.SCHEDULE_DELTA_MAX_NODES
+
+        self.subject_ids: List[int] = list(dict.fromkeys(student.selected_subject_ids))
+        self.sections_by_subject: Dict[int, List[Section]] = {}
+        for section in available_sections:
+            self.sections_by_subject.setdefault(section.subject_id, []).append(section)
+        self.candidates: Dict[int, List[Section]] = {
+            subject_id: [s for s in self.sections_by_subject.get(subject_id, []) if s.available_spots > 0]
+            for subject_id in self.subject_ids
+        }
+
+        # Secciones previas que siguen siendo válidas (una por asignatura, sin choques entre sí)
+        sections_by_id = {s.id: s for candidates in self.candidates.values() for s in candidates}
+        self.previous: Dict[int, Section] = {}
+        blocked = 0
+        for section_id in previous_section_ids:
+            section = sections_by_id.get(section_id)
+            if section is None or section.subject_id in self.previous:
+                continue
+            if blocked & self.conflict_index.bit(section.id):
+                continue
+            self.previous[section.subject_id] = section
+            blocked |= self.conflict_index.conflict_set(section.id)
+
+        self.changed_subject_ids: List[int] = [s for s in self.subject_ids if s not in self.previous]
+        self.neighborhood_subject_ids: List[int] = self._neighborhood()
+        self.nodes_explored = 0
+        self.complete = True
+
+    def _neighborhood(self) -> List[int]:
+        """Asignaturas cambiadas + conservadas que bloquean candidatas de las cambiadas"""
+        changed_candidates = self.conflict_index.bitset_of(
+            s.id for subject_id in self.changed_subject_ids for s in self.candidates[subject_id]
+        )
+        blocking = []
+        for subject_id, section in self.previous.items():
+            blocked_candidates = (self.conflict_index.conflict_set(section.id) & changed_candidates).bit_count()
+            if blocked_candidates:
+                blocking.append((blocked_candidates, subject_id))
+        blocking.sort(key=lambda item: -item[0])
+        room = max(0, self.max_neighborhood - len(self.changed_subject_ids))
+        return self.changed_subject_ids + [subject_id for _, subject_id in blocking[:room]]
+
+    def optimize(self) -> ScheduleSolution:
+        """
+        Ejecuta la búsqueda en el vecindario.
+
+        Returns:
+            ScheduleSolution con el horario ajustado
+        """
+        start_time = time.time()
+        self.nodes_explored = 0
+        self.complete = True
+
+        neighborhood = set(self.neighborhood_subject_ids)
+        fixed = [section for subject_id, section in self.previous.items() if subject_id not in neighborhood]
+        fixed_blocked = self.conflict_index.conflicts_of(s.id for s in fixed)
+
+        # Ramificar primero las asignaturas con menos alternativas; la sección previa primero
+        order = sorted(
+            (subject_id for subject_id in self.neighborhood_subject_ids if self.candidates[subject_id]),
+            key=lambda subject_id: len(self.candidates[subject_id])
+        )
+        options = [
+            sorted(
+                self.candidates[subject_id],
+                key=lambda s, subject_id=subject_id: s is not self.previous.get(subject_id)
+            )
+            for subject_id in order
+        ]
+
+        best: Dict[str, object] = {"count": -1, "changes": 0, "fitness": None, "sections": list(fixed)}
+        chosen: List[Optional[Section]] = [None] * len(order)
+
+        def search(depth: int, blocked: int, count: int, changes: int):
+            if self.nodes_explored >= self.max_nodes:
+                self.complete = False
+                return
+            self.nodes_explored += 1
+
+            if depth == len(order):
+                assigned = self._in_selection_order(fixed + [s for s in chosen if s is not None])
+                fitness = ScheduleFitness(assigned).calculate_fitness()
+                total = len(fixed) + count
+                if (total, -changes) > (best["count"], -best["changes"]) or (
+                    (total, changes) == (best["count"], best["changes"]) and fitness < best["fitness"]
+                ):
+                    best.update(count=total, changes=changes, fitness=fitness, sections=assigned)
+                return
+
+            # Cota superior de asignaturas asignables en la rama
+            assignable = sum(
+                1 for d in range(depth, len(order))
+                if any(not blocked & self.conflict_index.bit(s.id) for s in options[d])
+            )
+            if len(fixed) + count + assignable < best["count"]:
+                return
+            if len(fixed) + count + assignable == best["count"] and changes > best["changes"]:
+                return
+
+            subject_id = order[depth]
+            previous = self.previous.get(subject_id)
+            for section in options[depth]:
+                if blocked & self.conflict_index.bit(section.id):
+                    continue
+                chosen[depth] = section
+                search(
+                    depth + 1,
+                    blocked | self.conflict_index.conflict_set(section.id),
+                    count + 1,
+                    changes + (previous is not None and section is not previous)
+                )
+            chosen[depth] = None
+            # Dejar la asignatura sin asignar
+            search(depth + 1, blocked, count, changes + (previous is not None))
+
+        search(0, fixed_blocked, 0, 0)
+
+        return self._convert_to_solution(best, time.time() - start_time)
+
+    def _in_selection_order(self, sections: List[Section]) -> List[Section]:
+        """Ordena las secciones según el orden de asignaturas seleccionadas"""
+        position = {subject_id: i for i, subject_id in enumerate(self.subject_ids)}
+        return sorted(sections, key=lambda s: position[s.subject_id])
+
+    def _convert_to_solution(self, best: Dict[str, object], processing_time: float) -> ScheduleSolution:
+        """Convierte el mejor horario encontrado a ScheduleSolution"""
+        sections: List[Section] = best["sections"]
+        assigned_sections = {s.id: s for s in sections}
+        assigned_subject_ids = list(dict.fromkeys(s.subject_id for s in sections))
+        fitness = best["fitness"] if best["fitness"] is not None else ScheduleFitness(sections).calculate_fitness()
+
+        unassigned_subjects = describe_unassigned_subjects(
+            self.student.selected_subject_ids,
+            self.sections_by_subject,
+            assigned_sections,
+            assigned_subject_ids,
+            lambda a, b: self.conflict_index.overlaps(a.id, b.id)
+        )
+        kept: Set[int] = {
+            subject_id for subject_id, section in self.previous.items() if section.id in assigned_sections
+        }
+
+        return ScheduleSolution(
+            student_id=self.student.id,
+            is_feasible=True,
+            assigned_section_ids=[s.id for s in sections],
+            assigned_subject_ids=assigned_subject_ids,
+            unassigned_subjects=unassigned_subjects,
+            processing_time=processing_time,
+            conflicts=[],
+            solver_status="DELTA_OPTIMAL" if self.complete else "DELTA_FEASIBLE",
+            quality_score=fitness,
+            metadata={
+                "engine": "delta",
+                "changed_subject_ids": self.changed_subject_ids,
+                "neighborhood_subject_ids": self.neighborhood_subject_ids,
+                "kept_subject_ids": [s for s in self.subject_ids if s in kept],
+                "moved_subject_ids": [s for s in self.previous if s not in kept],
+                "nodes_explored": self.nodes_explored,
+                "complete": self.complete
+            }
+        )
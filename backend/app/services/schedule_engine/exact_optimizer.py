@@ -0,0 +1,285 @@
+"""
+Optimizador exacto (ramificación y poda) para espacios de secciones pequeños
+"""
+import time
+from typing import Any, Callable, List, Dict, Optional
+
+from app.services.schedule_engine.models import Student, Section
+from app.services.schedule_engine.solution import ScheduleSolution
+from app.services.schedule_engine.fitness import ScheduleFitness
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.constraint_solver import describe_unassigned_subjects
+from app.services.schedule_engine.alternatives import make_alternative, min_distance_to, schedule_distance
+
+
+class ExactScheduleOptimizer:
+    """
+    Encuentra el horario óptimo enumerando combinaciones con búsqueda en profundidad.
+
+    Criterio (lexicográfico, igual que el motor híbrido):
+    1. Maximizar el número de asignaturas asignadas
+    2. Minimizar el fitness (ScheduleFitness) del horario
+
+    Poda:
+    - Choques de horario con el índice de conflictos (un AND por sección candidata)
+    - Cota superior de asignaturas asignables en la rama
+    - Cota inferior del fitness: penalización horaria acumulada + mínima de las
+      asignaturas restantes que aún tienen alguna sección compatible (entre esas
+      secciones) + bonificación de días libres actual (los huecos y el desbalance
+      nunca son negativos, y agregar clases solo puede quitar días libres)
+    """
+
+    def __init__(
+        self,
+        student: Student,
+        available_sections: List[Section],
+        conflict_index: Optional[ConflictIndex] = None,
+        alternatives: int = 1,
+        min_distance: int = 1,
+        progress_callback: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ):
+        """
+        Args:
+            student: Datos del estudiante
+            available_sections: Secciones disponibles para elegir
+            conflict_index: Índice de conflictos precompilado (opcional, se construye si no se proporciona)
+            alternatives: Número de horarios distintos a retornar (K mejores)
+            min_distance: Asignaturas con distinta sección entre cada par de horarios alternativos
+            progress_callback: Recibe el horario óptimo y cada alternativo encontrado (opcional).
+                               Si retorna True, no se buscan más alternativos
+        """
+        self.student = student
+        self.available_sections = available_sections
+        self.conflict_index = conflict_index if conflict_index is not None else ConflictIndex(available_sections)
+        self.alternatives = alternatives
+        self.min_distance = min_distance
+        self.progress_callback = progress_callback
+
+        self.sections_by_subject: Dict[int, List[Section]] = {}
+        for section in available_sections:
+            if section.subject_id not in self.sections_by_subject:
+                self.sections_by_subject[section.subject_id] = []
+            self.sections_by_subject[section.subject_id].append(section)
+
+        # Asignaturas en el orden seleccionado (sin duplicados) y sus candidatas con cupos
+        self.subject_ids: List[int] = list(dict.fromkeys(student.selected_subject_ids))
+        self.candidates: Dict[int, List[Section]] = {
+            subject_id: [
+                s for s in self.sections_by_subject.get(subject_id, [])
+                if s.available_spots > 0
+            ]
+            for subject_id in self.subject_ids
+        }
+
+        self.nodes_explored = 0
+
+    def estimate_search_space(self) -> int:
+        """
+        Tamaño del espacio de búsqueda: producto de (secciones candidatas + 1) por asignatura
+        (el +1 representa dejar la asignatura sin asignar).
+        """
+        size = 1
+        for subject_id in self.subject_ids:
+            size *= len(self.candidates[subject_id]) + 1
+        return size
+
+    def optimize(self) -> ScheduleSolution:
+        """
+        Ejecuta la búsqueda exacta.
+
+        Con alternatives > 1 repite la búsqueda sobre el mismo árbol: cada horario alternativo
+        es el óptimo entre los que están a min_distance o más de todos los anteriores.
+
+        Returns:
+            ScheduleSolution con el horario óptimo (y los alternativos en solution.alternatives)
+        """
+        start_time = time.time()
+        self.nodes_explored = 0
+
+        # Ramificar primero las asignaturas con menos alternativas (poda más temprana)
+        order = sorted(
+            (subject_id for subject_id in self.subject_ids if self.candidates[subject_id]),
+            key=lambda subject_id: len(self.candidates[subject_id])
+        )
+        # Secciones de cada asignatura ordenadas por penalización horaria (mejores primero)
+        options = [
+            sorted(self.candidates[subject_id], key=self._time_penalty)
+            for subject_id in order
+        ]
+        penalties = [[self._time_penalty(s) for s in level] for level in options]
+
+        best = self._search(options, penalties, [])
+        solution = self._convert_to_solution(best["sections"], best["fitness"], 0.0)
+        stopped = self._report_progress(best, 1, start_time)
+
+        if self.alternatives > 1 and best["sections"]:
+            sections_by_id = {s.id: s for s in self.available_sections}
+            selected = [{s.subject_id: s.id for s in best["sections"]}]
+            solution.alternatives = [
+                make_alternative(1, solution.assigned_section_ids, sections_by_id, best["fitness"])
+            ]
+            while not stopped and len(solution.alternatives) < self.alternatives:
+                alternative = self._search(options, penalties, selected)
+                if not alternative["sections"]:
+                    break
+                choices = {s.subject_id: s.id for s in alternative["sections"]}
+                solution.alternatives.append(make_alternative(
+                    len(solution.alternatives) + 1,
+                    [s.id for s in alternative["sections"]],
+                    sections_by_id,
+                    alternative["fitness"],
+                    min_distance_to(choices, selected)
+                ))
+                selected.append(choices)
+                stopped = self._report_progress(best, len(solution.alternatives), start_time)
+
+        if stopped:
+            solution.metadata["stopped_early"] = True
+            solution.metadata["stop_reason"] = "cancelled"
+        solution.processing_time = time.time() - start_time
+        solution.metadata["nodes_explored"] = self.nodes_explored
+        return solution
+
+    def _report_progress(self, best: Dict[str, object], schedules_found: int, start_time: float) -> bool:
+        """Informa el horario óptimo (incumbente); retorna True si el consumidor pidió detener"""
+        if self.progress_callback is None:
+            return False
+        return bool(self.progress_callback({
+            "phase": "exact",
+            "best_fitness": best["fitness"],
+            "section_ids": [s.id for s in best["sections"]],
+            "schedules_found": schedules_found,
+            "alternatives": self.alternatives,
+            "elapsed": time.time() - start_time
+        }))
+
+    def _search(
+        self,
+        options: List[List[Section]],
+        penalties: List[List[float]],
+        excluded: List[Dict[int, int]]
+    ) -> Dict[str, object]:
+        """
+        Ramificación y poda sobre las asignaturas (en el orden de options).
+
+        Args:
+            options: Secciones candidatas de cada nivel del árbol (por penalización horaria)
+            penalties: Penalización horaria de cada sección de options
+            excluded: Horarios ({subject_id: section_id}) de los que la solución debe estar
+                      a min_distance o más (vacío: sin restricción)
+
+        Returns:
+            {"count", "fitness", "sections"} del mejor horario (sections vacío si no hay)
+        """
+        best: Dict[str, object] = {"count": -1, "fitness": None, "sections": []}
+        chosen: List[Optional[Section]] = [None] * len(options)
+
+        def search(depth: int, blocked: int, count: int, time_penalty: float, used_days: int):
+            self.nodes_explored += 1
+
+            if depth == len(options):
+                if excluded:
+                    # Alternativos: al menos una asignatura y distintos de los ya elegidos
+                    choices = {s.subject_id: s.id for s in chosen if s is not None}
+                    if not choices or any(
+                        schedule_distance(choices, other) < self.min_distance for other in excluded
+                    ):
+                        return
+                assigned = self._in_selection_order([s for s in chosen if s is not None])
+                fitness = ScheduleFitness(assigned).calculate_fitness()
+                if count > best["count"] or (count == best["count"] and fitness < best["fitness"]):
+                    best.update(count=count, fitness=fitness, sections=assigned)
+                return
+
+            # Cota superior de asignaturas: las restantes con alguna sección compatible.
+            # Las secciones de cada nivel van por penalización: la primera compatible es la mínima
+            assignable = 0
+            remaining_penalty = 0.0
+            for d in range(depth, len(options)):
+                for section, penalty in zip(options[d], penalties[d]):
+                    if not blocked & self.conflict_index.bit(section.id):
+                        assignable += 1
+                        remaining_penalty += penalty
+                        break
+            if count + assignable < best["count"]:
+                return
+            if count + assignable == best["count"]:
+                # Para empatar hay que asignar todas las asignables: aplicar cota de fitness
+                free_days = 7 - bin(used_days).count("1")
+                lower_bound = time_penalty + remaining_penalty + free_days * -20.0
+                if lower_bound >= best["fitness"]:
+                    return
+
+            for section, penalty in zip(options[depth], penalties[depth]):
+                if blocked & self.conflict_index.bit(section.id):
+                    continue
+                chosen[depth] = section
+                search(
+                    depth + 1,
+                    blocked | self.conflict_index.conflict_set(section.id),
+                    count + 1,
+                    time_penalty + penalty,
+                    used_days | self._day_mask(section)
+                )
+            chosen[depth] = None
+            # Dejar la asignatura sin asignar
+            search(depth + 1, blocked, count, time_penalty, used_days)
+
+        search(0, 0, 0, 0.0, 0)
+        return best
+
+    def _in_selection_order(self, sections: List[Section]) -> List[Section]:
+        """Ordena las secciones según el orden de asignaturas seleccionadas (como los genes del AG)"""
+        position = {subject_id: i for i, subject_id in enumerate(self.subject_ids)}
+        return sorted(sections, key=lambda s: position[s.subject_id])
+
+    @staticmethod
+    def _time_penalty(section: Section) -> float:
+        """Penalización horaria de una sección (componente monótono del fitness)"""
+        return sum(ScheduleFitness.start_hour_penalty(slot.start_time.hour) for slot in section.timeslots)
+
+    @staticmethod
+    def _day_mask(section: Section) -> int:
+        """Máscara de días con clase de una sección"""
+        mask = 0
+        for slot in section.timeslots:
+            mask |= 1 << slot.day_of_week
+        return mask
+
+    def _convert_to_solution(
+        self,
+        sections: List[Section],
+        fitness: Optional[float],
+        processing_time: float
+    ) -> ScheduleSolution:
+        """Convierte la mejor combinación encontrada a ScheduleSolution"""
+        assigned_sections = {s.id: s for s in sections}
+        assigned_subject_ids = list(set(s.subject_id for s in sections))
+
+        unassigned_subjects = describe_unassigned_subjects(
+            self.student.selected_subject_ids,
+            self.sections_by_subject,
+            assigned_sections,
+            assigned_subject_ids,
+            lambda a, b: self.conflict_index.overlaps(a.id, b.id)
+        )
+
+        if fitness is None:
+            fitness = ScheduleFitness(sections).calculate_fitness()
+
+        return ScheduleSolution(
+            student_id=self.student.id,
+            is_feasible=True,
+            assigned_section_ids=[s.id for s in sections],
+            assigned_subject_ids=assigned_subject_ids,
+            unassigned_subjects=unassigned_subjects,
+            processing_time=processing_time,
+            conflicts=[],
+            solver_status="EXACT_OPTIMAL",
+            quality_score=fitness,
+            metadata={
+                "engine": "exact",
+                "search_space": self.estimate_search_space(),
+                "nodes_explored": self.nodes_explored
+            }
+        )
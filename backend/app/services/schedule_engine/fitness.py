@@ -92,6 +92,14 @@ class ScheduleFitness:
         for slot in self.slots:
             classes_per_day[slot.day_of_week] += 1
         
+        return self.balance_penalty_for_counts(classes_per_day)
+    
+    @staticmethod
+    def balance_penalty_for_counts(classes_per_day: List[int]) -> float:
+        """
+        Penalización de balance a partir del número de clases por día (7 valores).
+        Compartida con el evaluador por lotes para garantizar resultados idénticos.
+        """
         # Calcular desviación estándar
         mean = sum(classes_per_day) / len(classes_per_day) if classes_per_day else 0
         
@@ -119,23 +127,27 @@ class ScheduleFitness:
         penalty = 0.0
         
         for slot in self.slots:
-            start_hour = slot.start_time.hour
-            
-            if start_hour < 7:
-                # Muy temprano (antes de 7am)
-                penalty += 20.0
-            elif start_hour > 18:
-                # Muy tarde (después de 6pm)
-                penalty += 10.0
-            elif start_hour < 8:
-                # Temprano pero aceptable (7am-8am)
-                penalty += 5.0
-            elif start_hour > 17:
-                # Tarde pero aceptable (5pm-6pm)
-                penalty += 3.0
+            penalty += self.start_hour_penalty(slot.start_time.hour)
         
         return penalty
     
+    @staticmethod
+    def start_hour_penalty(start_hour: int) -> float:
+        """Penalización de una clase según su hora de inicio"""
+        if start_hour < 7:
+            # Muy temprano (antes de 7am)
+            return 20.0
+        elif start_hour > 18:
+            # Muy tarde (después de 6pm)
+            return 10.0
+        elif start_hour < 8:
+            # Temprano pero aceptable (7am-8am)
+            return 5.0
+        elif start_hour > 17:
+            # Tarde pero aceptable (5pm-6pm)
+            return 3.0
+        return 0.0
+    
     def _calculate_free_days_bonus(self) -> float:
         """
         Bonifica tener días completamente libres.
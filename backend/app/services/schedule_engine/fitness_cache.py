@@ -0,0 +1,130 @@
+"""
+Caché LRU de fitness para el algoritmo genético
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from app.services.schedule_engine.models import Section
+
+FitnessKey = Tuple[int, ...]
+
+
+class FitnessCache:
+    """
+    Caché LRU acotada de fitness, indexada por la tupla canónica de IDs de secciones.
+
+    La clave es la tupla ordenada de las secciones válidas del individuo, de modo que
+    genotipos duplicados (muy frecuentes tras cruce y mutación) se evalúan una sola vez.
+    Es segura para uso concurrente entre hilos.
+    """
+
+    def __init__(self, maxsize: int = 50000):
+        """
+        Args:
+            maxsize: Número máximo de entradas (se descartan las menos usadas)
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[FitnessKey, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(section_ids: Iterable[int]) -> FitnessKey:
+        """Clave canónica: IDs de secciones válidas (sin -1), ordenados"""
+        return tuple(sorted(sid for sid in section_ids if sid != -1))
+
+    def get(self, key: FitnessKey) -> Optional[float]:
+        """Obtiene el fitness cacheado (registra acierto o fallo)"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: FitnessKey, value: float):
+        """Guarda un fitness, descartando la entrada menos usada si se supera el tamaño"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def record_hits(self, count: int):
+        """Registra aciertos resueltos fuera de get() (ej: duplicados dentro de un mismo lote)"""
+        with self._lock:
+            self.hits += count
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores para exponer en la metadata de la solución"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def offer_fingerprint(sections: Iterable[Section]) -> int:
+    """
+    Huella de la oferta cargada (secciones y sus bloques de horario).
+    Identifica una "foto" de la oferta: si cambia algún horario, cambia la huella.
+    """
+    return hash(tuple(sorted(
+        (
+            section.id,
+            tuple((slot.day_of_week, slot.start_time, slot.end_time) for slot in section.timeslots)
+        )
+        for section in sections
+    )))
+
+
+# Cachés compartidas entre ejecuciones, por (período, versión de la oferta)
+_shared_caches: "OrderedDict[Tuple[int, Hashable], FitnessCache]" = OrderedDict()
+_shared_lock = threading.Lock()
+MAX_SHARED_CACHES = 16
+
+
+def get_shared_fitness_cache(
+    period_id: int,
+    offer_version: Hashable,
+    maxsize: int = 50000
+) -> FitnessCache:
+    """
+    Obtiene (o crea) la caché compartida para un período y una versión de la oferta.
+
+    Args:
+        period_id: ID del período académico
+        offer_version: Versión/huella de la oferta; una oferta distinta usa otra caché
+        maxsize: Tamaño máximo de la caché si se crea
+    """
+    key = (period_id, offer_version)
+    with _shared_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = FitnessCache(maxsize=maxsize)
+            _shared_caches[key] = cache
+            while len(_shared_caches) > MAX_SHARED_CACHES:
+                _shared_caches.popitem(last=False)
+        else:
+            _shared_caches.move_to_end(key)
+        return cache
+
+
+def clear_shared_fitness_caches(period_id: Optional[int] = None):
+    """Elimina las cachés compartidas (de un período o todas)"""
+    with _shared_lock:
+        if period_id is None:
+            _shared_caches.clear()
+            return
+        for key in [k for k in _shared_caches if k[0] == period_id]:
+            del _shared_caches[key]
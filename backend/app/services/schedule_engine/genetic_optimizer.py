@@ -1,15 +1,22 @@
 """
 Optimizador de horarios usando Algoritmo Genético (DEAP)
 """
+import math
 import random
 import time
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Callable, Any
+import numpy as np
 from deap import base, creator, tools
 
 from app.services.schedule_engine.models import Student, Section
-from app.services.schedule_engine.solution import ScheduleSolution, UnassignedSubject
+from app.services.schedule_engine.solution import ScheduleSolution, UnassignedSubject, ScheduleAlternative
 from app.services.schedule_engine.fitness import ScheduleFitness
+from app.services.schedule_engine.batch_fitness import BatchScheduleFitness
+from app.services.schedule_engine.fitness_cache import FitnessCache
+from app.services.schedule_engine.alternatives import select_diverse
+from app.config import settings
 from app.services.schedule_engine.constraint_solver import ConstraintScheduleSolver
+from app.services.schedule_engine.conflict_index import ConflictIndex
 
 
 # Configurar DEAP
@@ -36,7 +43,16 @@ class GeneticScheduleOptimizer:
         generations: int = 50,
         crossover_rate: float = 0.7,
         mutation_rate: float = 0.2,
-        tournament_size: int = 3
+        tournament_size: int = 3,
+        conflict_index: Optional[ConflictIndex] = None,
+        fitness_cache: Optional[FitnessCache] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        stagnation_generations: Optional[int] = None,
+        target_fitness: Optional[float] = None,
+        time_budget_ms: Optional[int] = None,
+        adaptive_population: bool = False,
+        alternatives: int = 1,
+        min_distance: int = 1
     ):
         """
         Args:
@@ -47,6 +63,21 @@ class GeneticScheduleOptimizer:
             crossover_rate: Probabilidad de cruce (0.0-1.0)
             mutation_rate: Probabilidad de mutación (0.0-1.0)
             tournament_size: Tamaño del torneo para selección
+            conflict_index: Índice de conflictos precompilado (opcional, se construye si no se proporciona)
+            fitness_cache: Caché de fitness (opcional). Si no se proporciona, se crea una
+                           que vive solo durante esta optimización
+            progress_callback: Se llama al final de cada generación con el mejor individuo
+                               (opcional). Si retorna True, se detiene la evolución y se
+                               retorna el mejor horario encontrado hasta el momento
+            stagnation_generations: Detener si el mejor fitness no mejora en este número
+                                    de generaciones consecutivas (opcional)
+            target_fitness: Detener al alcanzar un fitness menor o igual (opcional)
+            time_budget_ms: Tiempo máximo de evolución en milisegundos (opcional)
+            adaptive_population: Ajustar la población al tamaño del espacio de búsqueda,
+                                 con population_size como máximo
+            alternatives: Número de horarios distintos a retornar (K mejores entre los
+                          individuos evaluados)
+            min_distance: Asignaturas con distinta sección entre cada par de horarios alternativos
         """
         self.student = student
         self.available_sections = available_sections
@@ -55,6 +86,14 @@ class GeneticScheduleOptimizer:
         self.crossover_rate = crossover_rate
         self.mutation_rate = mutation_rate
         self.tournament_size = tournament_size
+        self.progress_callback = progress_callback
+        self.stagnation_generations = stagnation_generations
+        self.target_fitness = target_fitness
+        self.time_budget_ms = time_budget_ms
+        self.alternatives = alternatives
+        self.min_distance = min_distance
+        # Genotipos evaluados y su fitness (solo si se piden horarios alternativos)
+        self.archive: Dict[tuple, float] = {}
         
         # Mapear secciones por asignatura para acceso rápido
         self.sections_by_subject: Dict[int, List[Section]] = {}
@@ -66,8 +105,40 @@ class GeneticScheduleOptimizer:
         # Mapear secciones por ID
         self.sections_by_id: Dict[int, Section] = {s.id: s for s in available_sections}
         
+        if adaptive_population:
+            self.population_size = self.adaptive_population_size(population_size)
+        
+        # Índice de conflictos: verificar choques con un AND sobre bitsets
+        self.conflict_index = conflict_index if conflict_index is not None else ConflictIndex(available_sections)
+        
+        # Evaluador vectorizado: evalúa poblaciones completas en pocas operaciones de arreglos
+        self.batch_fitness = BatchScheduleFitness(available_sections)
+        
+        # Caché de fitness por genotipo (tupla canónica de secciones)
+        self.fitness_cache_shared = fitness_cache is not None
+        self.fitness_cache = fitness_cache if fitness_cache is not None else FitnessCache(maxsize=settings.GA_FITNESS_CACHE_SIZE)
+        # Aciertos y fallos de esta optimización (la caché compartida acumula los de todas)
+        self._cache_hits = 0
+        self._cache_misses = 0
+        
         self._setup_deap()
     
+    def estimate_search_space(self) -> int:
+        """Tamaño del espacio de búsqueda: producto de (secciones + 1) por asignatura seleccionada"""
+        size = 1
+        for subject_id in dict.fromkeys(self.student.selected_subject_ids):
+            size *= len(self.sections_by_subject.get(subject_id, [])) + 1
+        return size
+    
+    def adaptive_population_size(self, max_population: int) -> int:
+        """
+        Población proporcional a log2 del espacio de búsqueda (GA_POPULATION_PER_BIT por bit),
+        entre GA_MIN_POPULATION y max_population.
+        """
+        bits = math.log2(max(2, self.estimate_search_space()))
+        size = int(math.ceil(settings.GA_POPULATION_PER_BIT * bits))
+        return max(min(settings.GA_MIN_POPULATION, max_population), min(max_population, size))
+    
     def _setup_deap(self):
         """Configurar toolbox de DEAP"""
         self.toolbox = base.Toolbox()
@@ -89,6 +160,8 @@ class GeneticScheduleOptimizer:
             Lista de IDs de secciones (una por cada asignatura seleccionada)
         """
         individual = []
+        # Bitset de secciones que chocan con alguna de las ya seleccionadas
+        blocked = 0
         
         for subject_id in self.student.selected_subject_ids:
             # Obtener secciones disponibles para esta asignatura
@@ -100,28 +173,17 @@ class GeneticScheduleOptimizer:
                 continue
             
             # Elegir sección aleatoria que no cause choques con las ya seleccionadas
-            valid_sections = []
-            for section in subject_sections:
-                # Verificar que no choque con secciones ya seleccionadas
-                is_valid = True
-                for selected_section_id in individual:
-                    if selected_section_id == -1:
-                        continue
-                    selected_section = self.sections_by_id.get(selected_section_id)
-                    if selected_section and section.has_time_overlap_with(selected_section):
-                        is_valid = False
-                        break
-                
-                # Verificar cupos
-                if section.available_spots <= 0:
-                    is_valid = False
-                
-                if is_valid:
-                    valid_sections.append(section)
+            # ni esté sin cupos
+            valid_sections = [
+                section for section in subject_sections
+                if not blocked & self.conflict_index.bit(section.id)
+                and section.available_spots > 0
+            ]
             
             if valid_sections:
                 selected = random.choice(valid_sections)
                 individual.append(selected.id)
+                blocked |= self.conflict_index.conflict_set(selected.id)
             else:
                 # No hay secciones válidas, usar placeholder
                 individual.append(-1)
@@ -154,6 +216,54 @@ class GeneticScheduleOptimizer:
         
         return (fitness_score,)
     
+    def _evaluate_population(self, individuals: List[List[int]]) -> List[Tuple[float]]:
+        """
+        Evalúa varios individuos en un solo lote (mismo resultado que _evaluate).
+        
+        Args:
+            individuals: Individuos a evaluar
+        
+        Returns:
+            Lista de tuplas de fitness, en el mismo orden
+        """
+        if not individuals:
+            return []
+        
+        # Consultar caché: solo se evalúan genotipos no vistos (una vez cada uno)
+        keys = [
+            FitnessCache.make_key(sid for sid in individual if sid in self.sections_by_id)
+            for individual in individuals
+        ]
+        scores: Dict[tuple, float] = {}
+        pending: Dict[tuple, List[int]] = {}
+        for key, individual in zip(keys, individuals):
+            if key in scores or key in pending:
+                continue
+            cached = self.fitness_cache.get(key)
+            if cached is not None:
+                scores[key] = cached
+            else:
+                pending[key] = individual
+        # Duplicados dentro del mismo lote también ahorran una evaluación
+        self.fitness_cache.record_hits(len(individuals) - len(scores) - len(pending))
+        self._cache_hits += len(individuals) - len(pending)
+        self._cache_misses += len(pending)
+        
+        if pending:
+            pending_keys = list(pending.keys())
+            population = self.batch_fitness.indices_for(
+                np.array(list(pending.values()), dtype=np.int64).reshape(len(pending), -1)
+            )
+            batch_scores = self.batch_fitness.evaluate(population)
+            # Individuos sin ninguna sección válida reciben penalización alta (igual que _evaluate)
+            is_empty = (population < 0).all(axis=1)
+            batch_scores = np.where(is_empty, 10000.0, batch_scores)
+            for key, score in zip(pending_keys, batch_scores):
+                scores[key] = float(score)
+                self.fitness_cache.put(key, float(score))
+        
+        return [(scores[key],) for key in keys]
+    
     def _crossover(self, ind1: creator.Individual, ind2: creator.Individual) -> Tuple[creator.Individual, creator.Individual]:
         """
         Operador de cruce: combina dos individuos (padres) para crear dos hijos.
@@ -202,22 +312,15 @@ class GeneticScheduleOptimizer:
             
             if subject_sections:
                 # Filtrar secciones válidas (que no choquen con otras ya seleccionadas)
-                valid_sections = []
-                for section in subject_sections:
-                    is_valid = True
-                    for i, selected_section_id in enumerate(individual):
-                        if i == idx or selected_section_id == -1:
-                            continue
-                        selected_section = self.sections_by_id.get(selected_section_id)
-                        if selected_section and section.has_time_overlap_with(selected_section):
-                            is_valid = False
-                            break
-                    
-                    if section.available_spots <= 0:
-                        is_valid = False
-                    
-                    if is_valid:
-                        valid_sections.append(section)
+                blocked = self.conflict_index.conflicts_of(
+                    section_id for i, section_id in enumerate(individual)
+                    if i != idx and section_id != -1
+                )
+                valid_sections = [
+                    section for section in subject_sections
+                    if not blocked & self.conflict_index.bit(section.id)
+                    and section.available_spots > 0
+                ]
                 
                 if valid_sections:
                     # Cambiar por otra sección válida
@@ -228,6 +331,49 @@ class GeneticScheduleOptimizer:
         
         return (individual,)
     
+    def initial_population(self) -> List[creator.Individual]:
+        """Crea y evalúa la población inicial"""
+        population = self.toolbox.population(n=self.population_size)
+        fitnesses = self._evaluate_population(population)
+        for ind, fit in zip(population, fitnesses):
+            ind.fitness.values = fit
+        return population
+    
+    def next_generation(self, population: List[creator.Individual]) -> List[creator.Individual]:
+        """
+        Una generación: selección, cruce, mutación y evaluación de los individuos modificados.
+        
+        Args:
+            population: Población evaluada
+        
+        Returns:
+            Nueva población evaluada
+        """
+        # Selección
+        offspring = self.toolbox.select(population, len(population))
+        offspring = list(map(self.toolbox.clone, offspring))
+        
+        # Cruce
+        for child1, child2 in zip(offspring[::2], offspring[1::2]):
+            if random.random() < self.crossover_rate:
+                self.toolbox.mate(child1, child2)
+                del child1.fitness.values
+                del child2.fitness.values
+        
+        # Mutación
+        for mutant in offspring:
+            if random.random() < self.mutation_rate:
+                self.toolbox.mutate(mutant)
+                del mutant.fitness.values
+        
+        # Evaluar individuos con fitness inválido
+        invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+        fitnesses = self._evaluate_population(invalid_ind)
+        for ind, fit in zip(invalid_ind, fitnesses):
+            ind.fitness.values = fit
+        
+        return offspring
+    
     def optimize(self) -> ScheduleSolution:
         """
         Ejecuta algoritmo genético.
@@ -236,55 +382,92 @@ class GeneticScheduleOptimizer:
             ScheduleSolution con el mejor horario encontrado
         """
         start_time = time.time()
+        self.archive = {}
+        population = self.initial_population()
+        self._archive(population)
         
-        # Crear población inicial
-        population = self.toolbox.population(n=self.population_size)
-        
-        # Evaluar población inicial
-        fitnesses = list(map(self.toolbox.evaluate, population))
-        for ind, fit in zip(population, fitnesses):
-            ind.fitness.values = fit
+        # Mejor individuo histórico: sin elitismo, la última población puede haberlo perdido
+        best_individual = self.toolbox.clone(tools.selBest(population, 1)[0])
+        stagnant_generations = 0
+        stop_reason = "generations"
         
-        # Evolucionar por N generaciones
+        # Evolucionar hasta N generaciones (o hasta un criterio de parada)
         best_fitness_history = []
         for generation in range(self.generations):
-            # Selección
-            offspring = self.toolbox.select(population, len(population))
-            offspring = list(map(self.toolbox.clone, offspring))
-            
-            # Cruce
-            for child1, child2 in zip(offspring[::2], offspring[1::2]):
-                if random.random() < self.crossover_rate:
-                    self.toolbox.mate(child1, child2)
-                    del child1.fitness.values
-                    del child2.fitness.values
-            
-            # Mutación
-            for mutant in offspring:
-                if random.random() < self.mutation_rate:
-                    self.toolbox.mutate(mutant)
-                    del mutant.fitness.values
-            
-            # Evaluar individuos con fitness inválido
-            invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-            fitnesses = map(self.toolbox.evaluate, invalid_ind)
-            for ind, fit in zip(invalid_ind, fitnesses):
-                ind.fitness.values = fit
-            
-            # Reemplazar población
-            population[:] = offspring
+            population = self.next_generation(population)
+            self._archive(population)
             
             # Registrar mejor fitness de esta generación
             best_ind = tools.selBest(population, 1)[0]
             best_fitness_history.append(best_ind.fitness.values[0])
+            if best_ind.fitness.values[0] < best_individual.fitness.values[0]:
+                best_individual = self.toolbox.clone(best_ind)
+                stagnant_generations = 0
+            else:
+                stagnant_generations += 1
+            
+            # Informar progreso; el consumidor puede detener las generaciones restantes
+            if self.progress_callback is not None and self.progress_callback({
+                "phase": "genetic",
+                "generation": generation + 1,
+                "generations": self.generations,
+                "best_fitness": best_ind.fitness.values[0],
+                "section_ids": [sid for sid in best_ind if sid != -1 and sid in self.sections_by_id],
+                "elapsed": time.time() - start_time
+            }):
+                stop_reason = "cancelled"
+                break
+            
+            # Criterios de parada por convergencia y presupuesto
+            if self.target_fitness is not None and best_individual.fitness.values[0] <= self.target_fitness:
+                stop_reason = "target_fitness"
+                break
+            if self.stagnation_generations and stagnant_generations >= self.stagnation_generations:
+                stop_reason = "stagnation"
+                break
+            if self.time_budget_ms and (time.time() - start_time) * 1000 >= self.time_budget_ms:
+                stop_reason = "time_budget"
+                break
         
         processing_time = time.time() - start_time
         
-        # Obtener mejor individuo
-        best_individual = tools.selBest(population, 1)[0]
-        
         # Convertir a ScheduleSolution
-        return self._convert_to_solution(best_individual, processing_time, best_fitness_history)
+        solution = self._convert_to_solution(best_individual, processing_time, best_fitness_history)
+        solution.metadata.update({
+            "population_size": self.population_size,
+            "generations_run": len(best_fitness_history),
+            "stopped_early": stop_reason != "generations",
+            "stop_reason": stop_reason
+        })
+        if self.alternatives > 1 and solution.is_feasible:
+            solution.alternatives = self.select_alternatives(
+                (solution.assigned_section_ids, solution.quality_score)
+            )
+        return solution
+    
+    def _archive(self, population: List[creator.Individual]):
+        """Registra los genotipos de la población para elegir horarios alternativos"""
+        if self.alternatives <= 1:
+            return
+        for ind in population:
+            key = FitnessCache.make_key(sid for sid in ind if sid in self.sections_by_id)
+            if key:
+                self.archive[key] = ind.fitness.values[0]
+    
+    def select_alternatives(self, first: Tuple[List[int], float]) -> List[ScheduleAlternative]:
+        """
+        Los K mejores horarios distintos entre los individuos evaluados en la optimización.
+        
+        Args:
+            first: (section_ids, fitness) del horario principal (rango 1)
+        """
+        return select_diverse(
+            ((list(key), fitness) for key, fitness in self.archive.items()),
+            self.sections_by_id,
+            self.alternatives,
+            self.min_distance,
+            first=first
+        )
     
     def _convert_to_solution(
         self,
@@ -316,7 +499,8 @@ class GeneticScheduleOptimizer:
                 processing_time=processing_time,
                 conflicts=["No se encontró solución válida"],
                 solver_status="INFEASIBLE",
-                quality_score=None
+                quality_score=None,
+                metadata={"fitness_cache": self._fitness_cache_stats()}
             )
         
         # Obtener secciones y calcular fitness
@@ -351,6 +535,31 @@ class GeneticScheduleOptimizer:
             processing_time=processing_time,
             conflicts=[],
             solver_status="OPTIMIZED",
-            quality_score=quality_score
+            quality_score=quality_score,
+            metadata={"fitness_cache": self._fitness_cache_stats()}
         )
+    
+    def _fitness_cache_stats(self) -> dict:
+        """
+        Contadores de la caché de fitness para esta optimización (hits/misses contados por el
+        optimizador, sin los de ejecuciones concurrentes). Si la caché es compartida, sus
+        contadores acumulados se reportan aparte (shared_totals).
+        """
+        cache_stats = self.fitness_cache.stats()
+        lookups = self._cache_hits + self._cache_misses
+        stats = {
+            "hits": self._cache_hits,
+            "misses": self._cache_misses,
+            "size": cache_stats["size"],
+            "maxsize": cache_stats["maxsize"],
+            "hit_rate": round(self._cache_hits / lookups, 4) if lookups else 0.0,
+            "shared": self.fitness_cache_shared
+        }
+        if self.fitness_cache_shared:
+            stats["shared_totals"] = {
+                "hits": cache_stats["hits"],
+                "misses": cache_stats["misses"],
+                "hit_rate": cache_stats["hit_rate"]
+            }
+        return stats
 
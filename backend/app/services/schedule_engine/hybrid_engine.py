@@ -2,13 +2,18 @@
 Motor híbrido que combina OR-Tools (restricciones duras) + Algoritmo Genético (optimización)
 """
 import logging
-from typing import List, Optional
+from typing import List, Optional, Callable, Dict, Any
 from sqlalchemy.orm import Session
 
 from app.services.schedule_engine.models import Student, Section
 from app.services.schedule_engine.solution import ScheduleSolution
 from app.services.schedule_engine.constraint_solver import ConstraintScheduleSolver
 from app.services.schedule_engine.genetic_optimizer import GeneticScheduleOptimizer
+from app.services.schedule_engine.island_optimizer import IslandGeneticOptimizer
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.fitness_cache import FitnessCache
+from app.services.schedule_engine.exact_optimizer import ExactScheduleOptimizer
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -18,8 +23,11 @@ class HybridScheduleEngine:
     Motor híbrido que combina Constraint Solver + Genetic Algorithm.
     
     Estrategia:
+    0. Si el espacio de búsqueda es pequeño (SCHEDULE_EXACT_SEARCH_THRESHOLD), se enumera
+       con ramificación y poda y se retorna el óptimo exacto (sin AG)
     1. Fase 1: Usar OR-Tools CP-SAT para encontrar cualquier solución viable (restricciones duras)
     2. Fase 2: Usar AG para mejorar la solución optimizando restricciones blandas
+       (en el nivel "high" con GA_ISLAND_MODEL, un AG de islas en paralelo sobre los núcleos)
     """
     
     def __init__(self, db: Session):
@@ -29,7 +37,14 @@ class HybridScheduleEngine:
         self,
         student: Student,
         available_sections: List[Section],
-        optimization_level: str = "medium"
+        optimization_level: str = "medium",
+        conflict_index: Optional[ConflictIndex] = None,
+        fitness_cache: Optional[FitnessCache] = None,
+        solver_profile: Optional[str] = None,
+        hint_section_ids: Optional[List[int]] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        alternatives: int = 1,
+        min_distance: int = 1
     ) -> ScheduleSolution:
         """
         Genera horario optimizado usando enfoque híbrido.
@@ -38,6 +53,19 @@ class HybridScheduleEngine:
             student: Datos del estudiante
             available_sections: Secciones disponibles
             optimization_level: "none" | "low" | "medium" | "high"
+                                ("exact" lo resuelve el runner solo con CP-SAT)
+            conflict_index: Índice de conflictos precompilado (opcional, se construye una vez
+                            y se comparte entre ambas fases)
+            fitness_cache: Caché de fitness compartida entre ejecuciones (opcional, por defecto
+                           el AG usa una caché propia de la ejecución)
+            solver_profile: Perfil de CP-SAT de la fase 1 (opcional)
+            hint_section_ids: Secciones de un horario previo para arrancar CP-SAT (opcional)
+            progress_callback: Recibe el horario del optimizador exacto (y cada alternativo), o el de
+                               CP-SAT y el mejor de cada generación del AG (opcional). Si retorna
+                               True, se omite el resto de la optimización
+            alternatives: Número de horarios distintos a retornar en solution.alternatives
+                          (del optimizador exacto o de los individuos evaluados por el AG)
+            min_distance: Asignaturas con distinta sección entre cada par de horarios alternativos
         
         Returns:
             ScheduleSolution con el mejor horario encontrado
@@ -45,9 +73,37 @@ class HybridScheduleEngine:
         import time
         start_time = time.time()
         
+        if conflict_index is None:
+            conflict_index = ConflictIndex(available_sections)
+        
+        # FASE 0: Espacios pequeños se resuelven de forma exacta (más rápido y óptimo que el AG)
+        search_space = None
+        if optimization_level != "none":
+            exact_optimizer = ExactScheduleOptimizer(
+                student,
+                available_sections,
+                conflict_index,
+                alternatives=alternatives,
+                min_distance=min_distance,
+                progress_callback=progress_callback
+            )
+            search_space = exact_optimizer.estimate_search_space()
+            if search_space <= settings.SCHEDULE_EXACT_SEARCH_THRESHOLD:
+                logger.info(f"Search space {search_space} <= threshold: using exact optimizer")
+                exact_solution = exact_optimizer.optimize()
+                exact_solution.processing_time = time.time() - start_time
+                return exact_solution
+            logger.info(f"Search space {search_space} above threshold: using hybrid CP-SAT + GA")
+        
         # FASE 1: Encontrar solución viable con CP-SAT
         logger.info("Phase 1: Finding feasible solution with CP-SAT...")
-        constraint_solver = ConstraintScheduleSolver(student, available_sections)
+        constraint_solver = ConstraintScheduleSolver(
+            student,
+            available_sections,
+            conflict_index,
+            solver_profile=solver_profile,
+            hint_section_ids=hint_section_ids
+        )
         constraint_solver.create_variables()
         constraint_solver.add_constraints()
         initial_solution = constraint_solver.solve()
@@ -74,21 +130,49 @@ class HybridScheduleEngine:
             logger.info("Skipping optimization (level=none)")
             return initial_solution
         
+        if progress_callback is not None and progress_callback({
+            "phase": "cp_sat",
+            "best_fitness": initial_solution.quality_score,
+            "section_ids": list(initial_solution.assigned_section_ids),
+            "elapsed": time.time() - start_time
+        }):
+            logger.info("Optimization stopped by consumer after phase 1")
+            initial_solution.solver_status = "HYBRID_CP_SAT_BEST"
+            initial_solution.metadata["stopped_early"] = True
+            initial_solution.metadata["stop_reason"] = "cancelled"
+            initial_solution.processing_time = time.time() - start_time
+            return initial_solution
+        
         logger.info(f"Phase 2: Optimizing with Genetic Algorithm (level={optimization_level})...")
         
         # Configurar parámetros según nivel
         ga_params = self._get_ga_parameters(optimization_level)
         
-        genetic_optimizer = GeneticScheduleOptimizer(
+        ga_kwargs = dict(
             student=student,
             available_sections=available_sections,
             population_size=ga_params['population'],
             generations=ga_params['generations'],
             crossover_rate=ga_params.get('crossover_rate', 0.7),
-            mutation_rate=ga_params.get('mutation_rate', 0.2)
+            mutation_rate=ga_params.get('mutation_rate', 0.2),
+            conflict_index=conflict_index,
+            fitness_cache=fitness_cache,
+            progress_callback=progress_callback,
+            stagnation_generations=ga_params['stagnation_generations'] if settings.GA_EARLY_STOPPING else None,
+            target_fitness=settings.GA_TARGET_FITNESS,
+            time_budget_ms=settings.GA_TIME_BUDGET_MS or None,
+            adaptive_population=settings.GA_ADAPTIVE_POPULATION,
+            alternatives=alternatives,
+            min_distance=min_distance
         )
+        if optimization_level == "high" and settings.GA_ISLAND_MODEL:
+            genetic_optimizer = IslandGeneticOptimizer(seed=settings.GA_SEED, **ga_kwargs)
+        else:
+            genetic_optimizer = GeneticScheduleOptimizer(**ga_kwargs)
         
         optimized_solution = genetic_optimizer.optimize()
+        optimized_solution.metadata["search_space"] = search_space
+        optimized_solution.metadata["solver"] = initial_solution.metadata.get("solver")
         
         # Calcular tiempo total
         total_time = time.time() - start_time
@@ -108,6 +192,8 @@ class HybridScheduleEngine:
                 else:
                     logger.info("CP-SAT solution was already optimal or better")
                     initial_solution.solver_status = "HYBRID_CP_SAT_BEST"
+                    initial_solution.metadata.update(optimized_solution.metadata)
+                    self._attach_alternatives(initial_solution, genetic_optimizer, alternatives)
                     return initial_solution
             else:
                 # Si la solución inicial no tiene quality_score, usar la optimizada
@@ -118,11 +204,24 @@ class HybridScheduleEngine:
             # Si la optimización falló, retornar solución inicial
             logger.warning("Genetic optimization failed, using CP-SAT solution")
             initial_solution.solver_status = "HYBRID_CP_SAT_FALLBACK"
+            initial_solution.metadata.update(optimized_solution.metadata)
+            self._attach_alternatives(initial_solution, genetic_optimizer, alternatives)
             return initial_solution
     
+    @staticmethod
+    def _attach_alternatives(solution: ScheduleSolution, genetic_optimizer, alternatives: int):
+        """Horarios alternativos del AG con el horario de CP-SAT como principal"""
+        if alternatives > 1:
+            solution.alternatives = genetic_optimizer.select_alternatives(
+                (solution.assigned_section_ids, solution.quality_score)
+            )
+    
     def _get_ga_parameters(self, level: str) -> dict:
         """
         Parámetros de AG según nivel de optimización.
+        Con los modos opcionales, population y generations pasan a ser máximos: la población
+        se ajusta al espacio de búsqueda (GA_ADAPTIVE_POPULATION) y la evolución se detiene tras
+        stagnation_generations sin mejora (GA_EARLY_STOPPING).
         
         Args:
             level: "low" | "medium" | "high"
@@ -135,19 +234,22 @@ class HybridScheduleEngine:
                 "population": 50,
                 "generations": 20,
                 "crossover_rate": 0.7,
-                "mutation_rate": 0.2
+                "mutation_rate": 0.2,
+                "stagnation_generations": 8
             },
             "medium": {
                 "population": 100,
                 "generations": 50,
                 "crossover_rate": 0.7,
-                "mutation_rate": 0.2
+                "mutation_rate": 0.2,
+                "stagnation_generations": 15
             },
             "high": {
                 "population": 200,
                 "generations": 100,
                 "crossover_rate": 0.7,
-                "mutation_rate": 0.2
+                "mutation_rate": 0.2,
+                "stagnation_generations": 25
             }
         }
         return params.get(level, params["medium"])
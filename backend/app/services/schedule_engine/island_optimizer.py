@@ -0,0 +1,378 @@
+"""
+Algoritmo genético con modelo de islas: K subpoblaciones evolucionan en procesos separados
+e intercambian sus mejores individuos cada cierto número de generaciones (migración en anillo)
+"""
+import math
+import multiprocessing
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from deap import creator
+
+from app.services.schedule_engine.models import Student, Section
+from app.services.schedule_engine.solution import ScheduleSolution, ScheduleAlternative
+from app.services.schedule_engine.genetic_optimizer import GeneticScheduleOptimizer
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.fitness_cache import FitnessCache
+from app.config import settings
+
+# Optimizadores por ejecución dentro de cada proceso de isla: la tabla de secciones y el
+# índice de conflictos se construyen una vez por proceso y se reutilizan (solo lectura)
+# en todas las épocas de la ejecución
+_WORKER_CACHE_SIZE = 8
+_worker_optimizers: "OrderedDict[str, GeneticScheduleOptimizer]" = OrderedDict()
+
+# Pool de procesos compartido entre ejecuciones (arrancar procesos por petición es más
+# lento que varias generaciones del AG)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _worker_optimizer(
+    run_id: str,
+    student: Student,
+    sections: List[Section],
+    params: Dict[str, Any]
+) -> GeneticScheduleOptimizer:
+    """Optimizador de la ejecución en este proceso (se construye en la primera época)"""
+    optimizer = _worker_optimizers.get(run_id)
+    if optimizer is None:
+        optimizer = GeneticScheduleOptimizer(student, sections, **params)
+        _worker_optimizers[run_id] = optimizer
+        while len(_worker_optimizers) > _WORKER_CACHE_SIZE:
+            _worker_optimizers.popitem(last=False)
+    else:
+        _worker_optimizers.move_to_end(run_id)
+    return optimizer
+
+
+def evolve_island(
+    run_id: str,
+    student: Student,
+    sections: List[Section],
+    params: Dict[str, Any],
+    genomes: Optional[List[List[int]]],
+    fitnesses: Optional[List[float]],
+    rng_state: tuple,
+    generations: int,
+    archive_size: int = 0
+) -> Dict[str, Any]:
+    """
+    Evoluciona una isla durante una época dentro de un proceso del pool.
+    
+    El estado del generador aleatorio viaja con la isla: el resultado no depende del
+    proceso que ejecute cada época.
+    
+    Args:
+        run_id: Identificador de la ejecución (reutiliza el optimizador del proceso)
+        student, sections, params: Datos para construir el optimizador
+        genomes: Población de la isla (None = crear población inicial)
+        fitnesses: Fitness de cada individuo de genomes
+        rng_state: Estado de random de la isla
+        generations: Generaciones de la época
+        archive_size: Genotipos distintos a retornar en archive, los mejores evaluados en la
+                      época (candidatos a horarios alternativos; 0 = ninguno)
+    
+    Returns:
+        Población, fitness, estado aleatorio, historial, mejor individuo y archivo de la época
+    """
+    optimizer = _worker_optimizer(run_id, student, sections, params)
+    random.setstate(rng_state)
+    
+    if genomes is None:
+        population = optimizer.initial_population()
+    else:
+        population = []
+        for genome, fitness in zip(genomes, fitnesses):
+            individual = creator.Individual(genome)
+            individual.fitness.values = (fitness,)
+            population.append(individual)
+    
+    best = min(population, key=lambda ind: ind.fitness.values[0])
+    best_genome, best_fitness = list(best), best.fitness.values[0]
+    history = []
+    archive: Dict[tuple, float] = {}
+    for _ in range(generations):
+        population = optimizer.next_generation(population)
+        if archive_size:
+            for ind in population:
+                archive[FitnessCache.make_key(sid for sid in ind if sid != -1)] = ind.fitness.values[0]
+        generation_best = min(population, key=lambda ind: ind.fitness.values[0])
+        history.append(generation_best.fitness.values[0])
+        if generation_best.fitness.values[0] < best_fitness:
+            best_genome, best_fitness = list(generation_best), generation_best.fitness.values[0]
+    
+    return {
+        "genomes": [list(ind) for ind in population],
+        "fitnesses": [ind.fitness.values[0] for ind in population],
+        "rng_state": random.getstate(),
+        "history": history,
+        "best_genome": best_genome,
+        "best_fitness": best_fitness,
+        "archive": sorted(archive.items(), key=lambda item: item[1])[:archive_size]
+    }
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos de las islas (se recrea si se piden más procesos)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(settings.SCHEDULE_BATCH_MP_CONTEXT)
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool():
+    """Descarta el pool (ej: un proceso terminó de forma abrupta)"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_workers = 0
+
+
+class IslandGeneticOptimizer:
+    """
+    AG con K islas en paralelo sobre los núcleos disponibles.
+    
+    Cada isla es una población completa que evoluciona de forma independiente durante
+    migration_interval generaciones (una época, en un proceso del pool). Entre épocas, los
+    migration_size mejores individuos de cada isla reemplazan a los peores de la siguiente
+    (topología en anillo). Con una semilla, el resultado es determinista.
+    
+    Los criterios de parada (estancamiento, fitness objetivo, tiempo, progress_callback) se
+    evalúan al final de cada época.
+    """
+    
+    def __init__(
+        self,
+        student: Student,
+        available_sections: List[Section],
+        islands: Optional[int] = None,
+        population_size: int = 100,
+        generations: int = 50,
+        crossover_rate: float = 0.7,
+        mutation_rate: float = 0.2,
+        tournament_size: int = 3,
+        migration_interval: Optional[int] = None,
+        migration_size: Optional[int] = None,
+        seed: Optional[int] = None,
+        conflict_index: Optional[ConflictIndex] = None,
+        fitness_cache: Optional[FitnessCache] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        stagnation_generations: Optional[int] = None,
+        target_fitness: Optional[float] = None,
+        time_budget_ms: Optional[int] = None,
+        adaptive_population: bool = False,
+        alternatives: int = 1,
+        min_distance: int = 1
+    ):
+        """
+        Args:
+            student: Datos del estudiante
+            available_sections: Secciones disponibles
+            islands: Número de islas/procesos (por defecto GA_ISLANDS o los núcleos disponibles)
+            population_size: Tamaño de la población de cada isla
+            generations: Número máximo de generaciones
+            crossover_rate: Probabilidad de cruce
+            mutation_rate: Probabilidad de mutación
+            tournament_size: Tamaño del torneo para selección
+            migration_interval: Generaciones entre migraciones (por defecto GA_MIGRATION_INTERVAL)
+            migration_size: Individuos que migran por isla (por defecto GA_MIGRATION_SIZE)
+            seed: Semilla para un resultado reproducible (opcional)
+            conflict_index: Índice de conflictos precompilado (opcional)
+            fitness_cache: Caché de fitness del proceso principal (opcional)
+            progress_callback: Se llama al final de cada época con el mejor individuo (opcional).
+                               Si retorna True, se detiene la evolución
+            stagnation_generations: Detener si el mejor fitness no mejora en este número de
+                                    generaciones (opcional)
+            target_fitness: Detener al alcanzar un fitness menor o igual (opcional)
+            time_budget_ms: Tiempo máximo de evolución en milisegundos (opcional)
+            adaptive_population: Ajustar la población de cada isla al espacio de búsqueda
+            alternatives: Número de horarios distintos a retornar (K mejores entre las
+                          mejores genotipos evaluados en las islas)
+            min_distance: Asignaturas con distinta sección entre cada par de horarios alternativos
+        """
+        self.student = student
+        self.available_sections = available_sections
+        self.islands = max(1, islands or settings.GA_ISLANDS or os.cpu_count() or 1)
+        self.generations = generations
+        self.migration_interval = max(1, migration_interval or settings.GA_MIGRATION_INTERVAL)
+        self.migration_size = migration_size if migration_size is not None else settings.GA_MIGRATION_SIZE
+        self.seed = seed
+        self.progress_callback = progress_callback
+        self.stagnation_generations = stagnation_generations
+        self.target_fitness = target_fitness
+        self.time_budget_ms = time_budget_ms
+        
+        # Optimizador local: tamaño adaptativo de la población y conversión de la solución
+        self.local_optimizer = GeneticScheduleOptimizer(
+            student=student,
+            available_sections=available_sections,
+            population_size=population_size,
+            generations=generations,
+            crossover_rate=crossover_rate,
+            mutation_rate=mutation_rate,
+            tournament_size=tournament_size,
+            conflict_index=conflict_index,
+            fitness_cache=fitness_cache,
+            adaptive_population=adaptive_population,
+            alternatives=alternatives,
+            min_distance=min_distance
+        )
+        self.population_size = self.local_optimizer.population_size
+        self.island_params = {
+            "population_size": self.population_size,
+            "generations": generations,
+            "crossover_rate": crossover_rate,
+            "mutation_rate": mutation_rate,
+            "tournament_size": tournament_size
+        }
+    
+    def optimize(self) -> ScheduleSolution:
+        """
+        Ejecuta el AG en las islas.
+        
+        Returns:
+            ScheduleSolution con el mejor horario encontrado en todas las islas
+        """
+        start_time = time.time()
+        run_id = uuid.uuid4().hex
+        self.local_optimizer.archive = {}
+        
+        # Un generador por isla derivado de la semilla
+        seed = self.seed if self.seed is not None else random.randrange(2 ** 32)
+        master = random.Random(seed)
+        rng_states = [random.Random(master.getrandbits(64)).getstate() for _ in range(self.islands)]
+        genomes: List[Optional[List[List[int]]]] = [None] * self.islands
+        fitnesses: List[Optional[List[float]]] = [None] * self.islands
+        
+        pool = _get_pool(self.islands)
+        best_genome: List[int] = []
+        best_fitness = math.inf
+        best_fitness_history: List[float] = []
+        stagnant_generations = 0
+        migrations = 0
+        stop_reason = "generations"
+        
+        generation = 0
+        while generation < self.generations:
+            epoch = min(self.migration_interval, self.generations - generation)
+            futures = [
+                pool.submit(
+                    evolve_island, run_id, self.student, self.available_sections, self.island_params,
+                    genomes[i], fitnesses[i], rng_states[i], epoch,
+                    self.population_size if self.local_optimizer.alternatives > 1 else 0
+                )
+                for i in range(self.islands)
+            ]
+            try:
+                results = [future.result() for future in futures]
+            except Exception:
+                _reset_pool()
+                raise
+            generation += epoch
+            
+            # Resultados en orden de isla (determinista)
+            for i, result in enumerate(results):
+                genomes[i] = result["genomes"]
+                fitnesses[i] = result["fitnesses"]
+                rng_states[i] = result["rng_state"]
+                if result["best_fitness"] < best_fitness:
+                    best_genome, best_fitness = result["best_genome"], result["best_fitness"]
+                # Candidatos a horarios alternativos: mejores genotipos evaluados en cada isla
+                self.local_optimizer.archive.update(result["archive"])
+            
+            # Historial y estancamiento: mejor fitness entre islas por generación
+            for k in range(epoch):
+                generation_best = min(result["history"][k] for result in results)
+                if best_fitness_history and generation_best >= min(best_fitness_history):
+                    stagnant_generations += 1
+                else:
+                    stagnant_generations = 0
+                best_fitness_history.append(generation_best)
+            
+            if self.progress_callback is not None and self.progress_callback({
+                "phase": "genetic",
+                "generation": generation,
+                "generations": self.generations,
+                "best_fitness": best_fitness,
+                "section_ids": [sid for sid in best_genome if sid != -1],
+                "elapsed": time.time() - start_time,
+                "islands": self.islands
+            }):
+                stop_reason = "cancelled"
+                break
+            if self.target_fitness is not None and best_fitness <= self.target_fitness:
+                stop_reason = "target_fitness"
+                break
+            if self.stagnation_generations and stagnant_generations >= self.stagnation_generations:
+                stop_reason = "stagnation"
+                break
+            if self.time_budget_ms and (time.time() - start_time) * 1000 >= self.time_budget_ms:
+                stop_reason = "time_budget"
+                break
+            
+            if generation < self.generations and self.islands > 1 and self.migration_size > 0:
+                self._migrate(genomes, fitnesses)
+                migrations += 1
+        
+        processing_time = time.time() - start_time
+        
+        solution = self.local_optimizer._convert_to_solution(best_genome, processing_time, best_fitness_history)
+        solution.metadata.update({
+            "population_size": self.population_size,
+            "generations_run": len(best_fitness_history),
+            "stopped_early": stop_reason != "generations",
+            "stop_reason": stop_reason,
+            "islands": {
+                "count": self.islands,
+                "migration_interval": self.migration_interval,
+                "migration_size": self.migration_size,
+                "migrations": migrations,
+                "seed": seed
+            }
+        })
+        if self.local_optimizer.alternatives > 1 and solution.is_feasible:
+            solution.alternatives = self.select_alternatives(
+                (solution.assigned_section_ids, solution.quality_score)
+            )
+        return solution
+    
+    def select_alternatives(self, first: Tuple[List[int], float]) -> List[ScheduleAlternative]:
+        """Los K mejores horarios distintos entre los mejores genotipos evaluados en las islas"""
+        return self.local_optimizer.select_alternatives(first)
+    
+    def _migrate(self, genomes: List[List[List[int]]], fitnesses: List[List[float]]):
+        """
+        Migración en anillo: los mejores de la isla i reemplazan a los peores de la isla i+1.
+        Los emigrantes se eligen antes de reemplazar, así ninguna isla reenvía inmigrantes.
+        """
+        size = min(self.migration_size, min(len(f) for f in fitnesses))
+        emigrants = []
+        for island_genomes, island_fitnesses in zip(genomes, fitnesses):
+            order = sorted(range(len(island_fitnesses)), key=lambda j: island_fitnesses[j])[:size]
+            emigrants.append([(list(island_genomes[j]), island_fitnesses[j]) for j in order])
+        
+        for i, incoming in enumerate(emigrants):
+            target = (i + 1) % self.islands
+            worst = sorted(
+                range(len(fitnesses[target])), key=lambda j: fitnesses[target][j], reverse=True
+            )[:size]
+            for j, (genome, fitness) in zip(worst, incoming):
+                genomes[target][j] = genome
+                fitnesses[target][j] = fitness
@@ -6,7 +6,7 @@ from typing import List, Optional
 from datetime import time
 
 
-@dataclass
+@dataclass(slots=True)
 class TimeSlot:
     """Representa un bloque de tiempo (día + horario)"""
     id: int
@@ -48,7 +48,7 @@ class TimeSlot:
                 self.end_time == other.end_time)
 
 
-@dataclass
+@dataclass(slots=True)
 class Section:
     """Representa una sección de curso con toda su información"""
     id: int
@@ -76,7 +76,7 @@ class Section:
         return False
 
 
-@dataclass
+@dataclass(slots=True)
 class Student:
     """Datos del estudiante necesarios para generar horario"""
     id: int
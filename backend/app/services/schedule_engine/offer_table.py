@@ -0,0 +1,367 @@
+"""
+Oferta en columnas (struct-of-arrays) con vistas ligeras compatibles con Section y TimeSlot
+"""
+import hashlib
+from datetime import time
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from app.services.schedule_engine.models import Section, TimeSlot
+
+
+def _time_to_seconds(t: time) -> int:
+    return (t.hour * 60 + t.minute) * 60 + t.second
+
+
+def _seconds_to_time(seconds: int) -> time:
+    return time(seconds // 3600, (seconds // 60) % 60, seconds % 60)
+
+
+class OfferTable:
+    """
+    Oferta de un período guardada por columnas en arreglos NumPy.
+    
+    Una fila por sección (id, índice de asignatura, profesor, aula, cupos, inscritos,
+    número de sección) y los bloques de horario en formato CSR: los bloques de la sección
+    i son las filas slot_offsets[i]:slot_offsets[i + 1] de slot_ids/slot_days/slot_starts/
+    slot_ends. Las horas se guardan en segundos desde medianoche (la fitness ordena por la
+    hora completa). Código y nombre de asignatura se guardan una vez por asignatura.
+    
+    Frente a una lista de Section (objetos con __dict__, listas de TimeSlot y datetime.time),
+    ocupa un orden de magnitud menos y se serializa como unos pocos buffers contiguos
+    (pickle barato para procesos de trabajo y Redis).
+    
+    Las secciones se consultan como SectionView: vistas de solo lectura con la misma API
+    que Section.
+    """
+    
+    def __init__(
+        self,
+        section_ids: np.ndarray,
+        subject_index: np.ndarray,
+        subject_ids: np.ndarray,
+        subject_codes: List[str],
+        subject_names: List[str],
+        professor_ids: np.ndarray,
+        classroom_ids: np.ndarray,
+        capacities: np.ndarray,
+        enrolled_counts: np.ndarray,
+        section_numbers: np.ndarray,
+        slot_offsets: np.ndarray,
+        slot_ids: np.ndarray,
+        slot_days: np.ndarray,
+        slot_starts: np.ndarray,
+        slot_ends: np.ndarray
+    ):
+        self.section_ids = section_ids
+        self.subject_index = subject_index
+        self.subject_ids = subject_ids
+        self.subject_codes = subject_codes
+        self.subject_names = subject_names
+        self.professor_ids = professor_ids
+        self.classroom_ids = classroom_ids
+        self.capacities = capacities
+        self.enrolled_counts = enrolled_counts
+        self.section_numbers = section_numbers
+        self.slot_offsets = slot_offsets
+        self.slot_ids = slot_ids
+        self.slot_days = slot_days
+        self.slot_starts = slot_starts
+        self.slot_ends = slot_ends
+        self._id_order = np.argsort(section_ids, kind="stable")
+    
+    @classmethod
+    def from_sections(cls, sections: Iterable[Section]) -> "OfferTable":
+        """Construye la tabla a partir de secciones (Section o SectionView), en el mismo orden"""
+        sections = list(sections)
+        subject_positions: Dict[int, int] = {}
+        subject_codes: List[str] = []
+        subject_names: List[str] = []
+        subject_index = np.empty(len(sections), dtype=np.int32)
+        slot_offsets = np.zeros(len(sections) + 1, dtype=np.int32)
+        slot_ids, slot_days, slot_starts, slot_ends = [], [], [], []
+        
+        for i, section in enumerate(sections):
+            position = subject_positions.get(section.subject_id)
+            if position is None:
+                position = subject_positions[section.subject_id] = len(subject_codes)
+                subject_codes.append(section.subject_code)
+                subject_names.append(section.subject_name)
+            subject_index[i] = position
+            for slot in section.timeslots:
+                slot_ids.append(slot.id)
+                slot_days.append(slot.day_of_week)
+                slot_starts.append(_time_to_seconds(slot.start_time))
+                slot_ends.append(_time_to_seconds(slot.end_time))
+            slot_offsets[i + 1] = len(slot_ids)
+        
+        return cls(
+            section_ids=np.array([s.id for s in sections], dtype=np.int64),
+            subject_index=subject_index,
+            subject_ids=np.array(list(subject_positions.keys()), dtype=np.int64),
+            subject_codes=subject_codes,
+            subject_names=subject_names,
+            professor_ids=np.array([s.professor_id for s in sections], dtype=np.int64),
+            classroom_ids=np.array([s.classroom_id for s in sections], dtype=np.int64),
+            capacities=np.array([s.capacity for s in sections], dtype=np.int32),
+            enrolled_counts=np.array([s.enrolled_count for s in sections], dtype=np.int32),
+            section_numbers=np.array([s.section_number for s in sections], dtype=np.int32),
+            slot_offsets=slot_offsets,
+            slot_ids=np.array(slot_ids, dtype=np.int64),
+            slot_days=np.array(slot_days, dtype=np.int8),
+            slot_starts=np.array(slot_starts, dtype=np.int32),
+            slot_ends=np.array(slot_ends, dtype=np.int32)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.section_ids)
+    
+    @property
+    def nbytes(self) -> int:
+        """Memoria de los arreglos (sin contar los textos de asignatura)"""
+        return sum(
+            array.nbytes for array in (
+                self.section_ids, self.subject_index, self.subject_ids, self.professor_ids,
+                self.classroom_ids, self.capacities, self.enrolled_counts, self.section_numbers,
+                self.slot_offsets, self.slot_ids, self.slot_days, self.slot_starts, self.slot_ends,
+                self._id_order
+            )
+        )
+    
+    def section(self, position: int) -> "SectionView":
+        """Vista de la sección en la fila position"""
+        return SectionView(self, position)
+    
+    def sections(self) -> List["SectionView"]:
+        """Vistas de todas las secciones, en orden de fila"""
+        return [SectionView(self, position) for position in range(len(self.section_ids))]
+    
+    def position_of(self, section_id: int) -> Optional[int]:
+        """Fila de una sección por ID (None si no existe)"""
+        if not len(self.section_ids):
+            return None
+        index = int(np.searchsorted(self.section_ids, section_id, sorter=self._id_order))
+        if index < len(self._id_order) and self.section_ids[self._id_order[index]] == section_id:
+            return int(self._id_order[index])
+        return None
+    
+    def get(self, section_id: int) -> Optional["SectionView"]:
+        """Vista de una sección por ID (None si no existe)"""
+        position = self.position_of(section_id)
+        return SectionView(self, position) if position is not None else None
+    
+    def update_seats(self, seats: Mapping[int, Tuple[int, int]]) -> int:
+        """
+        Aplica en sitio los cupos e inscritos actuales ({section_id: (capacity, enrolled_count)})
+        de las secciones dadas; las vistas (SectionView) existentes ven los valores nuevos.
+        Las secciones que no están en la tabla se ignoran.
+        
+        Returns:
+            Número de secciones con cambios
+        """
+        if not seats or not len(self.section_ids):
+            return 0
+        section_ids = np.fromiter(seats.keys(), dtype=np.int64, count=len(seats))
+        values = np.array(list(seats.values()), dtype=np.int32).reshape(len(seats), 2)
+        index = np.searchsorted(self.section_ids, section_ids, sorter=self._id_order)
+        positions = self._id_order[np.minimum(index, len(self._id_order) - 1)]
+        found = self.section_ids[positions] == section_ids
+        positions, values = positions[found], values[found]
+        changed = (self.capacities[positions] != values[:, 0]) | (self.enrolled_counts[positions] != values[:, 1])
+        self.capacities[positions] = values[:, 0]
+        self.enrolled_counts[positions] = values[:, 1]
+        return int(changed.sum())
+    
+    def structure_digest(self) -> str:
+        """
+        Huella de la estructura de la oferta (secciones, asignaturas, profesores, aulas y bloques
+        de horario; sin cupos ni inscritos). Determinista entre procesos.
+        """
+        digest = hashlib.blake2b(digest_size=6)
+        for array in (
+            self.section_ids, self.subject_index, self.subject_ids, self.professor_ids,
+            self.classroom_ids, self.section_numbers, self.slot_offsets, self.slot_ids,
+            self.slot_days, self.slot_starts, self.slot_ends
+        ):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        digest.update("\x1f".join(self.subject_codes + self.subject_names).encode())
+        return digest.hexdigest()
+    
+    def __getstate__(self):
+        # El orden por ID se recalcula al deserializar
+        state = self.__dict__.copy()
+        state.pop("_id_order", None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._id_order = np.argsort(self.section_ids, kind="stable")
+
+
+class TimeSlotView:
+    """Vista de solo lectura de un bloque de horario de OfferTable (API de TimeSlot)"""
+    
+    __slots__ = ("_table", "_position")
+    
+    def __init__(self, table: OfferTable, position: int):
+        self._table = table
+        self._position = position
+    
+    @property
+    def id(self) -> int:
+        return int(self._table.slot_ids[self._position])
+    
+    @property
+    def day_of_week(self) -> int:
+        return int(self._table.slot_days[self._position])
+    
+    @property
+    def start_time(self) -> time:
+        return _seconds_to_time(int(self._table.slot_starts[self._position]))
+    
+    @property
+    def end_time(self) -> time:
+        return _seconds_to_time(int(self._table.slot_ends[self._position]))
+    
+    @property
+    def start_minutes(self) -> int:
+        return int(self._table.slot_starts[self._position]) // 60
+    
+    @property
+    def end_minutes(self) -> int:
+        return int(self._table.slot_ends[self._position]) // 60
+    
+    def overlaps_with(self, other) -> bool:
+        """Detecta si dos bloques se solapan (mismo día e intervalos que se intersectan)"""
+        if self.day_of_week != other.day_of_week:
+            return False
+        start1 = self.start_time.hour * 60 + self.start_time.minute
+        end1 = self.end_time.hour * 60 + self.end_time.minute
+        start2 = other.start_time.hour * 60 + other.start_time.minute
+        end2 = other.end_time.hour * 60 + other.end_time.minute
+        return not (end1 <= start2 or end2 <= start1)
+    
+    def to_timeslot(self) -> TimeSlot:
+        return TimeSlot(self.id, self.day_of_week, self.start_time, self.end_time)
+    
+    def __hash__(self):
+        return hash((self.id, self.day_of_week, self.start_time, self.end_time))
+    
+    def __eq__(self, other):
+        if not isinstance(other, (TimeSlot, TimeSlotView)):
+            return False
+        return (self.id == other.id and
+                self.day_of_week == other.day_of_week and
+                self.start_time == other.start_time and
+                self.end_time == other.end_time)
+    
+    def __repr__(self):
+        return (f"TimeSlotView(id={self.id}, day_of_week={self.day_of_week}, "
+                f"start_time={self.start_time!r}, end_time={self.end_time!r})")
+
+
+class SectionView:
+    """
+    Vista de solo lectura de una sección de OfferTable (API de Section).
+    Para modificar una sección, materializarla con to_section().
+    """
+    
+    __slots__ = ("_table", "_position")
+    
+    def __init__(self, table: OfferTable, position: int):
+        self._table = table
+        self._position = position
+    
+    @property
+    def id(self) -> int:
+        return int(self._table.section_ids[self._position])
+    
+    @property
+    def subject_id(self) -> int:
+        return int(self._table.subject_ids[self._table.subject_index[self._position]])
+    
+    @property
+    def subject_code(self) -> str:
+        return self._table.subject_codes[self._table.subject_index[self._position]]
+    
+    @property
+    def subject_name(self) -> str:
+        return self._table.subject_names[self._table.subject_index[self._position]]
+    
+    @property
+    def professor_id(self) -> int:
+        return int(self._table.professor_ids[self._position])
+    
+    @property
+    def classroom_id(self) -> int:
+        return int(self._table.classroom_ids[self._position])
+    
+    @property
+    def capacity(self) -> int:
+        return int(self._table.capacities[self._position])
+    
+    @property
+    def enrolled_count(self) -> int:
+        return int(self._table.enrolled_counts[self._position])
+    
+    @property
+    def section_number(self) -> int:
+        return int(self._table.section_numbers[self._position])
+    
+    @property
+    def timeslots(self) -> List[TimeSlotView]:
+        """Bloques de horario (vistas creadas en cada acceso)"""
+        offsets = self._table.slot_offsets
+        return [
+            TimeSlotView(self._table, position)
+            for position in range(int(offsets[self._position]), int(offsets[self._position + 1]))
+        ]
+    
+    @property
+    def available_spots(self) -> int:
+        """Cupos disponibles"""
+        return max(0, self.capacity - self.enrolled_count)
+    
+    def has_time_overlap_with(self, other) -> bool:
+        """Verifica si esta sección tiene choque de horario con otra"""
+        for slot1 in self.timeslots:
+            for slot2 in other.timeslots:
+                if slot1.overlaps_with(slot2):
+                    return True
+        return False
+    
+    def to_section(self) -> Section:
+        """Copia independiente como Section (dataclass)"""
+        return Section(
+            id=self.id,
+            subject_id=self.subject_id,
+            subject_code=self.subject_code,
+            subject_name=self.subject_name,
+            professor_id=self.professor_id,
+            classroom_id=self.classroom_id,
+            capacity=self.capacity,
+            enrolled_count=self.enrolled_count,
+            section_number=self.section_number,
+            timeslots=[slot.to_timeslot() for slot in self.timeslots]
+        )
+    
+    def _key(self) -> tuple:
+        return (
+            self.id, self.subject_id, self.subject_code, self.subject_name, self.professor_id,
+            self.classroom_id, self.capacity, self.enrolled_count, self.section_number
+        )
+    
+    def __eq__(self, other):
+        if isinstance(other, SectionView):
+            return self._key() == other._key() and self.timeslots == other.timeslots
+        if isinstance(other, Section):
+            return self.to_section() == other
+        return NotImplemented
+    
+    def __hash__(self):
+        return hash(self.id)
+    
+    def __repr__(self):
+        return (f"SectionView(id={self.id}, subject_id={self.subject_id}, "
+                f"subject_code={self.subject_code!r}, section_number={self.section_number})")
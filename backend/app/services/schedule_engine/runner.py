@@ -0,0 +1,227 @@
+"""
+Ejecución del motor de horarios sin acceso a base de datos.
+Usado por ScheduleService y por los procesos de trabajo de la generación por lotes.
+"""
+import dataclasses
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.schedule_engine.models import Student, Section
+from app.services.schedule_engine.solution import ScheduleSolution
+from app.services.schedule_engine.fitness import ScheduleFitness
+from app.services.schedule_engine.constraint_solver import ConstraintScheduleSolver
+from app.services.schedule_engine.hybrid_engine import HybridScheduleEngine
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.fitness_cache import FitnessCache
+from app.services.schedule_engine.shared_offer import SharedOfferHandle, attach_offer, get_shared_offer_registry
+from app.services.schedule_engine.offer_table import SectionView
+from app.config import settings
+
+
+def solve_for_student(
+    student: Student,
+    filtered_sections: List[Section],
+    all_sections: List[Section],
+    optimization_level: str = "none",
+    conflict_index: Optional[ConflictIndex] = None,
+    fitness_cache: Optional[FitnessCache] = None,
+    solver_profile: Optional[str] = None,
+    hint_section_ids: Optional[List[int]] = None,
+    progress_callback: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    alternatives: int = 1,
+    min_distance: int = 1
+) -> ScheduleSolution:
+    """
+    Genera el horario de un estudiante con el motor híbrido o solo con el constraint solver.
+
+    Args:
+        student: Datos del estudiante (con selected_subject_ids)
+        filtered_sections: Secciones válidas (cupos y prerrequisitos cumplidos)
+        all_sections: Todas las secciones cargadas (para explicar asignaturas no asignadas)
+        optimization_level: "none" | "exact" | "low" | "medium" | "high"
+                            ("exact": CP-SAT optimiza directamente el fitness, sin AG)
+        conflict_index: Índice de conflictos que cubra all_sections (opcional)
+        fitness_cache: Caché de fitness compartida (opcional)
+        solver_profile: Perfil de CP-SAT (opcional, por defecto el de la configuración)
+        hint_section_ids: Secciones del último horario del estudiante para arrancar CP-SAT (opcional)
+        progress_callback: Progreso del motor híbrido; si retorna True se detiene la optimización (opcional)
+        alternatives: Número de horarios distintos a retornar en solution.alternatives (K mejores)
+        min_distance: Asignaturas con distinta sección entre cada par de horarios alternativos
+
+    Returns:
+        ScheduleSolution (sin persistir)
+    """
+    if conflict_index is None:
+        conflict_index = ConflictIndex(all_sections)
+
+    if optimization_level in ("none", "exact"):
+        # Solo usar constraint solver (restricciones duras; con "exact" también el fitness)
+        solver = ConstraintScheduleSolver(
+            student,
+            filtered_sections,
+            conflict_index,
+            solver_profile=solver_profile,
+            hint_section_ids=hint_section_ids,
+            objective="fitness" if optimization_level == "exact" else "subjects",
+            alternatives=alternatives,
+            min_distance=min_distance
+        )
+        solver.create_variables()
+        solver.add_constraints()
+        solution = solver.solve()
+
+        # Actualizar análisis con TODAS las secciones disponibles
+        if solution.is_feasible:
+            assigned_subject_ids, unassigned_subjects = solver._analyze_assignment_with_all_sections(all_sections)
+            solution.assigned_subject_ids = assigned_subject_ids
+            solution.unassigned_subjects = unassigned_subjects
+            # Calcular quality_score si no está
+            if solution.quality_score is None:
+                assigned_sections = [s for s in filtered_sections if s.id in solution.assigned_section_ids]
+                fitness_calc = ScheduleFitness(assigned_sections)
+                solution.quality_score = fitness_calc.calculate_fitness()
+            if optimization_level == "exact":
+                solution.metadata["engine"] = "cp_sat_fitness"
+        return solution
+
+    # Usar motor híbrido (OR-Tools + AG)
+    # El motor híbrido ya calcula assigned_subject_ids y unassigned_subjects correctamente
+    hybrid_engine = HybridScheduleEngine(None)
+    return hybrid_engine.generate_optimized_schedule(
+        student=student,
+        available_sections=filtered_sections,
+        optimization_level=optimization_level,
+        conflict_index=conflict_index,
+        fitness_cache=fitness_cache,
+        solver_profile=solver_profile,
+        hint_section_ids=hint_section_ids,
+        progress_callback=progress_callback,
+        alternatives=alternatives,
+        min_distance=min_distance
+    )
+
+
+# Estado de cada proceso de trabajo de la generación por lotes:
+# la oferta del período se recibe una sola vez por proceso (initializer)
+_worker_sections: Dict[int, Section] = {}
+_worker_conflict_index: Optional[ConflictIndex] = None
+
+
+def init_batch_worker(
+    sections: Optional[List[Section]] = None,
+    shared_offer: Optional[SharedOfferHandle] = None
+):
+    """
+    Inicializa un proceso de trabajo con la oferta del período: adjuntándose a la oferta
+    publicada en memoria compartida (sin copias ni recálculo del índice de conflictos)
+    o, si no se publicó, a partir de las secciones recibidas.
+    """
+    global _worker_sections, _worker_conflict_index
+    # Los lotes ya reparten estudiantes entre núcleos: sin pools de islas anidados
+    settings.GA_ISLAND_MODEL = False
+    if shared_offer is not None:
+        table, _worker_conflict_index = attach_offer(shared_offer)
+        _worker_sections = {s.id: s for s in table.sections()}
+        return
+    _worker_sections = {s.id: s for s in sections}
+    _worker_conflict_index = ConflictIndex(sections)
+
+
+def solve_batch_job(
+    job_index: int,
+    student: Student,
+    filtered_section_ids: List[int],
+    all_section_ids: List[int],
+    optimization_level: str,
+    seats: Optional[Dict[int, Tuple[int, int]]] = None
+) -> Tuple[int, ScheduleSolution]:
+    """
+    Resuelve un trabajo del lote dentro de un proceso de trabajo.
+
+    Args:
+        seats: (capacity, enrolled_count) vigentes de las secciones del trabajo (opcional).
+               El proceso puede haberse adjuntado a una foto anterior de la misma versión
+               de la oferta (pool compartido entre lotes)
+
+    Returns:
+        (job_index, solución)
+    """
+    sections = {sid: _worker_sections[sid] for sid in all_section_ids}
+    for sid, (capacity, enrolled_count) in (seats or {}).items():
+        section = sections.get(sid)
+        if section is not None and (section.capacity, section.enrolled_count) != (capacity, enrolled_count):
+            section = section.to_section() if isinstance(section, SectionView) else dataclasses.replace(section)
+            section.capacity = capacity
+            section.enrolled_count = enrolled_count
+            sections[sid] = section
+    filtered_sections = [sections[sid] for sid in filtered_section_ids]
+    all_sections = [sections[sid] for sid in all_section_ids]
+    solution = solve_for_student(
+        student,
+        filtered_sections,
+        all_sections,
+        optimization_level,
+        conflict_index=_worker_conflict_index
+    )
+    return job_index, solution
+
+
+# Pool de procesos de los lotes, compartido entre peticiones mientras no cambie la versión de
+# la oferta publicada (arrancar procesos "spawn" por petición cuesta más que muchas resoluciones).
+# Los cupos vigentes viajan con cada trabajo (solve_batch_job)
+_batch_pool: Optional[ProcessPoolExecutor] = None
+_batch_pool_offer: Optional[SharedOfferHandle] = None
+_batch_pool_lock = threading.Lock()
+
+
+def batch_pool_size() -> int:
+    """Procesos de la generación por lotes: SCHEDULE_BATCH_MAX_WORKERS o los núcleos disponibles"""
+    return settings.SCHEDULE_BATCH_MAX_WORKERS or os.cpu_count() or 1
+
+
+def get_batch_pool(shared_offer: SharedOfferHandle) -> ProcessPoolExecutor:
+    """
+    Pool de procesos adjuntos a la oferta publicada (se recrea si cambia la versión).
+    Mientras exista, el pool retiene la publicación a la que se adjuntan sus procesos.
+
+    Args:
+        shared_offer: Publicación adquirida por el llamador
+    """
+    global _batch_pool, _batch_pool_offer
+    with _batch_pool_lock:
+        if (
+            _batch_pool is not None
+            and _batch_pool_offer.period_id == shared_offer.period_id
+            and _batch_pool_offer.version == shared_offer.version
+        ):
+            return _batch_pool
+        _discard_batch_pool()
+        get_shared_offer_registry().retain(shared_offer)
+        _batch_pool = ProcessPoolExecutor(
+            max_workers=batch_pool_size(),
+            mp_context=multiprocessing.get_context(settings.SCHEDULE_BATCH_MP_CONTEXT),
+            initializer=init_batch_worker,
+            initargs=(None, shared_offer)
+        )
+        _batch_pool_offer = shared_offer
+        return _batch_pool
+
+
+def reset_batch_pool(pool: ProcessPoolExecutor):
+    """Descarta el pool si sigue vigente (ej: un proceso terminó de forma abrupta)"""
+    with _batch_pool_lock:
+        if _batch_pool is pool:
+            _discard_batch_pool()
+
+
+def _discard_batch_pool():
+    """Cierra el pool vigente (los trabajos en curso terminan) y devuelve su publicación"""
+    global _batch_pool, _batch_pool_offer
+    if _batch_pool is not None:
+        _batch_pool.shutdown(wait=False)
+        get_shared_offer_registry().release(_batch_pool_offer)
+    _batch_pool = None
+    _batch_pool_offer = None
@@ -0,0 +1,209 @@
+"""
+Oferta del período en memoria compartida para los procesos de trabajo.
+
+El proceso principal publica las columnas de OfferTable y el índice de conflictos compilado
+en un único bloque de multiprocessing.shared_memory. Los procesos de trabajo reciben solo un
+descriptor (SharedOfferHandle) y se adjuntan al bloque: las columnas de la tabla se leen sin
+copias y el índice de conflictos se decodifica de sus bitsets sin recalcular solapamientos.
+"""
+import atexit
+import threading
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.schedule_engine.offer_table import OfferTable
+from app.services.schedule_engine.conflict_index import ConflictIndex
+
+# Columnas de OfferTable publicadas en el bloque
+TABLE_COLUMNS = (
+    "section_ids", "subject_index", "subject_ids", "professor_ids", "classroom_ids",
+    "capacities", "enrolled_counts", "section_numbers", "slot_offsets", "slot_ids",
+    "slot_days", "slot_starts", "slot_ends"
+)
+
+# Alineación de cada arreglo dentro del bloque (bytes)
+_ALIGNMENT = 64
+
+
+@dataclass(frozen=True)
+class SharedOfferHandle:
+    """Descriptor serializable de una oferta publicada (lo que se envía a cada proceso)"""
+    name: str
+    period_id: int
+    version: str
+    size: int
+    # (clave, offset, dtype, forma) de cada arreglo dentro del bloque
+    layout: Tuple[Tuple[str, int, str, Tuple[int, ...]], ...]
+    subject_codes: Tuple[str, ...]
+    subject_names: Tuple[str, ...]
+
+
+def publish_offer(
+    period_id: int,
+    version: str,
+    table: OfferTable,
+    conflict_index: ConflictIndex
+) -> Tuple[shared_memory.SharedMemory, SharedOfferHandle]:
+    """
+    Copia la tabla y el índice de conflictos a un bloque nuevo de memoria compartida.
+    
+    Returns:
+        (bloque, descriptor). El llamador debe cerrar y liberar (unlink) el bloque
+    """
+    arrays: Dict[str, np.ndarray] = {f"table.{column}": getattr(table, column) for column in TABLE_COLUMNS}
+    arrays.update({f"index.{key}": array for key, array in conflict_index.to_arrays().items()})
+    
+    layout = []
+    offset = 0
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        layout.append((key, offset, array.dtype.str, tuple(array.shape)))
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    
+    block = shared_memory.SharedMemory(create=True, size=max(1, offset))
+    for (key, start, dtype, shape) in layout:
+        target = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf, offset=start)
+        target[...] = arrays[key]
+    
+    handle = SharedOfferHandle(
+        name=block.name,
+        period_id=period_id,
+        version=version,
+        size=block.size,
+        layout=tuple(layout),
+        subject_codes=tuple(table.subject_codes),
+        subject_names=tuple(table.subject_names)
+    )
+    return block, handle
+
+
+def attach_offer(handle: SharedOfferHandle) -> Tuple[OfferTable, ConflictIndex]:
+    """
+    Se adjunta a una oferta publicada (en un proceso de trabajo).
+    Las columnas de la tabla son vistas de solo lectura sobre el bloque compartido;
+    la tabla mantiene el bloque abierto mientras exista.
+    """
+    try:
+        # Python 3.13+: sin registrar el bloque en el resource tracker del proceso adjunto
+        block = shared_memory.SharedMemory(name=handle.name, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name=handle.name)
+    
+    arrays: Dict[str, np.ndarray] = {}
+    for key, start, dtype, shape in handle.layout:
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf, offset=start)
+        array.flags.writeable = False
+        arrays[key] = array
+    
+    table = OfferTable(
+        subject_codes=list(handle.subject_codes),
+        subject_names=list(handle.subject_names),
+        **{column: arrays[f"table.{column}"] for column in TABLE_COLUMNS}
+    )
+    table._shared_block = block
+    conflict_index = ConflictIndex.from_arrays({
+        key.split(".", 1)[1]: array for key, array in arrays.items() if key.startswith("index.")
+    })
+    return table, conflict_index
+
+
+class _Publication:
+    """Bloque publicado con sus usuarios activos"""
+    
+    def __init__(self, block: shared_memory.SharedMemory, handle: SharedOfferHandle):
+        self.block = block
+        self.handle = handle
+        self.leases = 0
+
+
+class SharedOfferRegistry:
+    """
+    Publicaciones vigentes por período (en el proceso principal).
+    
+    Se reutiliza el bloque mientras no cambie la versión de la oferta del período: los cupos e
+    inscritos publicados pueden quedar desactualizados, así que los vigentes viajan con cada
+    trabajo (solve_batch_job). Una publicación reemplazada se libera cuando su último usuario
+    la devuelve: los procesos de un lote en curso pueden seguir adjuntándose a ella.
+    """
+    
+    def __init__(self):
+        self._current: Dict[int, _Publication] = {}
+        self._retired: List[_Publication] = []
+        self._lock = threading.Lock()
+    
+    def acquire(
+        self,
+        period_id: int,
+        version: str,
+        table: OfferTable,
+        conflict_index: ConflictIndex
+    ) -> SharedOfferHandle:
+        """Publica (o reutiliza, si es la misma versión) la oferta del período y registra un usuario"""
+        with self._lock:
+            publication = self._current.get(period_id)
+            if publication is None or publication.handle.version != version:
+                if publication is not None:
+                    self._retire(publication)
+                block, handle = publish_offer(period_id, version, table, conflict_index)
+                publication = _Publication(block, handle)
+                self._current[period_id] = publication
+            publication.leases += 1
+            return publication.handle
+    
+    def retain(self, handle: SharedOfferHandle):
+        """Registra un usuario más de una publicación ya adquirida (ej: el pool de procesos de lotes)"""
+        with self._lock:
+            for publication in [*self._current.values(), *self._retired]:
+                if publication.handle is handle:
+                    publication.leases += 1
+                    return
+    
+    def release(self, handle: SharedOfferHandle):
+        """Devuelve un usuario; libera el bloque si fue reemplazado y ya no se usa"""
+        with self._lock:
+            for publication in [*self._current.values(), *self._retired]:
+                if publication.handle is handle:
+                    publication.leases = max(0, publication.leases - 1)
+                    if publication in self._retired and publication.leases == 0:
+                        self._retired.remove(publication)
+                        self._unlink(publication)
+                    return
+    
+    def close(self):
+        """Libera todos los bloques (al terminar el proceso)"""
+        with self._lock:
+            for publication in [*self._current.values(), *self._retired]:
+                self._unlink(publication)
+            self._current.clear()
+            self._retired.clear()
+    
+    def _retire(self, publication: _Publication):
+        if publication.leases == 0:
+            self._unlink(publication)
+        else:
+            self._retired.append(publication)
+    
+    @staticmethod
+    def _unlink(publication: _Publication):
+        try:
+            publication.block.close()
+            publication.block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+_registry: Optional[SharedOfferRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_shared_offer_registry() -> SharedOfferRegistry:
+    """Registro de publicaciones del proceso (se liberan al salir)"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = SharedOfferRegistry()
+            atexit.register(_registry.close)
+        return _registry
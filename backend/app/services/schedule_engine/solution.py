@@ -1,8 +1,8 @@
 """
 Modelo de solución del solver
 """
-from dataclasses import dataclass
-from typing import List, Optional, Dict
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any
 
 
 @dataclass
@@ -15,6 +15,16 @@ class UnassignedSubject:
     conflicting_sections: List[Dict[str, any]]  # Secciones que chocan con las asignadas
 
 
+@dataclass
+class ScheduleAlternative:
+    """Horario alternativo (los K mejores horarios distintos de una misma generación)"""
+    rank: int  # 1 = horario principal de la solución
+    section_ids: List[int]
+    subject_ids: List[int]
+    quality_score: float  # Fitness - menor es mejor
+    min_distance: Optional[int] = None  # Asignaturas con distinta sección respecto del alternativo más parecido de mejor rango
+
+
 @dataclass
 class ScheduleSolution:
     """Resultado de la generación de horario"""
@@ -27,6 +37,8 @@ class ScheduleSolution:
     conflicts: List[str]  # Lista de conflictos si no es viable
     solver_status: str  # OPTIMAL, FEASIBLE, INFEASIBLE, etc.
     quality_score: Optional[float] = None  # Score de calidad (fitness) - menor es mejor
+    metadata: Dict[str, Any] = field(default_factory=dict)  # Métricas del motor (caché, estadísticas, etc.)
+    alternatives: List[ScheduleAlternative] = field(default_factory=list)  # Solo si se piden K > 1 horarios
     
     def __post_init__(self):
         """Validar datos después de inicialización"""
@@ -53,6 +65,17 @@ class ScheduleSolution:
             "processing_time": self.processing_time,
             "conflicts": self.conflicts,
             "solver_status": self.solver_status,
-            "quality_score": self.quality_score
+            "quality_score": self.quality_score,
+            "metadata": self.metadata,
+            "alternatives": [
+                {
+                    "rank": a.rank,
+                    "section_ids": a.section_ids,
+                    "subject_ids": a.subject_ids,
+                    "quality_score": a.quality_score,
+                    "min_distance": a.min_distance
+                }
+                for a in self.alternatives
+            ]
         }
 
@@ -0,0 +1,222 @@
+"""
+Cola de trabajos asíncronos de generación de horarios.
+
+Dos backends intercambiables (settings.SCHEDULE_JOB_BACKEND):
+- "local": pool de hilos dentro del proceso de la API (pruebas, ejecuciones sin broker)
+- "celery": workers de Celery con Redis como broker y backend de resultados
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.core.logging import logger
+from app.database import SessionLocal
+from app.services.schedule_service import ScheduleService
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+
+def run_schedule_generation(
+    student_id: int,
+    selected_subject_ids: List[int],
+    academic_period_id: Optional[int] = None,
+    optimization_level: str = "none",
+    solver_profile: Optional[str] = None,
+    progress_callback: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    k: int = 1,
+    min_distance: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Ejecuta una generación de horario con su propia sesión de base de datos.
+    Es el cuerpo del trabajo en ambos backends y en la generación con progreso en streaming.
+    
+    Returns:
+        {"status": "completed", "result": solución} o
+        {"status": "failed", "error": mensaje, "error_status_code": código HTTP}
+    """
+    db = SessionLocal()
+    try:
+        service = ScheduleService(db)
+        solution = service.generate_schedule_for_student(
+            student_id=student_id,
+            selected_subject_ids=selected_subject_ids,
+            academic_period_id=academic_period_id,
+            optimization_level=optimization_level,
+            solver_profile=solver_profile,
+            progress_callback=progress_callback,
+            k=k,
+            min_distance=min_distance
+        )
+        return {"status": JOB_COMPLETED, "result": solution.to_dict()}
+    except HTTPException as e:
+        # NotFoundError / ValidationError: mismo código y detalle que el modo síncrono
+        return {"status": JOB_FAILED, "error": str(e.detail), "error_status_code": e.status_code}
+    except Exception as e:
+        logger.error(f"Error en trabajo de generación de horario: {str(e)}")
+        return {
+            "status": JOB_FAILED,
+            "error": f"Error generando horario: {str(e)}",
+            "error_status_code": 500
+        }
+    finally:
+        db.close()
+
+
+class LocalScheduleJobQueue:
+    """
+    Backend en proceso: los trabajos corren en un pool de hilos y su estado
+    vive en memoria (se descarta pasado result_ttl_seconds desde que terminan).
+    """
+    
+    def __init__(self, max_workers: int = 2, result_ttl_seconds: float = 3600.0):
+        self.result_ttl_seconds = result_ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="schedule-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+    
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Encola un trabajo y retorna su estado inicial"""
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": JOB_PENDING,
+            "student_id": request["student_id"],
+            "optimization_level": request.get("optimization_level") or "none",
+            "created_at": datetime.now(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            "error_status_code": None
+        }
+        with self._condition:
+            self._purge_expired()
+            self._jobs[job_id] = job
+            snapshot = dict(job)
+        self._executor.submit(self._run, job_id, request)
+        return snapshot
+    
+    def get(self, job_id: str, wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        Estado de un trabajo (None si no existe).
+        
+        Args:
+            job_id: ID del trabajo
+            wait: Segundos a esperar a que termine (long-poll); 0 = responder de inmediato
+        """
+        deadline = time.monotonic() + max(0.0, wait)
+        with self._condition:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                remaining = deadline - time.monotonic()
+                if job["status"] in FINISHED_STATUSES or remaining <= 0:
+                    return dict(job)
+                self._condition.wait(remaining)
+    
+    def _run(self, job_id: str, request: Dict[str, Any]):
+        self._update(job_id, status=JOB_RUNNING, started_at=datetime.now())
+        outcome = run_schedule_generation(**request)
+        self._update(job_id, finished_at=datetime.now(), **outcome)
+    
+    def _update(self, job_id: str, **changes):
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(changes)
+            self._condition.notify_all()
+    
+    def _purge_expired(self):
+        """Elimina trabajos terminados cuyo resultado ya expiró (llamar con el lock tomado)"""
+        now = datetime.now()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None
+            and (now - job["finished_at"]).total_seconds() > self.result_ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+class CeleryScheduleJobQueue:
+    """
+    Backend distribuido: los trabajos se envían a workers de Celery
+    (celery -A app.core.celery_app worker) y el estado se consulta en el backend de resultados.
+    """
+    
+    # Estados de Celery -> estados del trabajo
+    STATE_MAP = {
+        "PENDING": JOB_PENDING,
+        "RECEIVED": JOB_PENDING,
+        "RETRY": JOB_PENDING,
+        "STARTED": JOB_RUNNING,
+        "SUCCESS": JOB_COMPLETED,
+        "FAILURE": JOB_FAILED,
+        "REVOKED": JOB_FAILED
+    }
+    
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Envía el trabajo al broker y retorna su estado inicial"""
+        from app.core.celery_app import generate_schedule_task
+        
+        job_id = uuid.uuid4().hex
+        generate_schedule_task.apply_async(kwargs=request, task_id=job_id)
+        return {
+            "job_id": job_id,
+            "status": JOB_PENDING,
+            "student_id": request["student_id"],
+            "optimization_level": request.get("optimization_level") or "none",
+            "created_at": datetime.now()
+        }
+    
+    def get(self, job_id: str, wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        """
+        Estado de un trabajo. Celery no distingue un ID desconocido de uno pendiente,
+        así que nunca retorna None.
+        """
+        from app.core.celery_app import celery_app
+        
+        async_result = celery_app.AsyncResult(job_id)
+        if wait > 0 and not async_result.ready():
+            try:
+                async_result.get(timeout=wait, propagate=False)
+            except Exception:
+                pass  # Timeout del long-poll: se informa el estado actual
+        
+        job = {"job_id": job_id, "status": self.STATE_MAP.get(async_result.state, JOB_PENDING)}
+        if async_result.state == "SUCCESS":
+            # La tarea retorna el resultado de run_schedule_generation
+            job.update(async_result.result)
+        elif job["status"] == JOB_FAILED:
+            job.update(error=f"Error generando horario: {async_result.result}", error_status_code=500)
+        return job
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_schedule_job_queue():
+    """Cola de trabajos configurada (se crea en el primer uso)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            if settings.SCHEDULE_JOB_BACKEND == "celery":
+                _queue = CeleryScheduleJobQueue()
+            else:
+                _queue = LocalScheduleJobQueue(
+                    max_workers=settings.SCHEDULE_JOB_LOCAL_WORKERS,
+                    result_ttl_seconds=settings.SCHEDULE_JOB_RESULT_TTL_SECONDS
+                )
+        return _queue
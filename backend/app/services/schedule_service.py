@@ -1,7 +1,12 @@
 """
 Service para generación de horarios
 """
-from typing import List, Optional
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Dict, Any, Iterable, Iterator, Callable, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.repositories.student_repository import StudentRepository
@@ -10,11 +15,25 @@ from app.models.source.student_data import AcademicHistory, GradeStatus
 from app.models.source.offer import CourseSection, SectionSchedule
 from app.models.sghu.enrollment import StudentEnrollment, EnrollmentPeriod
 from app.models.sghu.schedule import GeneratedSchedule, ScheduleSlot
-from app.services.schedule_engine.models import Student, Section, TimeSlot
-from app.services.schedule_engine.fitness import ScheduleFitness
-from app.services.schedule_engine.constraint_solver import ConstraintScheduleSolver
-from app.services.schedule_engine.hybrid_engine import HybridScheduleEngine
+from app.services.schedule_engine.models import Student, Section
 from app.services.schedule_engine.solution import ScheduleSolution
+from app.services.schedule_engine.runner import (
+    solve_for_student,
+    init_batch_worker,
+    solve_batch_job,
+    batch_pool_size,
+    get_batch_pool,
+    reset_batch_pool
+)
+from app.services.schedule_engine.conflict_index import ConflictIndex
+from app.services.schedule_engine.constraint_solver import SOLVER_PROFILES
+from app.services.schedule_engine.cohort_solver import CohortScheduleSolver
+from app.services.schedule_engine.delta_optimizer import DeltaScheduleOptimizer
+from app.services.schedule_engine.shared_offer import get_shared_offer_registry
+from app.services.schedule_engine.fitness_cache import get_shared_fitness_cache, offer_fingerprint
+from app.services.offer_snapshot import OfferSnapshot, get_offer_snapshot
+from app.services.prerequisite_graph import get_prerequisite_graph
+from app.config import settings
 from app.core.exceptions import NotFoundError, ValidationError
 from datetime import datetime
 
@@ -33,7 +52,11 @@ class ScheduleService:
         student_id: int,
         selected_subject_ids: List[int],
         academic_period_id: Optional[int] = None,
-        optimization_level: str = "none"
+        optimization_level: str = "none",
+        solver_profile: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        k: int = 1,
+        min_distance: Optional[int] = None
     ) -> ScheduleSolution:
         """
         Genera horario para un estudiante dado.
@@ -42,10 +65,30 @@ class ScheduleService:
             student_id: ID del estudiante
             selected_subject_ids: Lista de IDs de asignaturas que quiere cursar
             academic_period_id: ID del período académico (opcional, usa el activo si no se proporciona)
+            solver_profile: Perfil de CP-SAT, "latency" | "throughput" (opcional, usa el de la configuración)
+            progress_callback: Recibe el progreso de la optimización; si retorna True se detiene
+                               y se persiste el mejor horario encontrado hasta ese momento (opcional)
+            k: Número de horarios alternativos a retornar en solution.alternatives (1 = solo el mejor).
+               Se calculan en la misma generación; solo se persiste el horario principal
+            min_distance: Asignaturas con distinta sección entre cada par de alternativos
+                          (opcional, por defecto SCHEDULE_ALTERNATIVES_MIN_DISTANCE)
         
         Returns:
             ScheduleSolution con el resultado de la generación
         """
+        if solver_profile and solver_profile not in SOLVER_PROFILES:
+            raise ValidationError(
+                f"Perfil de solver inválido: {solver_profile}. Opciones: {', '.join(SOLVER_PROFILES)}"
+            )
+        if not 1 <= k <= settings.SCHEDULE_ALTERNATIVES_MAX:
+            raise ValidationError(
+                f"k inválido: {k}. Debe estar entre 1 y {settings.SCHEDULE_ALTERNATIVES_MAX}"
+            )
+        if min_distance is None:
+            min_distance = settings.SCHEDULE_ALTERNATIVES_MIN_DISTANCE
+        if min_distance < 1:
+            raise ValidationError(f"min_distance inválido: {min_distance}. Debe ser al menos 1")
+        
         # 1. Cargar datos del estudiante
         student_data = self._load_student_data(student_id)
         # Asignar las asignaturas seleccionadas
@@ -74,7 +117,9 @@ class ScheduleService:
             academic_period_id = period.id
         
         # 3. Cargar secciones disponibles de las asignaturas seleccionadas
-        all_sections = self._load_available_sections(selected_subject_ids, academic_period_id)
+        # (desde la foto en memoria de la oferta del período si está habilitada)
+        offer_snapshot = self._get_offer_snapshot(academic_period_id, selected_subject_ids)
+        all_sections = self._load_available_sections(selected_subject_ids, academic_period_id, offer_snapshot)
         
         if not all_sections:
             return ScheduleSolution(
@@ -103,35 +148,42 @@ class ScheduleService:
                 solver_status="INFEASIBLE"
             )
         
-        # 5. Generar horario usando motor híbrido o solo constraint solver
-        if optimization_level == "none":
-            # Solo usar constraint solver (restricciones duras)
-            solver = ConstraintScheduleSolver(student_data, filtered_sections)
-            solver.create_variables()
-            solver.add_constraints()
-            solution = solver.solve()
-            
-            # Actualizar análisis con TODAS las secciones disponibles
-            if solution.is_feasible:
-                assigned_subject_ids, unassigned_subjects = solver._analyze_assignment_with_all_sections(all_sections)
-                solution.assigned_subject_ids = assigned_subject_ids
-                solution.unassigned_subjects = unassigned_subjects
-                # Calcular quality_score si no está
-                if solution.quality_score is None:
-                    assigned_sections = [s for s in filtered_sections if s.id in solution.assigned_section_ids]
-                    fitness_calc = ScheduleFitness(assigned_sections)
-                    solution.quality_score = fitness_calc.calculate_fitness()
+        # Índice de conflictos construido una sola vez sobre todas las secciones cargadas
+        # (se comparte entre solver, AG y análisis de asignaturas no asignadas).
+        # Con la foto de oferta se reutiliza el índice de todo el período.
+        if offer_snapshot is not None:
+            conflict_index = offer_snapshot.conflict_index
         else:
-            # Usar motor híbrido (OR-Tools + AG)
-            hybrid_engine = HybridScheduleEngine(self.db)
-            solution = hybrid_engine.generate_optimized_schedule(
-                student=student_data,
-                available_sections=filtered_sections,
-                optimization_level=optimization_level
+            conflict_index = ConflictIndex(all_sections)
+        
+        # Caché de fitness compartida entre ejecuciones del mismo período y la misma oferta
+        fitness_cache = None
+        if optimization_level not in ("none", "exact") and settings.GA_SHARED_FITNESS_CACHE:
+            fitness_cache = get_shared_fitness_cache(
+                academic_period_id,
+                offer_snapshot.version if offer_snapshot is not None else offer_fingerprint(filtered_sections),
+                maxsize=settings.GA_FITNESS_CACHE_SIZE
             )
-            
-            # El motor híbrido ya calcula assigned_subject_ids y unassigned_subjects correctamente
-            # No necesitamos sobrescribirlos aquí
+        
+        # Último horario generado del estudiante en el período: arranque en caliente de CP-SAT
+        hint_section_ids = None
+        if settings.SCHEDULE_SOLVER_USE_HINTS:
+            hint_section_ids = self._load_hint_section_ids(student_id, academic_period_id)
+        
+        # 5. Generar horario usando motor híbrido o solo constraint solver
+        solution = solve_for_student(
+            student_data,
+            filtered_sections,
+            all_sections,
+            optimization_level,
+            conflict_index=conflict_index,
+            fitness_cache=fitness_cache,
+            solver_profile=solver_profile,
+            hint_section_ids=hint_section_ids,
+            progress_callback=progress_callback,
+            alternatives=k,
+            min_distance=min_distance
+        )
         
         # 6. Persistir si es viable
         if solution.is_feasible:
@@ -140,7 +192,8 @@ class ScheduleService:
                     student_id=student_id,
                     academic_period_id=academic_period_id,
                     solution=solution,
-                    optimization_level=optimization_level
+                    optimization_level=optimization_level,
+                    sections=all_sections
                 )
                 # Agregar el ID del horario guardado a la solución (opcional, para referencia)
                 if hasattr(solution, 'schedule_id'):
@@ -153,6 +206,506 @@ class ScheduleService:
         
         return solution
     
+    def generate_delta_schedule(
+        self,
+        base_schedule_id: int,
+        added_subject_ids: List[int],
+        removed_subject_ids: List[int]
+    ) -> ScheduleSolution:
+        """
+        Ajusta un horario generado agregando o quitando asignaturas (re-generación incremental).
+        
+        La selección de partida es la guardada con el horario base (incluidas las asignaturas que
+        no obtuvieron sección, que se vuelven a intentar y, si siguen sin sección, se reportan en
+        unassigned_subjects); en horarios guardados sin ella, las asignaturas de sus secciones.
+        Las asignaturas no afectadas conservan su sección; solo se re-optimizan las agregadas
+        (o las que no tienen sección, ej: sin cupos) y las que chocan con ellas, con una
+        búsqueda local acotada (SCHEDULE_DELTA_MAX_NEIGHBORHOOD, SCHEDULE_DELTA_MAX_NODES).
+        El resultado se persiste como un horario nuevo; el horario base no se modifica.
+        
+        Args:
+            base_schedule_id: ID del horario generado de partida
+            added_subject_ids: Asignaturas a agregar
+            removed_subject_ids: Asignaturas a quitar
+        
+        Returns:
+            ScheduleSolution del horario ajustado (metadata.schedule_id: horario guardado)
+        """
+        # 1. Horario base: estudiante, período, selección y secciones
+        base = self.db.query(
+            StudentEnrollment.student_id,
+            EnrollmentPeriod.academic_period_id,
+            GeneratedSchedule.selected_subject_ids
+        ).select_from(GeneratedSchedule).join(
+            StudentEnrollment, GeneratedSchedule.enrollment_id == StudentEnrollment.id
+        ).join(
+            EnrollmentPeriod, StudentEnrollment.enrollment_period_id == EnrollmentPeriod.id
+        ).filter(
+            GeneratedSchedule.id == base_schedule_id
+        ).first()
+        if not base:
+            raise NotFoundError("Horario", base_schedule_id)
+        student_id, academic_period_id, base_subject_ids = base
+        
+        previous_section_ids = [
+            section_id for (section_id,) in self.db.query(ScheduleSlot.section_id).filter(
+                ScheduleSlot.schedule_id == base_schedule_id
+            ).order_by(ScheduleSlot.id).all()
+        ]
+        previous_section_ids = list(dict.fromkeys(previous_section_ids))
+        subject_by_section = dict(self.db.query(CourseSection.id, CourseSection.subject_id).filter(
+            CourseSection.id.in_(previous_section_ids)
+        ).all()) if previous_section_ids else {}
+        
+        # 2. Nueva selección: asignaturas previas - quitadas + agregadas
+        if base_subject_ids is None:
+            base_subject_ids = [subject_by_section[s] for s in previous_section_ids if s in subject_by_section]
+        removed = set(removed_subject_ids)
+        selected_subject_ids = list(dict.fromkeys(list(base_subject_ids) + list(added_subject_ids)))
+        selected_subject_ids = [s for s in selected_subject_ids if s not in removed]
+        if not selected_subject_ids:
+            raise ValidationError(
+                "El ajuste quita todas las asignaturas del horario: debe quedar al menos una asignatura seleccionada"
+            )
+        
+        student_data = self._load_student_data(student_id)
+        student_data.selected_subject_ids = selected_subject_ids
+        self._validate_subjects_belong_to_student_program(student_id, list(added_subject_ids))
+        
+        # 3. Secciones de la nueva selección (misma carga y filtros que la generación completa)
+        offer_snapshot = self._get_offer_snapshot(academic_period_id, selected_subject_ids)
+        all_sections = self._load_available_sections(selected_subject_ids, academic_period_id, offer_snapshot)
+        filtered_sections = self._filter_valid_sections(student_data, all_sections)
+        if not filtered_sections:
+            return self._infeasible_solution(
+                student_id,
+                "No hay secciones válidas después de aplicar filtros (cupos, prerrequisitos)"
+            )
+        if offer_snapshot is not None:
+            conflict_index = offer_snapshot.conflict_index
+        else:
+            conflict_index = ConflictIndex(all_sections)
+        
+        # 4. Búsqueda local alrededor de las asignaturas cambiadas
+        solution = DeltaScheduleOptimizer(
+            student_data,
+            filtered_sections,
+            previous_section_ids,
+            conflict_index=conflict_index
+        ).optimize()
+        solution.metadata["base_schedule_id"] = base_schedule_id
+        
+        # 5. Persistir como horario nuevo
+        if solution.is_feasible and solution.assigned_section_ids:
+            try:
+                saved_schedule = self._save_schedule(
+                    student_id=student_id,
+                    academic_period_id=academic_period_id,
+                    solution=solution,
+                    optimization_level="delta",
+                    sections=all_sections
+                )
+                solution.metadata["schedule_id"] = saved_schedule.id
+            except Exception as e:
+                from app.core.logging import logger
+                logger.error(f"Error persistiendo horario: {str(e)}")
+        
+        return solution
+    
+    def generate_schedules_batch(
+        self,
+        jobs: List[Any],
+        academic_period_id: Optional[int] = None,
+        max_workers: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Genera horarios para muchos estudiantes en paralelo (pool de procesos).
+        
+        La oferta del período se carga una sola vez para la unión de asignaturas. Con foto de
+        oferta, los procesos de trabajo se adjuntan a ella en memoria compartida y el pool se
+        reutiliza entre lotes mientras no cambie la versión de la oferta; si no, se crea un pool
+        para el lote y la oferta se envía una vez a cada proceso. Los resultados se entregan a medida que terminan
+        (no en el orden de los trabajos); los horarios factibles se persisten por tandas de
+        SCHEDULE_BATCH_PERSIST_SIZE, cada una en una transacción.
+        
+        Args:
+            jobs: Trabajos con student_id, selected_subject_ids y optimization_level
+            academic_period_id: ID del período académico (opcional, usa el activo si no se proporciona)
+            max_workers: Trabajos en paralelo (opcional; por defecto y como máximo, los procesos
+                         del pool: SCHEDULE_BATCH_MAX_WORKERS o los núcleos disponibles)
+        
+        Yields:
+            Diccionario por trabajo con job_index, student_id, status, schedule_id, solution y error
+        """
+        # 1. Obtener período académico
+        if not academic_period_id:
+            period = AcademicPeriodRepository(self.db).get_current()
+            if not period:
+                for job_index, job in enumerate(jobs):
+                    yield self._batch_result(
+                        job_index, job.student_id,
+                        solution=self._infeasible_solution(job.student_id, "No hay período académico activo")
+                    )
+                return
+            academic_period_id = period.id
+        
+        # 2. Cargar estudiantes y validar asignaturas de cada trabajo
+        prepared = []
+        for job_index, job in enumerate(jobs):
+            try:
+                student_data = self._load_student_data(job.student_id)
+                student_data.selected_subject_ids = job.selected_subject_ids
+                self._validate_subjects_belong_to_student_program(job.student_id, job.selected_subject_ids)
+                prepared.append((job_index, job, student_data))
+            except (NotFoundError, ValidationError) as e:
+                yield self._batch_result(job_index, job.student_id, error=e.detail)
+        
+        # 3. Cargar la oferta compartida una sola vez (unión de asignaturas de todos los trabajos)
+        subject_ids = list(dict.fromkeys(
+            subject_id for _, job, _ in prepared for subject_id in job.selected_subject_ids
+        ))
+        offer_snapshot = self._get_offer_snapshot(academic_period_id, subject_ids)
+        offer_sections = self._load_available_sections(
+            subject_ids,
+            academic_period_id,
+            offer_snapshot
+        ) if subject_ids else []
+        sections_by_subject: Dict[int, List[Section]] = {}
+        for section in offer_sections:
+            sections_by_subject.setdefault(section.subject_id, []).append(section)
+        
+        # 4. Filtrar secciones por trabajo (cupos y prerrequisitos)
+        pending = []
+        for job_index, job, student_data in prepared:
+            all_sections = [
+                section
+                for subject_id in dict.fromkeys(job.selected_subject_ids)
+                for section in sections_by_subject.get(subject_id, [])
+            ]
+            if not all_sections:
+                yield self._batch_result(job_index, job.student_id, solution=self._infeasible_solution(
+                    job.student_id, "No hay secciones disponibles para las asignaturas seleccionadas"
+                ))
+                continue
+            
+            filtered_sections = self._filter_valid_sections(student_data, all_sections)
+            if not filtered_sections:
+                yield self._batch_result(job_index, job.student_id, solution=self._infeasible_solution(
+                    job.student_id, "No hay secciones válidas después de aplicar filtros (cupos, prerrequisitos)"
+                ))
+                continue
+            
+            pending.append((job_index, job, student_data, filtered_sections, all_sections))
+        
+        if not pending:
+            return
+        
+        # 5. Repartir las resoluciones en un pool de procesos (el cliente no puede superar
+        # los núcleos configurados)
+        workers = min(max_workers or batch_pool_size(), batch_pool_size(), len(pending))
+        jobs_by_index = {job_index: job for job_index, job, _, _, _ in pending}
+        
+        # Con foto de oferta, los procesos se adjuntan a la oferta publicada en memoria
+        # compartida (pool compartido entre lotes) en lugar de recibir una copia de las secciones
+        shared_offer = None
+        if offer_snapshot is not None and settings.SCHEDULE_SHARED_OFFER:
+            shared_offer = get_shared_offer_registry().acquire(
+                academic_period_id, offer_snapshot.version, offer_snapshot.table, offer_snapshot.conflict_index
+            )
+            executor = get_batch_pool(shared_offer)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(settings.SCHEDULE_BATCH_MP_CONTEXT),
+                initializer=init_batch_worker,
+                initargs=(offer_sections,)
+            )
+        
+        # Como mucho workers trabajos en vuelo: el siguiente se envía al terminar uno
+        queue = iter(pending)
+        futures = {}
+        
+        def submit_next():
+            item = next(queue, None)
+            if item is None:
+                return
+            job_index, job, student_data, filtered_sections, all_sections = item
+            future = executor.submit(
+                solve_batch_job,
+                job_index,
+                student_data,
+                [s.id for s in filtered_sections],
+                [s.id for s in all_sections],
+                job.optimization_level or "none",
+                {s.id: (s.capacity, s.enrolled_count) for s in all_sections}
+            )
+            futures[future] = job_index
+        
+        broken = False
+        try:
+            for _ in range(workers):
+                submit_next()
+            
+            # 6. Persistir los horarios viables por tandas (una transacción por tanda)
+            completed = []
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in sorted(done, key=futures.get):
+                    job_index = futures.pop(future)
+                    job = jobs_by_index[job_index]
+                    try:
+                        _, solution = future.result()
+                    except Exception as e:
+                        broken = broken or isinstance(e, BrokenProcessPool)
+                        yield self._batch_result(job_index, job.student_id, error=f"Error generando horario: {str(e)}")
+                        continue
+                    finally:
+                        if not broken:
+                            submit_next()
+                    
+                    completed.append((job_index, job, solution))
+                    if len(completed) >= settings.SCHEDULE_BATCH_PERSIST_SIZE:
+                        yield from self._persist_batch_results(completed, academic_period_id, offer_sections)
+                        completed = []
+            yield from self._persist_batch_results(completed, academic_period_id, offer_sections)
+            
+            # Con el pool roto, los trabajos sin enviar se reportan como error
+            for job_index, job, _, _, _ in queue:
+                yield self._batch_result(job_index, job.student_id, error="Error generando horario: pool de procesos interrumpido")
+        finally:
+            # Si el consumidor deja de leer (ej: cliente desconectado), cancelar lo pendiente
+            for future in futures:
+                future.cancel()
+            if shared_offer is None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            elif broken:
+                reset_batch_pool(executor)
+            if shared_offer is not None:
+                get_shared_offer_registry().release(shared_offer)
+    
+    def generate_cohort_schedules(
+        self,
+        students: List[Any],
+        academic_period_id: Optional[int] = None,
+        fairness: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Asigna horarios a una cohorte completa con cupos compartidos (ej: apertura de matrícula).
+        
+        A diferencia de la generación por lotes, los estudiantes no se resuelven por separado:
+        la suma de estudiantes asignados a cada sección respeta sus cupos disponibles, así que
+        dos estudiantes nunca reciben el último cupo de la misma sección.
+        
+        Args:
+            students: Estudiantes con student_id, selected_subject_ids y priority
+            academic_period_id: ID del período académico (opcional, usa el activo si no se proporciona)
+            fairness: Rendimientos decrecientes por asignatura (reparto más equitativo)
+        
+        Returns:
+            Diccionario con estadísticas de la descomposición y un resultado por estudiante
+        
+        Raises:
+            ValidationError: Si hay estudiantes repetidos o prioridades negativas
+        """
+        start_time = time.time()
+        
+        student_ids = [student.student_id for student in students]
+        repeated = sorted({student_id for student_id in student_ids if student_ids.count(student_id) > 1})
+        if repeated:
+            raise ValidationError(f"Estudiantes repetidos en la cohorte: {repeated}")
+        if any(student.priority < 0 for student in students):
+            raise ValidationError("La prioridad de los estudiantes debe ser mayor o igual a 0")
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        summary = {
+            "academic_period_id": academic_period_id,
+            "students": len(students),
+            "components": 0,
+            "largest_component": 0,
+            "contested_sections": 0
+        }
+        
+        # 1. Obtener período académico
+        if not academic_period_id:
+            period = AcademicPeriodRepository(self.db).get_current()
+            if not period:
+                for student in students:
+                    results[student.student_id] = self._cohort_result(student.student_id, solution=self._infeasible_solution(
+                        student.student_id, "No hay período académico activo"
+                    ))
+                return self._cohort_response(summary, students, results, start_time)
+            academic_period_id = period.id
+            summary["academic_period_id"] = academic_period_id
+        
+        # 2. Cargar estudiantes y validar asignaturas
+        prepared = []
+        for student in students:
+            try:
+                student_data = self._load_student_data(student.student_id)
+                student_data.selected_subject_ids = student.selected_subject_ids
+                self._validate_subjects_belong_to_student_program(student.student_id, student.selected_subject_ids)
+                prepared.append((student, student_data))
+            except (NotFoundError, ValidationError) as e:
+                results[student.student_id] = self._cohort_result(student.student_id, error=e.detail)
+        
+        # 3. Cargar la oferta una sola vez (unión de asignaturas de la cohorte)
+        subject_ids = list(dict.fromkeys(
+            subject_id for student, _ in prepared for subject_id in student.selected_subject_ids
+        ))
+        offer_snapshot = self._get_offer_snapshot(academic_period_id, subject_ids)
+        offer_sections = self._load_available_sections(
+            subject_ids, academic_period_id, offer_snapshot
+        ) if subject_ids else []
+        sections_by_subject: Dict[int, List[Section]] = {}
+        for section in offer_sections:
+            sections_by_subject.setdefault(section.subject_id, []).append(section)
+        
+        # 4. Secciones candidatas por estudiante (cupos y prerrequisitos)
+        cohort = []
+        sections_by_student: Dict[int, List[Section]] = {}
+        all_sections_by_student: Dict[int, List[Section]] = {}
+        for student, student_data in prepared:
+            all_sections = [
+                section
+                for subject_id in dict.fromkeys(student.selected_subject_ids)
+                for section in sections_by_subject.get(subject_id, [])
+            ]
+            if not all_sections:
+                results[student.student_id] = self._cohort_result(student.student_id, solution=self._infeasible_solution(
+                    student.student_id, "No hay secciones disponibles para las asignaturas seleccionadas"
+                ))
+                continue
+            cohort.append(student_data)
+            all_sections_by_student[student.student_id] = all_sections
+            sections_by_student[student.student_id] = self._filter_valid_sections(student_data, all_sections)
+        
+        # 5. Resolver la cohorte por componentes independientes
+        if cohort:
+            conflict_index = offer_snapshot.conflict_index if offer_snapshot is not None else ConflictIndex(offer_sections)
+            solver = CohortScheduleSolver(
+                cohort,
+                sections_by_student,
+                conflict_index=conflict_index,
+                priorities={student.student_id: student.priority for student, _ in prepared},
+                fairness=fairness,
+                all_sections_by_student=all_sections_by_student
+            )
+            components = solver.components()
+            summary["components"] = len(components)
+            summary["largest_component"] = len(components[0]) if components else 0
+            summary["contested_sections"] = len(solver.contested_section_ids)
+            
+            solutions = solver.solve()
+            
+            # 6. Persistir los horarios viables en una sola transacción
+            to_save = [
+                (student_id, solution, "cohort")
+                for student_id, solution in solutions.items()
+                if solution.is_feasible and solution.assigned_section_ids
+            ]
+            schedule_ids: Dict[int, int] = {}
+            try:
+                saved_ids = self._save_schedules(to_save, academic_period_id, offer_sections)
+                schedule_ids = {student_id: schedule_id for (student_id, _, _), schedule_id in zip(to_save, saved_ids)}
+            except Exception as e:
+                from app.core.logging import logger
+                logger.error(f"Error persistiendo horarios de la cohorte: {str(e)}")
+                self.db.rollback()
+            for student_id, solution in solutions.items():
+                results[student_id] = self._cohort_result(
+                    student_id, solution=solution, schedule_id=schedule_ids.get(student_id)
+                )
+        
+        return self._cohort_response(summary, students, results, start_time)
+    
+    def _persist_batch_results(
+        self,
+        completed: List[Tuple[int, Any, ScheduleSolution]],
+        academic_period_id: int,
+        sections: List[Section]
+    ) -> Iterator[Dict[str, Any]]:
+        """Persiste una tanda de resultados del lote (los viables) y los entrega"""
+        feasible = [(job, solution) for _, job, solution in completed if solution.is_feasible]
+        schedule_ids: Dict[int, int] = {}
+        try:
+            saved_ids = self._save_schedules(
+                [(job.student_id, solution, job.optimization_level or "none") for job, solution in feasible],
+                academic_period_id,
+                sections
+            )
+            schedule_ids = {id(solution): schedule_id for (_, solution), schedule_id in zip(feasible, saved_ids)}
+        except Exception as e:
+            from app.core.logging import logger
+            logger.error(f"Error persistiendo horarios del lote: {str(e)}")
+            self.db.rollback()
+        
+        for job_index, job, solution in completed:
+            yield self._batch_result(
+                job_index, job.student_id, solution=solution, schedule_id=schedule_ids.get(id(solution))
+            )
+    
+    @staticmethod
+    def _cohort_result(
+        student_id: int,
+        solution: Optional[ScheduleSolution] = None,
+        schedule_id: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Resultado de un estudiante de la asignación de cohorte"""
+        return {
+            "student_id": student_id,
+            "status": "error" if error else "completed",
+            "schedule_id": schedule_id,
+            "solution": solution.to_dict() if solution else None,
+            "error": error
+        }
+    
+    @staticmethod
+    def _cohort_response(
+        summary: Dict[str, Any],
+        students: List[Any],
+        results: Dict[int, Dict[str, Any]],
+        start_time: float
+    ) -> Dict[str, Any]:
+        """Respuesta de la asignación de cohorte (resultados en el orden de la petición)"""
+        return {
+            **summary,
+            "processing_time": time.time() - start_time,
+            "results": [results[student.student_id] for student in students]
+        }
+    
+    @staticmethod
+    def _batch_result(
+        job_index: int,
+        student_id: int,
+        solution: Optional[ScheduleSolution] = None,
+        schedule_id: Optional[int] = None,
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Resultado de un trabajo de la generación por lotes"""
+        return {
+            "job_index": job_index,
+            "student_id": student_id,
+            "status": "error" if error else "completed",
+            "schedule_id": schedule_id,
+            "solution": solution.to_dict() if solution else None,
+            "error": error
+        }
+    
+    @staticmethod
+    def _infeasible_solution(student_id: int, conflict: str) -> ScheduleSolution:
+        """Solución infactible sin ejecutar el motor (faltan datos para generar)"""
+        return ScheduleSolution(
+            student_id=student_id,
+            is_feasible=False,
+            assigned_section_ids=[],
+            assigned_subject_ids=[],
+            unassigned_subjects=[],
+            processing_time=0.0,
+            conflicts=[conflict],
+            solver_status="INFEASIBLE"
+        )
+    
     def _load_student_data(self, student_id: int) -> Student:
         """Carga datos del estudiante y los convierte al modelo del solver"""
         student = self.student_repo.get_by_id(student_id)
@@ -174,57 +727,49 @@ class ScheduleService:
             selected_subject_ids=[]  # Se llenará en generate_schedule_for_student
         )
     
+    def _load_hint_section_ids(self, student_id: int, period_id: int) -> List[int]:
+        """Secciones del último horario completado del estudiante en el período (vacío si no hay)"""
+        latest_schedule_id = self.db.query(GeneratedSchedule.id).join(
+            StudentEnrollment, GeneratedSchedule.enrollment_id == StudentEnrollment.id
+        ).join(
+            EnrollmentPeriod, StudentEnrollment.enrollment_period_id == EnrollmentPeriod.id
+        ).filter(
+            StudentEnrollment.student_id == student_id,
+            EnrollmentPeriod.academic_period_id == period_id,
+            GeneratedSchedule.status == 'completed'
+        ).order_by(
+            GeneratedSchedule.created_at.desc(),
+            GeneratedSchedule.id.desc()
+        ).limit(1).scalar_subquery()
+        
+        rows = self.db.query(ScheduleSlot.section_id).filter(
+            ScheduleSlot.schedule_id == latest_schedule_id
+        ).distinct().all()
+        return [section_id for (section_id,) in rows]
+    
+    def _get_offer_snapshot(self, period_id: int, subject_ids: List[int]) -> Optional[OfferSnapshot]:
+        """
+        Foto vigente de la oferta del período, con los cupos de las asignaturas dadas al día
+        (None si está deshabilitada en la configuración)
+        """
+        if not settings.OFFER_SNAPSHOT_ENABLED:
+            return None
+        return get_offer_snapshot(self.db, period_id, subject_ids)
+    
     def _load_available_sections(
         self,
         subject_ids: List[int],
-        period_id: int
+        period_id: int,
+        offer_snapshot: Optional[OfferSnapshot] = None
     ) -> List[Section]:
         """
         Carga secciones disponibles y las convierte al modelo del solver.
+        Secciones, horarios y datos de asignatura se traen en consultas masivas (sin N+1),
+        o se toman de la foto de oferta del período si se proporciona.
         """
-        # Obtener todas las secciones de las asignaturas seleccionadas en el período
-        sections = []
-        
-        for subject_id in subject_ids:
-            # Obtener secciones de esta asignatura en el período
-            subject_sections = self.section_repo.get_by_subject(subject_id, period_id)
-            
-            for db_section in subject_sections:
-                # Cargar horarios de la sección
-                db_schedules = self.db.query(SectionSchedule).filter(
-                    SectionSchedule.section_id == db_section.id
-                ).all()
-                
-                # Convertir horarios a TimeSlots
-                timeslots = []
-                for idx, schedule in enumerate(db_schedules):
-                    timeslot = TimeSlot(
-                        id=schedule.id,
-                        day_of_week=schedule.day_of_week,
-                        start_time=schedule.start_time,
-                        end_time=schedule.end_time
-                    )
-                    timeslots.append(timeslot)
-                
-                # Obtener información de la asignatura
-                subject = self.subject_repo.get_by_id(db_section.subject_id)
-                
-                # Crear objeto Section
-                section = Section(
-                    id=db_section.id,
-                    subject_id=db_section.subject_id,
-                    subject_code=subject.code if subject else f"SUB{db_section.subject_id}",
-                    subject_name=subject.name if subject else "Asignatura desconocida",
-                    professor_id=db_section.professor_id,
-                    classroom_id=db_section.classroom_id,
-                    capacity=db_section.capacity,
-                    enrolled_count=db_section.enrolled_count,
-                    section_number=db_section.section_number,
-                    timeslots=timeslots
-                )
-                sections.append(section)
-        
-        return sections
+        if offer_snapshot is not None:
+            return offer_snapshot.sections_for(subject_ids)
+        return self.section_repo.get_engine_sections(subject_ids, period_id)
     
     def _filter_valid_sections(
         self,
@@ -237,26 +782,18 @@ class ScheduleService:
         - Con prerrequisitos cumplidos
         """
         valid_sections = []
+        prerequisite_graph = get_prerequisite_graph(self.db, student.program_id)
+        approved_subject_ids = set(student.approved_subject_ids)
         
         for section in sections:
             # 1. Verificar cupos
             if section.available_spots <= 0:
                 continue
             
-            # 2. Verificar prerrequisitos
-            subject = self.subject_repo.get_with_prerequisites(section.subject_id)
-            if subject and subject.prerequisites:
-                prerequisites_met = True
-                for prereq in subject.prerequisites:
-                    if prereq.type == 'obligatorio':
-                        # Debe estar aprobado
-                        if prereq.prerequisite_subject_id not in student.approved_subject_ids:
-                            prerequisites_met = False
-                            break
-                    # Correquisitos se manejan en el solver
-                
-                if not prerequisites_met:
-                    continue
+            # 2. Verificar prerrequisitos obligatorios (deben estar aprobados)
+            # Correquisitos se manejan en el solver
+            if not prerequisite_graph.meets_required(section.subject_id, approved_subject_ids):
+                continue
             
             valid_sections.append(section)
         
@@ -317,34 +854,40 @@ class ScheduleService:
             error_message = "Las siguientes asignaturas no pertenecen al programa del estudiante:\n" + "\n".join(f"- {detail}" for detail in error_details)
             raise ValidationError(error_message)
     
-    def _get_or_create_enrollment(
+    def _get_or_create_enrollments(
         self,
-        student_id: int,
+        student_ids: List[int],
         academic_period_id: int
-    ) -> StudentEnrollment:
+    ) -> Dict[int, int]:
         """
-        Obtiene o crea un StudentEnrollment para el estudiante y período académico.
+        Obtiene o crea el StudentEnrollment de cada estudiante en el período académico.
+        Una consulta para los existentes y una inserción masiva para los que faltan.
         
         Args:
-            student_id: ID del estudiante
+            student_ids: IDs de los estudiantes
             academic_period_id: ID del período académico
         
         Returns:
-            StudentEnrollment existente o nuevo
+            ID de la matrícula por student_id
         """
-        # Buscar enrollment existente
-        enrollment = self.db.query(StudentEnrollment).join(
+        student_ids = list(dict.fromkeys(student_ids))
+        enrollment_ids: Dict[int, int] = {}
+        
+        # Buscar matrículas existentes (la más antigua si hay varias)
+        rows = self.db.query(StudentEnrollment.student_id, StudentEnrollment.id).join(
             EnrollmentPeriod
         ).filter(
-            StudentEnrollment.student_id == student_id,
+            StudentEnrollment.student_id.in_(student_ids),
             EnrollmentPeriod.academic_period_id == academic_period_id
-        ).first()
+        ).order_by(StudentEnrollment.id).all()
+        for student_id, enrollment_id in rows:
+            enrollment_ids.setdefault(student_id, enrollment_id)
         
-        if enrollment:
-            return enrollment
+        missing = [student_id for student_id in student_ids if student_id not in enrollment_ids]
+        if not missing:
+            return enrollment_ids
         
-        # Si no existe, crear uno nuevo
-        # Primero obtener o crear el EnrollmentPeriod
+        # Crear las que faltan: primero obtener o crear el EnrollmentPeriod
         enrollment_period = self.db.query(EnrollmentPeriod).filter(
             EnrollmentPeriod.academic_period_id == academic_period_id
         ).first()
@@ -359,27 +902,44 @@ class ScheduleService:
             self.db.add(enrollment_period)
             self.db.flush()  # Para obtener el ID
         
-        # Calcular total de créditos (se actualizará cuando se guarden las asignaturas)
-        total_credits = 0
-        
-        # Crear StudentEnrollment
-        enrollment = StudentEnrollment(
-            enrollment_period_id=enrollment_period.id,
-            student_id=student_id,
-            total_credits=total_credits,
-            status='pending'
-        )
-        self.db.add(enrollment)
-        self.db.flush()  # Para obtener el ID
-        
-        return enrollment
+        # Total de créditos en 0 (se actualizará cuando se guarden las asignaturas)
+        created = self.db.execute(
+            insert(StudentEnrollment).returning(
+                StudentEnrollment.student_id, StudentEnrollment.id, sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "enrollment_period_id": enrollment_period.id,
+                    "student_id": student_id,
+                    "total_credits": 0,
+                    "status": "pending"
+                }
+                for student_id in missing
+            ]
+        ).all()
+        enrollment_ids.update({student_id: enrollment_id for student_id, enrollment_id in created})
+        return enrollment_ids
+    
+    @staticmethod
+    def _generation_method(optimization_level: str) -> str:
+        """Método de generación registrado según el nivel de optimización"""
+        if optimization_level in ["none", "exact"]:
+            return "constraint_solver"
+        elif optimization_level in ["low", "medium", "high"]:
+            return "hybrid"
+        elif optimization_level == "cohort":
+            return "cohort_solver"
+        elif optimization_level == "delta":
+            return "delta"
+        return "unknown"
     
     def _save_schedule(
         self,
         student_id: int,
         academic_period_id: int,
         solution: ScheduleSolution,
-        optimization_level: str = "none"
+        optimization_level: str = "none",
+        sections: Optional[Iterable[Section]] = None
     ) -> GeneratedSchedule:
         """
         Guarda el horario generado en la base de datos.
@@ -389,60 +949,108 @@ class ScheduleService:
             academic_period_id: ID del período académico
             solution: Solución del solver
             optimization_level: Nivel de optimización usado
+            sections: Secciones ya cargadas en la generación (opcional, evita releer sus horarios)
         
         Returns:
             GeneratedSchedule guardado
         """
-        # 1. Obtener o crear StudentEnrollment
-        enrollment = self._get_or_create_enrollment(student_id, academic_period_id)
+        schedule_id = self._save_schedules(
+            [(student_id, solution, optimization_level)],
+            academic_period_id,
+            sections
+        )[0]
+        return self.db.get(GeneratedSchedule, schedule_id)
+    
+    def _save_schedules(
+        self,
+        entries: List[Tuple[int, ScheduleSolution, str]],
+        academic_period_id: int,
+        sections: Optional[Iterable[Section]] = None
+    ) -> List[int]:
+        """
+        Guarda varios horarios generados en una sola transacción.
         
-        # 2. Determinar método de generación
-        if optimization_level == "none":
-            generation_method = "constraint_solver"
-        elif optimization_level in ["low", "medium", "high"]:
-            generation_method = "hybrid"
-        else:
-            generation_method = "unknown"
-        
-        # 3. Crear GeneratedSchedule
-        generated_schedule = GeneratedSchedule(
-            enrollment_id=enrollment.id,
-            generation_method=generation_method,
-            quality_score=solution.quality_score,
-            processing_time=solution.processing_time,
-            status='completed' if solution.is_feasible else 'failed'
+        Los GeneratedSchedule se insertan en una inserción masiva con RETURNING y todos los
+        ScheduleSlot en otra. Los bloques de horario se toman de las secciones en memoria;
+        solo los de secciones no proporcionadas se consultan (en una sola consulta).
+        
+        Args:
+            entries: (student_id, solución, nivel de optimización) por horario
+            academic_period_id: ID del período académico
+            sections: Secciones ya cargadas en la generación (opcional)
+        
+        Returns:
+            IDs de los horarios guardados, en el orden de entries
+        """
+        if not entries:
+            return []
+        
+        # 1. Obtener o crear las matrículas
+        enrollment_ids = self._get_or_create_enrollments(
+            [student_id for student_id, _, _ in entries], academic_period_id
         )
-        self.db.add(generated_schedule)
-        self.db.flush()  # Para obtener el ID
-        
-        # 4. Crear ScheduleSlots para cada sección asignada
-        for section_id in solution.assigned_section_ids:
-            # Obtener la sección y sus horarios
-            section = self.section_repo.get_by_id(section_id)
-            if not section:
-                continue
-            
-            # Obtener horarios de la sección
-            section_schedules = self.db.query(SectionSchedule).filter(
-                SectionSchedule.section_id == section_id
-            ).all()
-            
-            # Crear un ScheduleSlot por cada horario de la sección
-            for schedule in section_schedules:
-                schedule_slot = ScheduleSlot(
-                    schedule_id=generated_schedule.id,
-                    section_id=section_id,
-                    day_of_week=schedule.day_of_week,
-                    start_time=schedule.start_time,
-                    end_time=schedule.end_time
-                )
-                self.db.add(schedule_slot)
+        
+        # 2. Crear los GeneratedSchedule (IDs en el orden de entries)
+        schedule_ids = self.db.scalars(
+            insert(GeneratedSchedule).returning(GeneratedSchedule.id, sort_by_parameter_order=True),
+            [
+                {
+                    "enrollment_id": enrollment_ids[student_id],
+                    "generation_method": self._generation_method(optimization_level),
+                    "quality_score": solution.quality_score,
+                    "processing_time": solution.processing_time,
+                    "status": 'completed' if solution.is_feasible else 'failed',
+                    # Selección completa: permite ajustar el horario sin perder las asignaturas no asignadas
+                    "selected_subject_ids": list(dict.fromkeys(
+                        solution.assigned_subject_ids + [u.subject_id for u in solution.unassigned_subjects]
+                    )) or None
+                }
+                for student_id, solution, optimization_level in entries
+            ]
+        ).all()
+        
+        # 3. Bloques de horario de las secciones asignadas: en memoria o en una consulta
+        slots_by_section: Dict[int, List[Tuple[int, Any, Any]]] = {}
+        for section in sections or []:
+            slots_by_section.setdefault(section.id, [
+                (slot.day_of_week, slot.start_time, slot.end_time) for slot in section.timeslots
+            ])
+        missing = {
+            section_id
+            for _, solution, _ in entries
+            for section_id in solution.assigned_section_ids
+            if section_id not in slots_by_section
+        }
+        if missing:
+            rows = self.db.query(
+                SectionSchedule.section_id,
+                SectionSchedule.day_of_week,
+                SectionSchedule.start_time,
+                SectionSchedule.end_time
+            ).filter(SectionSchedule.section_id.in_(missing)).order_by(SectionSchedule.id).all()
+            for section_id, day_of_week, start_time, end_time in rows:
+                slots_by_section.setdefault(section_id, []).append((day_of_week, start_time, end_time))
+        
+        # 4. Crear un ScheduleSlot por cada horario de cada sección asignada
+        slot_rows = [
+            {
+                "schedule_id": schedule_id,
+                "section_id": section_id,
+                "day_of_week": day_of_week,
+                "start_time": start_time,
+                "end_time": end_time
+            }
+            for schedule_id, (_, solution, _) in zip(schedule_ids, entries)
+            for section_id in solution.assigned_section_ids
+            for day_of_week, start_time, end_time in slots_by_section.get(section_id, [])
+        ]
+        if slot_rows:
+            self.db.execute(insert(ScheduleSlot), slot_rows)
         
         # 5. Commit todos los cambios
         self.db.commit()
-        self.db.refresh(generated_schedule)
         
-        return generated_schedule
+        return list(schedule_ids)
     
     def get_generated_schedules_for_student(self, student_id: int) -> List[GeneratedSchedule]:
         """Obtiene todos los horarios generados para un estudiante."""
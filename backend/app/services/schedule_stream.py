@@ -0,0 +1,178 @@
+"""
+Generación de horarios con progreso en streaming (NDJSON o Server-Sent Events).
+
+La optimización corre en un pool de hilos acotado (SCHEDULE_STREAM_MAX_CONCURRENT) y publica
+eventos en una cola: el horario inicial de CP-SAT y el mejor horario de cada generación del AG. El cliente puede detenerla cuando
+el horario en curso le basta (desconectándose o con stop()); las generaciones restantes
+se cancelan y se persiste el mejor horario encontrado hasta ese momento.
+"""
+import json
+import queue
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.services.schedule_jobs import run_schedule_generation
+
+STREAM_FORMATS = ("ndjson", "sse")
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream"
+}
+
+
+class ScheduleStream:
+    """
+    Una generación de horario en curso con sus eventos de progreso.
+    
+    Eventos (campo "event"):
+    - started: stream_id para detener la optimización desde otra petición
+    - progress: fase ("cp_sat" | "genetic"), generación, mejor fitness de la generación y
+      el mejor horario encontrado hasta el momento (incumbent_fitness, incumbent_section_ids)
+    - heartbeat: mantiene viva la conexión mientras no hay progreso
+    - result: resultado final, igual al de los trabajos asíncronos (status, result, error)
+    """
+    
+    def __init__(self, request: Dict[str, Any]):
+        """
+        Args:
+            request: Argumentos de run_schedule_generation (student_id, selected_subject_ids, ...)
+        """
+        self.stream_id = uuid.uuid4().hex
+        self.request = request
+        self._events: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._stop = threading.Event()
+        self._incumbent_fitness: Optional[float] = None
+        self._incumbent_section_ids = []
+    
+    def stop(self):
+        """Pide detener la optimización: se cancela en la próxima generación del AG"""
+        self._stop.set()
+    
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+    
+    def events(self, heartbeat_seconds: float = 15.0) -> Iterator[Dict[str, Any]]:
+        """
+        Eventos de la generación hasta el resultado final.
+        Si el consumidor deja de leer (ej: cliente desconectado), la optimización se detiene.
+        """
+        try:
+            yield {"event": "started", "stream_id": self.stream_id, "student_id": self.request["student_id"]}
+            while True:
+                try:
+                    event = self._events.get(timeout=heartbeat_seconds)
+                except queue.Empty:
+                    yield {"event": "heartbeat"}
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self.stop()
+    
+    def _on_progress(self, progress: Dict[str, Any]) -> bool:
+        """Callback del motor: publica el progreso y retorna True si se pidió detener"""
+        best_fitness = progress.get("best_fitness")
+        if best_fitness is not None and (
+            self._incumbent_fitness is None or best_fitness < self._incumbent_fitness
+        ):
+            # El mejor de una generación del AG puede ser peor que el horario de CP-SAT
+            self._incumbent_fitness = best_fitness
+            self._incumbent_section_ids = list(progress.get("section_ids", []))
+        self._events.put({
+            "event": "progress",
+            **progress,
+            "incumbent_fitness": self._incumbent_fitness,
+            "incumbent_section_ids": self._incumbent_section_ids
+        })
+        return self._stop.is_set()
+    
+    def _run(self):
+        try:
+            outcome = run_schedule_generation(**self.request, progress_callback=self._on_progress)
+            self._events.put({"event": "result", "stopped_early": self.stopped, **outcome})
+        finally:
+            self._events.put(None)
+            _unregister(self.stream_id)
+
+
+def format_event(event: Dict[str, Any], stream_format: str = "ndjson") -> str:
+    """Serializa un evento como línea NDJSON o como mensaje SSE"""
+    payload = json.dumps(event, default=str)
+    if stream_format == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+# Streams en curso por ID (para detenerlos desde otra petición)
+_streams: Dict[str, ScheduleStream] = {}
+_streams_lock = threading.Lock()
+
+
+# Pool de hilos de las generaciones en streaming y cupos libres (uno por generación en curso)
+_executor: Optional[ThreadPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            max_concurrent = max(1, settings.SCHEDULE_STREAM_MAX_CONCURRENT)
+            _executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="schedule-stream")
+            _slots = threading.BoundedSemaphore(max_concurrent)
+        return _executor, _slots
+
+
+def start_schedule_stream(request: Dict[str, Any]) -> ScheduleStream:
+    """
+    Crea, registra e inicia una generación con progreso en streaming.
+    
+    Raises:
+        ServiceUnavailableError: Si ya hay SCHEDULE_STREAM_MAX_CONCURRENT generaciones en curso
+    """
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise ServiceUnavailableError(
+            "Demasiadas generaciones en streaming en curso; intenta de nuevo en unos segundos"
+        )
+    
+    stream = ScheduleStream(request)
+    with _streams_lock:
+        _streams[stream.stream_id] = stream
+    try:
+        executor.submit(_run_stream, stream, slots)
+    except Exception:
+        _unregister(stream.stream_id)
+        slots.release()
+        raise
+    return stream
+
+
+def _run_stream(stream: ScheduleStream, slots: threading.BoundedSemaphore):
+    """Ejecuta la generación en un hilo del pool y libera su cupo al terminar"""
+    try:
+        stream._run()
+    finally:
+        slots.release()
+
+
+def stop_schedule_stream(stream_id: str) -> bool:
+    """Detiene una generación en curso. Retorna False si no existe o ya terminó"""
+    with _streams_lock:
+        stream = _streams.get(stream_id)
+    if stream is None:
+        return False
+    stream.stop()
+    return True
+
+
+def _unregister(stream_id: str):
+    with _streams_lock:
+        _streams.pop(stream_id, None)
@@ -1,7 +1,9 @@
 """
 Service para validaciones de reglas de negocio
 """
-from typing import List, Optional, Dict, Any
+import heapq
+from dataclasses import dataclass, field
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import time
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
@@ -13,10 +15,68 @@ from app.repositories.subject_repository import (
     AcademicPeriodRepository
 )
 from app.models.source.student_data import AcademicHistory, FinancialStatus, GradeStatus
-from app.models.source.academic import Prerequisite, Subject
-from app.models.source.rules import AcademicRule
+from app.models.source.academic import Subject
+from app.models.source.people import Student
 from app.models.source.offer import CourseSection, SectionSchedule
 from app.schemas.validation import ValidationResult
+from app.services.prerequisite_graph import get_prerequisite_graph
+from app.services.academic_rules import AcademicRules, get_academic_rules
+
+
+def missing_prerequisites_message(missing_prerequisite_names: List[str]) -> str:
+    """Mensaje para el estudiante con los prerrequisitos que le faltan"""
+    return f"Debes aprobar las siguientes materias primero: {', '.join(missing_prerequisite_names)}"
+
+
+def find_overlapping_blocks(blocks: List[Tuple[int, time, time]]) -> List[Tuple[int, int]]:
+    """
+    Pares de bloques de horario que se solapan, con un barrido por día en O(n log n + k):
+    los bloques de cada día se recorren por hora de inicio manteniendo los activos en un
+    heap por hora de fin; cada bloque choca con todos los activos que terminan después
+    de su inicio (bloques que solo se tocan no chocan).
+    
+    Args:
+        blocks: (día, inicio, fin) de cada bloque
+    
+    Returns:
+        Pares (i, j) de posiciones en blocks que se solapan, con i < j
+    """
+    by_day: Dict[int, List[int]] = {}
+    for index, (day, _, _) in enumerate(blocks):
+        by_day.setdefault(day, []).append(index)
+    
+    pairs = []
+    for indexes in by_day.values():
+        indexes.sort(key=lambda index: (blocks[index][1], blocks[index][2], index))
+        active: List[Tuple[time, int]] = []
+        for index in indexes:
+            start = blocks[index][1]
+            while active and active[0][0] <= start:
+                heapq.heappop(active)
+            for _, other in active:
+                pairs.append((min(index, other), max(index, other)))
+            heapq.heappush(active, (blocks[index][2], index))
+    return pairs
+
+
+@dataclass
+class EnrollmentValidationData:
+    """
+    Datos de una o muchas solicitudes de matrícula precargados con consultas por conjuntos
+    (ValidationService.load_validation_data), para evaluar las reglas en memoria.
+    """
+    students: Dict[int, Student]
+    financial_statuses: Dict[int, FinancialStatus]
+    academic_histories: Dict[int, List[AcademicHistory]]  # Por ID de registro
+    sections: Dict[int, CourseSection]  # Con asignatura y horarios
+    rules: AcademicRules
+    subjects: Dict[int, Subject] = field(default_factory=dict)  # Asignaturas de las secciones
+    
+    def __post_init__(self):
+        """Las asignaturas se toman de las secciones (cargadas con JOIN)"""
+        for section in self.sections.values():
+            if section.subject is not None:
+                self.subjects.setdefault(section.subject.id, section.subject)
 
 
 class ValidationService:
@@ -29,12 +89,41 @@ class ValidationService:
         self.section_repo = CourseSectionRepository(db)
         self.period_repo = AcademicPeriodRepository(db)
     
-    def validate_financial_status(self, student_id: int) -> ValidationResult:
+    def load_validation_data(self, student_ids: List[int], section_ids: List[int]) -> EnrollmentValidationData:
+        """
+        Precarga todo lo que necesitan las validaciones de varias solicitudes en un número
+        constante de consultas: estudiantes, estados financieros, historiales académicos,
+        secciones (con asignatura, cupos y horarios) y las reglas académicas (cacheadas).
+        
+        Args:
+            student_ids: Estudiantes de las solicitudes
+            section_ids: Unión de las secciones de las solicitudes
+        """
+        return EnrollmentValidationData(
+            students=self.student_repo.get_by_ids(student_ids),
+            financial_statuses=self.student_repo.get_financial_statuses(student_ids),
+            academic_histories=self.student_repo.get_academic_histories(student_ids),
+            sections=self.load_sections(section_ids),
+            rules=get_academic_rules(self.db)
+        )
+    
+    def validate_financial_status(
+        self,
+        student_id: int,
+        data: Optional[EnrollmentValidationData] = None
+    ) -> ValidationResult:
         """
         Verifica estado financiero del estudiante.
         Bloquea matrícula si tiene deudas.
+        
+        Args:
+            student_id: ID del estudiante
+            data: Datos precargados con load_validation_data (opcional, evita la consulta)
         """
-        financial_status = self.student_repo.get_financial_status(student_id)
+        if data is not None:
+            financial_status = data.financial_statuses.get(student_id)
+        else:
+            financial_status = self.student_repo.get_financial_status(student_id)
         
         if not financial_status:
             return ValidationResult(
@@ -72,18 +161,27 @@ class ValidationService:
         self,
         student_id: int,
         subject_id: int,
-        selected_subject_ids: Optional[List[int]] = None
+        selected_subject_ids: Optional[List[int]] = None,
+        data: Optional[EnrollmentValidationData] = None
     ) -> ValidationResult:
         """
         Verifica si el estudiante cumple prerrequisitos de una asignatura.
         Considera correquisitos si están en la selección actual.
-        """
-        # Obtener prerrequisitos de la asignatura
-        prerequisites = self.db.query(Prerequisite).filter(
-            Prerequisite.subject_id == subject_id
-        ).all()
         
-        if not prerequisites:
+        Args:
+            student_id: ID del estudiante
+            subject_id: ID de la asignatura
+            selected_subject_ids: Asignaturas de la selección actual (correquisitos)
+            data: Datos precargados con load_validation_data (opcional, evita las consultas)
+        """
+        # Obtener prerrequisitos de la asignatura (grafo cacheado del programa)
+        if data is not None:
+            subject = data.subjects.get(subject_id)
+        else:
+            subject = self.subject_repo.get_by_id(subject_id)
+        prerequisite_graph = get_prerequisite_graph(self.db, subject.program_id) if subject else None
+        
+        if prerequisite_graph is None or not prerequisite_graph.has_prerequisites(subject_id):
             return ValidationResult(
                 validation_type="prerequisites",
                 is_valid=True,
@@ -92,7 +190,10 @@ class ValidationService:
             )
         
         # Obtener historial académico del estudiante
-        academic_history = self.student_repo.get_academic_history(student_id)
+        if data is not None:
+            academic_history = data.academic_histories.get(student_id, [])
+        else:
+            academic_history = self.student_repo.get_academic_history(student_id)
         approved_subject_ids = {
             h.subject_id for h in academic_history
             if h.status == GradeStatus.APROBADO.value
@@ -102,29 +203,18 @@ class ValidationService:
         if selected_subject_ids:
             approved_subject_ids.update(selected_subject_ids)
         
-        missing_prerequisites = []
-        missing_prerequisite_names = []
-        
-        for prereq in prerequisites:
-            prereq_subject = self.subject_repo.get_by_id(prereq.prerequisite_subject_id)
-            prereq_name = prereq_subject.name if prereq_subject else f"ID {prereq.prerequisite_subject_id}"
-            
-            if prereq.type == 'correquisito':
-                # Correquisito: puede estar en la selección actual
-                if prereq.prerequisite_subject_id not in approved_subject_ids:
-                    missing_prerequisites.append(prereq.prerequisite_subject_id)
-                    missing_prerequisite_names.append(prereq_name)
-            else:  # obligatorio
-                # Prerrequisito obligatorio: debe estar aprobado
-                if prereq.prerequisite_subject_id not in approved_subject_ids:
-                    missing_prerequisites.append(prereq.prerequisite_subject_id)
-                    missing_prerequisite_names.append(prereq_name)
+        # Obligatorios y correquisitos: deben estar aprobados o en la selección actual
+        missing_prerequisites = prerequisite_graph.missing_prerequisites(subject_id, approved_subject_ids)
+        missing_prerequisite_names = [
+            prerequisite_graph.name_of(prereq_id) or f"ID {prereq_id}"
+            for prereq_id in missing_prerequisites
+        ]
         
         if missing_prerequisites:
             return ValidationResult(
                 validation_type="prerequisites",
                 is_valid=False,
-                message=f"Debes aprobar las siguientes materias primero: {', '.join(missing_prerequisite_names)}",
+                message=missing_prerequisites_message(missing_prerequisite_names),
                 details={
                     "subject_id": subject_id,
                     "missing_prerequisites": missing_prerequisites,
@@ -142,23 +232,21 @@ class ValidationService:
     def validate_credit_limit(
         self,
         student_id: int,
-        selected_subject_ids: List[int]
+        selected_subject_ids: List[int],
+        data: Optional[EnrollmentValidationData] = None
     ) -> ValidationResult:
         """
         Verifica límite de créditos.
         Obtiene reglas académicas y verifica máximo y mínimo.
-        """
-        # Obtener reglas académicas
-        max_credits_rule = self.db.query(AcademicRule).filter(
-            AcademicRule.rule_type == 'max_credits'
-        ).first()
-        
-        min_credits_rule = self.db.query(AcademicRule).filter(
-            AcademicRule.rule_type == 'min_credits'
-        ).first()
         
-        max_credits = int(max_credits_rule.rule_value) if max_credits_rule else 20
-        min_credits = int(min_credits_rule.rule_value) if min_credits_rule else 8
+        Args:
+            student_id: ID del estudiante
+            selected_subject_ids: Asignaturas seleccionadas
+            data: Datos precargados con load_validation_data (opcional, evita las consultas)
+        """
+        # Obtener reglas académicas (cacheadas, sin consultas)
+        rules = data.rules if data is not None else get_academic_rules(self.db)
+        max_credits, min_credits = rules.max_credits, rules.min_credits
         
         # Validar que haya asignaturas seleccionadas
         if not selected_subject_ids:
@@ -174,9 +262,16 @@ class ValidationService:
             )
         
         # Calcular créditos totales de las asignaturas seleccionadas
-        subjects = self.db.query(Subject).filter(
-            Subject.id.in_(selected_subject_ids)
-        ).all()
+        if data is not None:
+            subjects = [
+                data.subjects[subject_id]
+                for subject_id in dict.fromkeys(selected_subject_ids)
+                if subject_id in data.subjects
+            ]
+        else:
+            subjects = self.db.query(Subject).filter(
+                Subject.id.in_(selected_subject_ids)
+            ).all()
         
         # Verificar que todas las asignaturas existen
         found_subject_ids = {s.id for s in subjects}
@@ -232,11 +327,29 @@ class ValidationService:
             }
         )
     
-    def validate_section_capacity(self, section_id: int) -> ValidationResult:
+    def load_sections(self, section_ids: List[int]) -> Dict[int, CourseSection]:
+        """
+        Carga las secciones de una solicitud con asignatura, cupos y horarios en una sola
+        consulta, para compartirlas entre las validaciones.
+        """
+        return self.section_repo.get_with_schedules(section_ids)
+    
+    def validate_section_capacity(
+        self,
+        section_id: int,
+        sections: Optional[Dict[int, CourseSection]] = None
+    ) -> ValidationResult:
         """
         Verifica cupos disponibles en una sección.
+        
+        Args:
+            section_id: ID de la sección
+            sections: Secciones ya cargadas con load_sections (opcional, evita la consulta)
         """
-        section = self.section_repo.get_by_id(section_id)
+        if sections is not None:
+            section = sections.get(section_id)
+        else:
+            section = self.section_repo.get_by_id(section_id)
         
         if not section:
             return ValidationResult(
@@ -273,9 +386,22 @@ class ValidationService:
             }
         )
     
-    def validate_schedule_conflicts(self, section_ids: List[int]) -> ValidationResult:
+    def validate_schedule_conflicts(
+        self,
+        section_ids: List[int],
+        sections: Optional[Dict[int, CourseSection]] = None
+    ) -> ValidationResult:
         """
         Detecta choques de horario entre secciones.
+        
+        Secciones, asignaturas y horarios se cargan en una sola consulta (o se toman de
+        sections) y los solapamientos se detectan con un barrido por día
+        (find_overlapping_blocks) en lugar de comparar todos los pares de secciones.
+        Se reporta cada par de bloques que se solapa.
+        
+        Args:
+            section_ids: Secciones a validar
+            sections: Secciones ya cargadas con load_sections (opcional, evita la consulta)
         """
         if len(section_ids) < 2:
             return ValidationResult(
@@ -285,58 +411,47 @@ class ValidationService:
                 details={"section_ids": section_ids}
             )
         
-        # Obtener horarios de todas las secciones
-        schedules = self.db.query(SectionSchedule).filter(
-            SectionSchedule.section_id.in_(section_ids)
-        ).all()
-        
-        # Agrupar por sección
-        schedules_by_section: Dict[int, List[SectionSchedule]] = {}
-        for schedule in schedules:
-            if schedule.section_id not in schedules_by_section:
-                schedules_by_section[schedule.section_id] = []
-            schedules_by_section[schedule.section_id].append(schedule)
+        if sections is None:
+            sections = self.load_sections(section_ids)
+        
+        # Bloques de horario de todas las secciones, en orden de sección y de bloque
+        requested = [sections[sid] for sid in dict.fromkeys(section_ids) if sid in sections]
+        block_sections: List[CourseSection] = []
+        block_schedules: List[SectionSchedule] = []
+        for section in sorted(requested, key=self._first_schedule_id):
+            for schedule in sorted(section.section_schedules, key=lambda s: s.id):
+                block_sections.append(section)
+                block_schedules.append(schedule)
+        
+        # Detectar conflictos (bloques de una misma sección no se comparan)
+        pairs = [
+            (i, j) for i, j in find_overlapping_blocks([
+                (schedule.day_of_week, schedule.start_time, schedule.end_time)
+                for schedule in block_schedules
+            ])
+            if block_sections[i].id != block_sections[j].id
+        ]
+        # Mismo orden de reporte que la comparación por pares: sección A, sección B y bloques
+        section_position = {section.id: position for position, section in enumerate(dict.fromkeys(block_sections))}
+        pairs.sort(key=lambda pair: (
+            section_position[block_sections[pair[0]].id],
+            section_position[block_sections[pair[1]].id],
+            pair
+        ))
         
-        # Detectar conflictos
         conflicts = []
-        section_ids_list = list(schedules_by_section.keys())
-        
-        for i in range(len(section_ids_list)):
-            for j in range(i + 1, len(section_ids_list)):
-                section_a_id = section_ids_list[i]
-                section_b_id = section_ids_list[j]
-                
-                schedules_a = schedules_by_section[section_a_id]
-                schedules_b = schedules_by_section[section_b_id]
-                
-                # Verificar si hay solapamiento entre cualquier par de horarios
-                for sched_a in schedules_a:
-                    for sched_b in schedules_b:
-                        if self._schedules_overlap(sched_a, sched_b):
-                            # Obtener información de las secciones
-                            section_a = self.section_repo.get_by_id(section_a_id)
-                            section_b = self.section_repo.get_by_id(section_b_id)
-                            
-                            conflict_info = {
-                                "section_a_id": section_a_id,
-                                "section_b_id": section_b_id,
-                                "day": sched_a.day_of_week,
-                                "time_a": f"{sched_a.start_time}-{sched_a.end_time}",
-                                "time_b": f"{sched_b.start_time}-{sched_b.end_time}",
-                                "section_a_name": f"Sección {section_a_id}",
-                                "section_b_name": f"Sección {section_b_id}"
-                            }
-                            
-                            # Agregar nombres si las secciones existen
-                            if section_a:
-                                subject_a_name = section_a.subject.name if section_a.subject else f"ID {section_a.subject_id}"
-                                conflict_info["section_a_name"] = f"{subject_a_name} - Sección {section_a.section_number}"
-                            
-                            if section_b:
-                                subject_b_name = section_b.subject.name if section_b.subject else f"ID {section_b.subject_id}"
-                                conflict_info["section_b_name"] = f"{subject_b_name} - Sección {section_b.section_number}"
-                            
-                            conflicts.append(conflict_info)
+        for i, j in pairs:
+            section_a, section_b = block_sections[i], block_sections[j]
+            sched_a, sched_b = block_schedules[i], block_schedules[j]
+            conflicts.append({
+                "section_a_id": section_a.id,
+                "section_b_id": section_b.id,
+                "day": sched_a.day_of_week,
+                "time_a": f"{sched_a.start_time}-{sched_a.end_time}",
+                "time_b": f"{sched_b.start_time}-{sched_b.end_time}",
+                "section_a_name": self._section_display_name(section_a),
+                "section_b_name": self._section_display_name(section_b)
+            })
         
         if conflicts:
             conflict_messages = [
@@ -363,6 +478,17 @@ class ValidationService:
             details={"section_ids": section_ids}
         )
     
+    @staticmethod
+    def _first_schedule_id(section: CourseSection) -> int:
+        """Orden de las secciones en el reporte: por su primer bloque de horario"""
+        return min((schedule.id for schedule in section.section_schedules), default=0)
+    
+    @staticmethod
+    def _section_display_name(section: CourseSection) -> str:
+        """Nombre de la sección en los mensajes ("Asignatura - Sección N")"""
+        subject_name = section.subject.name if section.subject else f"ID {section.subject_id}"
+        return f"{subject_name} - Sección {section.section_number}"
+    
     def _schedules_overlap(self, schedule_a: SectionSchedule, schedule_b: SectionSchedule) -> bool:
         """Verifica si dos horarios se solapan"""
         # Deben ser el mismo día
@@ -375,19 +501,31 @@ class ValidationService:
     def validate_duplicate_enrollment(
         self,
         student_id: int,
-        subject_id: int
+        subject_id: int,
+        data: Optional[EnrollmentValidationData] = None
     ) -> ValidationResult:
         """
         Verifica si ya está matriculado o ya aprobó la materia.
         Permite repetir solo si fue reprobada.
+        
+        Args:
+            student_id: ID del estudiante
+            subject_id: ID de la asignatura
+            data: Datos precargados con load_validation_data (opcional, evita la consulta)
         """
         # Verificar en historial académico
-        academic_history = self.db.query(AcademicHistory).filter(
-            and_(
-                AcademicHistory.student_id == student_id,
-                AcademicHistory.subject_id == subject_id
-            )
-        ).first()
+        if data is not None:
+            academic_history = next((
+                record for record in data.academic_histories.get(student_id, [])
+                if record.subject_id == subject_id
+            ), None)
+        else:
+            academic_history = self.db.query(AcademicHistory).filter(
+                and_(
+                    AcademicHistory.student_id == student_id,
+                    AcademicHistory.subject_id == subject_id
+                )
+            ).first()
         
         if academic_history:
             if academic_history.status == GradeStatus.APROBADO.value:
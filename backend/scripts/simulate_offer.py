@@ -20,6 +20,7 @@ from app.models.source.offer import AcademicPeriod, CourseSection, SectionSchedu
 from app.models.source.academic import Subject, StudyPlan
 from app.models.source.people import Professor
 from app.models.source.infrastructure import Classroom
+from app.services.offer_snapshot import bump_offer_version
 
 random.seed(42)
 
@@ -52,6 +53,8 @@ class OfferSimulator:
         self._create_schedules()
         
         self.db.commit()
+        # Invalidar la foto en memoria de la oferta (compartida vía Redis si está activo)
+        bump_offer_version(self.period.id)
         print("\n✅ Simulación de oferta académica completada exitosamente!")
         
         return {
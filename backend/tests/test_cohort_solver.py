@@ -0,0 +1,60 @@
+"""
+Pruebas de la asignación conjunta de horarios (cohorte con cupos compartidos)
+"""
+from datetime import time
+from typing import List, Tuple
+
+from app.services.schedule_engine.models import Student, Section, TimeSlot
+from app.services.schedule_engine.cohort_solver import CohortScheduleSolver
+
+
+def make_section(section_id: int, subject_id: int, slots: List[Tuple[int, int, int]], capacity: int = 30) -> Section:
+    """Sección con bloques (día, hora inicio, hora fin)"""
+    return Section(
+        id=section_id,
+        subject_id=subject_id,
+        subject_code=f"S{subject_id}",
+        subject_name=f"Asignatura {subject_id}",
+        professor_id=1,
+        classroom_id=1,
+        capacity=capacity,
+        enrolled_count=0,
+        section_number=section_id,
+        timeslots=[
+            TimeSlot(id=section_id * 10 + i, day_of_week=day, start_time=time(start), end_time=time(end))
+            for i, (day, start, end) in enumerate(slots)
+        ]
+    )
+
+
+def test_prefers_better_hours_at_equal_subject_count():
+    sections = [
+        make_section(1, 1, [(0, 6, 8), (2, 6, 8)]),
+        make_section(2, 1, [(0, 10, 12), (2, 10, 12)]),
+        make_section(3, 2, [(1, 19, 21)]),
+        make_section(4, 2, [(1, 9, 11)]),
+    ]
+    students = [
+        Student(id=student_id, program_id=1, approved_subject_ids=[], selected_subject_ids=[1, 2])
+        for student_id in (1, 2)
+    ]
+
+    solutions = CohortScheduleSolver(students, {1: sections, 2: sections}, num_workers=1).solve()
+
+    for student_id in (1, 2):
+        assert sorted(solutions[student_id].assigned_section_ids) == [2, 4]
+        assert solutions[student_id].metadata["cohort"]["time_penalty"] == 0
+
+
+def test_time_preference_never_costs_a_subject():
+    # La sección de buen horario de la asignatura 1 choca con la única sección de la asignatura 2
+    sections = [
+        make_section(1, 1, [(0, 6, 8)]),
+        make_section(2, 1, [(0, 10, 12)]),
+        make_section(3, 2, [(0, 11, 13)]),
+    ]
+    student = Student(id=1, program_id=1, approved_subject_ids=[], selected_subject_ids=[1, 2])
+
+    solutions = CohortScheduleSolver([student], {1: sections}, num_workers=1).solve()
+
+    assert sorted(solutions[1].assigned_section_ids) == [1, 3]
@@ -0,0 +1,84 @@
+"""
+Pruebas del optimizador exacto (ramificación y poda) contra fuerza bruta
+"""
+import itertools
+import random
+from datetime import time
+from typing import List, Optional, Tuple
+
+from app.services.schedule_engine.models import Student, Section, TimeSlot
+from app.services.schedule_engine.fitness import ScheduleFitness
+from app.services.schedule_engine.exact_optimizer import ExactScheduleOptimizer
+
+
+def make_section(section_id: int, subject_id: int, slots: List[Tuple[int, int, int]]) -> Section:
+    """Sección con bloques (día, hora inicio, hora fin)"""
+    return Section(
+        id=section_id,
+        subject_id=subject_id,
+        subject_code=f"S{subject_id}",
+        subject_name=f"Asignatura {subject_id}",
+        professor_id=1,
+        classroom_id=1,
+        capacity=30,
+        enrolled_count=0,
+        section_number=section_id,
+        timeslots=[
+            TimeSlot(id=section_id * 10 + i, day_of_week=day, start_time=time(start), end_time=time(end))
+            for i, (day, start, end) in enumerate(slots)
+        ]
+    )
+
+
+def brute_force(student: Student, sections: List[Section]) -> Tuple[int, Optional[float]]:
+    """(asignaturas, fitness) del mejor horario enumerando todas las combinaciones"""
+    subject_ids = list(dict.fromkeys(student.selected_subject_ids))
+    choices = [[None] + [s for s in sections if s.subject_id == subject_id] for subject_id in subject_ids]
+    best = (-1, None)
+    for combination in itertools.product(*choices):
+        chosen = [s for s in combination if s is not None]
+        if any(a.has_time_overlap_with(b) for a, b in itertools.combinations(chosen, 2)):
+            continue
+        fitness = ScheduleFitness(chosen).calculate_fitness()
+        if len(chosen) > best[0] or (len(chosen) == best[0] and fitness < best[1]):
+            best = (len(chosen), fitness)
+    return best
+
+
+def test_bound_ignores_subjects_without_compatible_sections():
+    # Con X1 asignada, la asignatura 3 queda bloqueada: su penalización no debe entrar en la cota
+    sections = [
+        make_section(1, 1, [(0, 6, 9)]),
+        make_section(2, 2, [(0, 16, 17)]),
+        make_section(3, 2, [(0, 9, 10)]),
+        make_section(4, 3, [(0, 6, 7), (1, 6, 7), (2, 6, 7), (3, 6, 7)]),
+        make_section(5, 3, [(0, 7, 8), (1, 6, 7), (2, 6, 7), (3, 6, 7)]),
+    ]
+    student = Student(id=1, program_id=1, approved_subject_ids=[], selected_subject_ids=[1, 2, 3])
+
+    solution = ExactScheduleOptimizer(student, sections).optimize()
+
+    count, fitness = brute_force(student, sections)
+    assert len(solution.assigned_section_ids) == count
+    assert abs(solution.quality_score - fitness) < 1e-9
+    assert sorted(solution.assigned_section_ids) == [1, 3]
+
+
+def test_matches_brute_force_on_random_instances():
+    rng = random.Random(7)
+    for _ in range(40):
+        sections = []
+        for subject_id in range(1, 5):
+            for _ in range(rng.randint(1, 3)):
+                slots = []
+                for _ in range(rng.randint(1, 3)):
+                    start = rng.randint(6, 19)
+                    slots.append((rng.randint(0, 5), start, start + rng.randint(1, 3)))
+                sections.append(make_section(len(sections) + 1, subject_id, slots))
+        student = Student(id=1, program_id=1, approved_subject_ids=[], selected_subject_ids=[1, 2, 3, 4])
+
+        solution = ExactScheduleOptimizer(student, sections).optimize()
+
+        count, fitness = brute_force(student, sections)
+        assert len(solution.assigned_section_ids) == count
+        assert abs(solution.quality_score - fitness) < 1e-9